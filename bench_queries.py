@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+CPU на запрос: ORM select(Model), lambda_stmt и services.repository.
+
+Без DATABASE_URL выполняет запросы на SQLite в памяти через синхронный
+Session - без сети и без потока aiosqlite остаётся только работа Python:
+сборка statement, поиск в кэше компиляции, выполнение, разбор результата
+и гидрация ORM-объектов. Если задан DATABASE_URL, дополнительно выполняет
+ORM и services.repository на реальной базе (с учётом драйвера).
+
+    python bench_queries.py
+    python bench_queries.py --iterations 5000 --user 123 --post 1
+    python bench_queries.py --output bench_output.txt
+"""
+
+import argparse
+import asyncio
+import os
+import time
+
+from sqlalchemy import create_engine, select, update, lambda_stmt
+from sqlalchemy.orm import Session
+from models import Base, User, Post
+from services import repository
+
+def orm_user(user_id):
+    return select(User).where(User.id == user_id)
+
+def orm_post(post_id):
+    return select(Post).where(Post.id == post_id)
+
+def orm_cooldown(user_id):
+    return update(User).where(User.id == user_id).values(cooldown_expires_at=None)
+
+def lambda_user(user_id):
+    return lambda_stmt(
+        lambda: select(User.id, User.username, User.cooldown_expires_at).where(User.id == user_id)
+    )
+
+def lambda_post(post_id):
+    return lambda_stmt(lambda: select(Post.id, Post.user_id, Post.status).where(Post.id == post_id))
+
+def lambda_cooldown(user_id):
+    return lambda_stmt(lambda: update(User).where(User.id == user_id).values(cooldown_expires_at=None))
+
+STATEMENTS = [
+    ('user by id', orm_user, lambda_user, repository.user_stmt),
+    ('post by id', orm_post, lambda_post, repository.post_stmt),
+    ('cooldown update', orm_cooldown, lambda_cooldown, lambda user_id: repository.cooldown_stmt(user_id, None)),
+]
+
+def cpu_per_call(func, iterations: int) -> float:
+    """Microseconds of process CPU per call"""
+    for _ in range(100):
+        func()  # прогрев: разбор лямбды, кэш компиляции
+    started = time.process_time()
+    for _ in range(iterations):
+        func()
+    return (time.process_time() - started) / iterations * 1e6
+
+def bench_memory(iterations: int):
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add(User(id=1, username='bench'))
+        session.add(Post(id=1, user_id=1))
+        session.commit()
+
+    rows = []
+    with Session(engine) as session:
+        def run(build, fetch):
+            def call():
+                result = session.execute(build(1))
+                if fetch == 'orm':
+                    result.scalar_one_or_none()
+                    session.expunge_all()
+                elif fetch == 'row':
+                    result.first()
+            return call
+
+        for name, orm, cached, narrow in STATEMENTS:
+            is_update = name == 'cooldown update'
+            rows.append((
+                name,
+                cpu_per_call(run(orm, None if is_update else 'orm'), iterations),
+                cpu_per_call(run(cached, None if is_update else 'row'), iterations),
+                cpu_per_call(run(narrow, None if is_update else 'row'), iterations),
+            ))
+        session.rollback()
+    engine.dispose()
+    return rows
+
+async def bench_database(iterations: int, user_id: int, post_id: int):
+    from services.db import db
+
+    await db.init()
+    try:
+        async def timed(run):
+            async with db.get_session() as session:
+                for _ in range(100):
+                    await run(session)
+                started = time.process_time()
+                for _ in range(iterations):
+                    await run(session)
+                return (time.process_time() - started) / iterations * 1e6
+
+        async def orm_user_run(session):
+            (await session.execute(orm_user(user_id))).scalar_one_or_none()
+            session.expunge_all()
+
+        async def orm_post_run(session):
+            (await session.execute(orm_post(post_id))).scalar_one_or_none()
+            session.expunge_all()
+
+        return [
+            ('user by id', await timed(orm_user_run),
+             await timed(lambda session: repository.fetch_user(session, user_id))),
+            ('post by id', await timed(orm_post_run),
+             await timed(lambda session: repository.fetch_post(session, post_id))),
+        ]
+    finally:
+        await db.close()
+
+def format_rows(title: str, columns, rows) -> list:
+    lines = [title, f"{'query':<18}" + "".join(f" {column:>12}" for column in columns)]
+    for name, *values in rows:
+        lines.append(f"{name:<18}" + "".join(f" {value:>10.1f}us" for value in values))
+    return lines
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-query CPU of ORM, lambda_stmt and repository statements")
+    parser.add_argument('--iterations', type=int, default=5000)
+    parser.add_argument('--user', type=int, default=0, help="user id for the DB run")
+    parser.add_argument('--post', type=int, default=0, help="post id for the DB run")
+    parser.add_argument('--output', help="also write the report to a file")
+    args = parser.parse_args()
+
+    lines = format_rows("In-memory SQLite, CPU per executed query:",
+                        ('orm', 'lambda', 'repository'), bench_memory(args.iterations))
+
+    if os.getenv("DATABASE_URL"):
+        rows = asyncio.run(bench_database(args.iterations, args.user, args.post))
+        lines += [""] + format_rows("DATABASE_URL, CPU per query:", ('orm', 'repository'), rows)
+
+    report = "\n".join(lines)
+    print(report)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(report + "\n")
+
+if __name__ == '__main__':
+    main()
@@ -11,5 +11,6 @@ __all__ = [
     'profile_handler',
     'moderation_handler',
     'admin_handler',
-    'scheduler_handler'
+    'scheduler_handler',
+    'callbacks'
 ]
@@ -2,12 +2,10 @@ from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
 from config import Config
 from services.db import db
-from models import User
-from sqlalchemy import select
+from services.callbacks import callback_router
+from models import User, Post
+from sqlalchemy import select, func
 import logging
-import re
-import requests
-import asyncio
 from datetime import datetime, timedelta
 
 logger = logging.getLogger(__name__)
@@ -45,11 +43,7 @@ async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
     
     try:
-        from services.db import db
-        from models import User, Post
-        from sqlalchemy import select, func
-        
-        async with db.get_session() as session:
+        async with db.get_read_session() as session:
             # Count users
             users_count = await session.scalar(select(func.count(User.id)))
             
@@ -184,7 +178,7 @@ async def whois_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
     
     try:
-        async with db.get_session() as session:
+        async with db.get_read_session(target_user_id) as session:
             result = await session.execute(select(User).where(User.id == target_user_id))
             user = result.scalar_one_or_none()
             
@@ -425,26 +419,8 @@ async def get_user_id_by_username(username: str) -> int | None:
         logger.error(f"Error finding user by username {username}: {e}")
         return None
 
-async def handle_admin_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Handle admin callbacks"""
-    query = update.callback_query
-    await query.answer()
-    
-    user_id = update.effective_user.id
-    
-    if not Config.is_moderator(user_id):
-        await query.answer("❌ Доступ запрещен", show_alert=True)
-        return
-    
-    data = query.data.split(":")
-    action = data[1] if len(data) > 1 else None
-    
-    if action == "stats":
-        await stats_command(update, context)
-    elif action == "broadcast":
-        await query.answer("📢 Функция рассылки в разработке", show_alert=True)
-    else:
-        await query.answer("Функция в разработке", show_alert=True)
+async def broadcast_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    await callback_router.answer(update, "📢 Функция рассылки в разработке", show_alert=True)
 
 # Заглушки для команд в разработке
 async def broadcast_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -757,3 +733,9 @@ async def handle_trixlinks_text(update: Update, context: ContextTypes.DEFAULT_TY
     
     else:
         await update.message.reply_text("❌ Неизвестное состояние обработки ссылок")
+
+# ============= CALLBACK ROUTES =============
+
+callback_router.guard('admin', Config.is_moderator)
+callback_router.route('admin:stats', stats_command)
+callback_router.route('admin:broadcast', broadcast_callback)
@@ -0,0 +1,21 @@
+from telegram import Update
+from telegram.ext import ContextTypes, CallbackQueryHandler
+from services.callbacks import callback_router
+
+# Модули регистрируют свои маршруты при импорте
+from handlers import (  # noqa: F401
+    admin_handler,
+    menu_handler,
+    moderation_handler,
+    piar_handler,
+    profile_handler,
+    publication_handler
+)
+
+async def handle_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Single entry point for all callback queries"""
+    await callback_router.dispatch(update, context)
+
+def register(application):
+    """One CallbackQueryHandler instead of one pattern per prefix"""
+    application.add_handler(CallbackQueryHandler(handle_callback))
@@ -1,10 +1,9 @@
 from telegram import Update
 from telegram.ext import ContextTypes
 from config import Config
+from services.roll_numbers import roll_numbers
+from services.word_games import word_games
 import logging
-import random
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional
 
 logger = logging.getLogger(__name__)
 
@@ -12,31 +11,8 @@ logger = logging.getLogger(__name__)
 
 class WordGame:
     def __init__(self):
-        # Словари для каждой версии игры
-        self.games_data = {
-            'play3xia': {
-                'words': {},  # {word: {'description': str, 'hints': [], 'media': []}}
-                'current_word': None,
-                'active': False,
-                'winners': [],
-                'attempts_interval': 60  # минуты
-            },
-            'play3x': {
-                'words': {},
-                'current_word': None,
-                'active': False,
-                'winners': [],
-                'attempts_interval': 60
-            },
-            'playxxx': {
-                'words': {},
-                'current_word': None,
-                'active': False,
-                'winners': [],
-                'attempts_interval': 60
-            }
-        }
-        self.user_attempts = {}  # {user_id: {game_version: last_attempt_time}}
+        # Слова, раунды и окна попыток общие с main.py
+        self.games = word_games
 
     def get_game_version(self, command: str) -> str:
         """Определяет версию игры по команде"""
@@ -48,30 +24,6 @@ class WordGame:
             return 'playxxx'
         return 'play3xia'  # По умолчанию
 
-    def can_attempt(self, user_id: int, game_version: str) -> bool:
-        """Проверяет, может ли пользователь делать попытку"""
-        if user_id not in self.user_attempts:
-            return True
-        
-        if game_version not in self.user_attempts[user_id]:
-            return True
-        
-        last_attempt = self.user_attempts[user_id][game_version]
-        interval_minutes = self.games_data[game_version]['attempts_interval']
-        
-        return datetime.now() - last_attempt >= timedelta(minutes=interval_minutes)
-
-    def record_attempt(self, user_id: int, game_version: str):
-        """Записывает попытку пользователя"""
-        if user_id not in self.user_attempts:
-            self.user_attempts[user_id] = {}
-        
-        self.user_attempts[user_id][game_version] = datetime.now()
-
-    def normalize_word(self, word: str) -> str:
-        """Нормализует слово для сравнения"""
-        return word.lower().strip().replace('ё', 'е')
-
 # Глобальный экземпляр игры
 word_game = WordGame()
 
@@ -94,16 +46,12 @@ async def wordadd_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     game_version = word_game.get_game_version(command_text)
     word = context.args[0].lower()
     
-    word_game.games_data[game_version]['words'][word] = {
-        'description': f'Угадайте слово: {word}',
-        'hints': [],
-        'media': []
-    }
+    entry = await word_game.games.add_word(game_version, word)
     
     await update.message.reply_text(
         f"✅ **Слово добавлено в игру {game_version}:**\n\n"
         f"🎯 Слово: {word}\n"
-        f"📝 Описание: {word_game.games_data[game_version]['words'][word]['description']}"
+        f"📝 Описание: {entry['description']}"
     )
 
 async def wordedit_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -124,12 +72,10 @@ async def wordedit_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     word = context.args[0].lower()
     new_description = ' '.join(context.args[1:])
     
-    if word not in word_game.games_data[game_version]['words']:
+    if not await word_game.games.edit_word(game_version, word, new_description):
         await update.message.reply_text(f"❌ Слово '{word}' не найдено в игре {game_version}")
         return
     
-    word_game.games_data[game_version]['words'][word]['description'] = new_description
-    
     await update.message.reply_text(
         f"✅ **Слово обновлено в игре {game_version}:**\n\n"
         f"🎯 Слово: {word}\n"
@@ -150,8 +96,7 @@ async def wordclear_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     game_version = word_game.get_game_version(command_text)
     word = context.args[0].lower()
     
-    if word in word_game.games_data[game_version]['words']:
-        del word_game.games_data[game_version]['words'][word]
+    if await word_game.games.remove_word(game_version, word):
         await update.message.reply_text(f"✅ Слово '{word}' удалено из игры {game_version}")
     else:
         await update.message.reply_text(f"❌ Слово '{word}' не найдено в игре {game_version}")
@@ -165,25 +110,20 @@ async def wordon_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     command_text = update.message.text
     game_version = word_game.get_game_version(command_text)
     
-    if not word_game.games_data[game_version]['words']:
+    # Выбираем случайное слово
+    current_word = await word_game.games.start(game_version)
+    if current_word is None:
         await update.message.reply_text(f"❌ Нет слов для игры {game_version}. Добавьте слова командой wordadd")
         return
     
-    # Выбираем случайное слово
-    available_words = list(word_game.games_data[game_version]['words'].keys())
-    current_word = random.choice(available_words)
-    
-    word_game.games_data[game_version]['current_word'] = current_word
-    word_game.games_data[game_version]['active'] = True
-    word_game.games_data[game_version]['winners'] = []
-    
-    description = word_game.games_data[game_version]['words'][current_word]['description']
+    game = word_game.games.game(game_version)
+    description = game.words[current_word]['description']
     
     await update.message.reply_text(
         f"🎮 **Конкурс {game_version} НАЧАЛСЯ!**\n\n"
         f"📝 {description}\n\n"
         f"🎯 Используйте команду `/{game_version}say слово` для участия\n"
-        f"⏰ Интервал между попытками: {word_game.games_data[game_version]['attempts_interval']} минут",
+        f"⏰ Интервал между попытками: {game.interval} минут",
         parse_mode='Markdown'
     )
 
@@ -196,9 +136,9 @@ async def wordoff_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     command_text = update.message.text
     game_version = word_game.get_game_version(command_text)
     
-    word_game.games_data[game_version]['active'] = False
-    current_word = word_game.games_data[game_version]['current_word']
-    winners = word_game.games_data[game_version]['winners']
+    game = await word_game.games.stop(game_version)
+    current_word = game.current_word
+    winners = game.winners
     
     winner_text = ""
     if winners:
@@ -227,7 +167,7 @@ async def anstimeset_command(update: Update, context: ContextTypes.DEFAULT_TYPE)
     game_version = word_game.get_game_version(command_text)
     minutes = int(context.args[0])
     
-    word_game.games_data[game_version]['attempts_interval'] = minutes
+    await word_game.games.update(game_version, interval=minutes)
     
     await update.message.reply_text(
         f"✅ **Интервал обновлен для {game_version}:**\n\n"
@@ -248,42 +188,29 @@ async def game_say_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     username = update.effective_user.username or f"ID_{user_id}"
     guess = context.args[0]
     
+    game = word_game.games.game(game_version)
+    
     # Проверяем, активна ли игра
-    if not word_game.games_data[game_version]['active']:
+    if not game.active:
         await update.message.reply_text(f"❌ Конкурс {game_version} неактивен")
         return
     
-    # Проверяем интервал между попытками
-    if not word_game.can_attempt(user_id, game_version):
-        interval = word_game.games_data[game_version]['attempts_interval']
+    # Проверяем интервал между попытками и ответ
+    won, wait = await word_game.games.guess(game_version, user_id, guess)
+    if wait:
         await update.message.reply_text(
-            f"⏰ Вы можете делать попытку раз в {interval} минут"
+            f"⏰ Вы можете делать попытку раз в {game.interval} минут"
         )
         return
     
-    # Записываем попытку
-    word_game.record_attempt(user_id, game_version)
-    
-    current_word = word_game.games_data[game_version]['current_word']
+    current_word = game.current_word
     
-    # Отправляем уведомление в группу модерации
-    try:
-        await context.bot.send_message(
-            chat_id=Config.MODERATION_GROUP_ID,
-            text=f"🎮 **Игровая попытка {game_version}:**\n\n"
-                 f"👤 @{username} (ID: {user_id})\n"
-                 f"🎯 Попытка: {guess}\n"
-                 f"✅ Правильный ответ: {current_word}",
-            parse_mode='Markdown'
-        )
-    except Exception as e:
-        logger.error(f"Error sending game notification: {e}")
+    # Попытка попадёт в сводку для группы модерации
+    word_game.games.report_guess(context.bot, Config.MODERATION_GROUP_ID, game_version, user_id, username, guess, won)
     
-    # Проверяем правильность ответа
-    if word_game.normalize_word(guess) == word_game.normalize_word(current_word):
+    if won:
         # ПОБЕДА!
-        word_game.games_data[game_version]['winners'].append(username)
-        word_game.games_data[game_version]['active'] = False
+        await word_game.games.win(game_version, username)
         
         await update.message.reply_text(
             f"🎉 **ПОЗДРАВЛЯЕМ!**\n\n"
@@ -306,20 +233,21 @@ async def game_say_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     else:
         # Неправильный ответ
-        await update.message.reply_text(f"❌ Неправильно. Попробуйте еще раз через {word_game.games_data[game_version]['attempts_interval']} минут")
+        await update.message.reply_text(f"❌ Неправильно. Попробуйте еще раз через {game.interval} минут")
 
 async def wordinfo_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Показать информацию о текущем слове"""
     command_text = update.message.text
     game_version = word_game.get_game_version(command_text)
     
-    if not word_game.games_data[game_version]['active']:
+    game = word_game.games.game(game_version)
+    if not game.active:
         await update.message.reply_text(f"❌ Конкурс {game_version} неактивен")
         return
     
-    current_word = word_game.games_data[game_version]['current_word']
-    if current_word and current_word in word_game.games_data[game_version]['words']:
-        description = word_game.games_data[game_version]['words'][current_word]['description']
+    current_word = game.current_word
+    if current_word and current_word in game.words:
+        description = game.words[current_word]['description']
         
         await update.message.reply_text(
             f"🎯 **Информация о текущем конкурсе {game_version}:**\n\n"
@@ -333,11 +261,8 @@ async def wordinfo_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 class RollGame:
     def __init__(self):
-        self.games_data = {
-            'play3xia': {'participants': {}, 'active': True},
-            'play3x': {'participants': {}, 'active': True},
-            'playxxx': {'participants': {}, 'active': True}
-        }
+        # Участники и свободные номера общие с main.py
+        self.numbers = roll_numbers
     
     def get_game_version(self, command: str) -> str:
         if command.startswith('/play3xia'):
@@ -361,32 +286,22 @@ async def roll_participant_command(update: Update, context: ContextTypes.DEFAULT
     user_id = update.effective_user.id
     username = update.effective_user.username or f"ID_{user_id}"
     
-    # Проверяем, участвует ли уже пользователь
-    if user_id in roll_game.games_data[game_version]['participants']:
-        existing_number = roll_game.games_data[game_version]['participants'][user_id]['number']
+    number, created = await roll_game.numbers.join(game_version, user_id, username)
+    
+    if number is None:
+        await update.message.reply_text("❌ Все номера уже разобраны")
+        return
+    
+    if not created:
         await update.message.reply_text(
-            f"@{username}, у вас уже есть номер для розыгрыша: **{existing_number}**"
+            f"@{username}, у вас уже есть номер для розыгрыша: **{number}**"
         )
         return
     
-    # Генерируем уникальный номер
-    existing_numbers = [p['number'] for p in roll_game.games_data[game_version]['participants'].values()]
-    
-    while True:
-        number = random.randint(1, 9999)
-        if number not in existing_numbers:
-            break
-    
-    # Сохраняем участника
-    roll_game.games_data[game_version]['participants'][user_id] = {
-        'username': username,
-        'number': number,
-        'joined_at': datetime.now()
-    }
-    
+    participants_count = len(roll_game.numbers.participants(game_version))
     await update.message.reply_text(
         f"@{username}, ваш номер для розыгрыша: **{number}**\n\n"
-        f"🎲 Участников: {len(roll_game.games_data[game_version]['participants'])}"
+        f"🎲 Участников: {participants_count}"
     )
     
     # Уведомляем модераторов
@@ -396,7 +311,7 @@ async def roll_participant_command(update: Update, context: ContextTypes.DEFAULT
             text=f"🎲 **Новый участник розыгрыша {game_version}:**\n\n"
                  f"👤 @{username} (ID: {user_id})\n"
                  f"🔢 Номер: {number}\n"
-                 f"📊 Всего участников: {len(roll_game.games_data[game_version]['participants'])}",
+                 f"📊 Всего участников: {participants_count}",
             parse_mode='Markdown'
         )
     except Exception as e:
@@ -409,14 +324,14 @@ async def mynumber_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = update.effective_user.id
     username = update.effective_user.username or f"ID_{user_id}"
     
-    if user_id not in roll_game.games_data[game_version]['participants']:
+    number = roll_game.numbers.number_of(game_version, user_id)
+    if number is None:
         await update.message.reply_text(
             f"@{username}, вы не участвуете в розыгрыше {game_version}\n"
             f"Используйте `/{game_version}roll 9999` для участия"
         )
         return
     
-    number = roll_game.games_data[game_version]['participants'][user_id]['number']
     await update.message.reply_text(f"@{username}, ваш номер: **{number}**")
 
 async def roll_draw_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -433,7 +348,7 @@ async def roll_draw_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     game_version = roll_game.get_game_version(command_text)
     winners_count = min(5, max(1, int(context.args[0])))
     
-    participants = roll_game.games_data[game_version]['participants']
+    participants = roll_game.numbers.participants(game_version)
     
     if len(participants) < winners_count:
         await update.message.reply_text(
@@ -442,28 +357,18 @@ async def roll_draw_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         )
         return
     
-    # Генерируем случайное число
-    winning_number = random.randint(1, 9999)
-    
-    # Находим ближайшие номера
-    participants_list = [
-        (user_id, data['username'], data['number'])
-        for user_id, data in participants.items()
-    ]
-    
-    # Сортируем по близости к выигрышному числу
-    participants_list.sort(key=lambda x: abs(x[2] - winning_number))
-    
-    # Берем нужное количество победителей
-    winners = participants_list[:winners_count]
+    # Выигрышное число из сида и ближайшие к нему номера
+    draw = await roll_game.numbers.draw(game_version, winners_count)
+    winning_number = draw.target
     
     winners_text = []
-    for user_id, username, number in winners:
+    for user_id, username, number in draw.winners:
         winners_text.append(f"@{username} ({number})")
     
     result_text = (
         f"🎉 **РЕЗУЛЬТАТЫ РОЗЫГРЫША {game_version.upper()}!**\n\n"
-        f"🎲 Выигрышное число: **{winning_number}**\n\n"
+        f"🎲 Выигрышное число: **{winning_number}**\n"
+        f"🔑 Сид: {draw.seed}\n\n"
         f"🏆 Победители:\n" + "\n".join([f"{i+1}. {w}" for i, w in enumerate(winners_text)]) +
         f"\n\n🎊 Поздравляем победителей!"
     )
@@ -479,8 +384,7 @@ async def rollreset_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     command_text = update.message.text
     game_version = roll_game.get_game_version(command_text)
     
-    participants_count = len(roll_game.games_data[game_version]['participants'])
-    roll_game.games_data[game_version]['participants'] = {}
+    participants_count = await roll_game.numbers.reset(game_version)
     
     await update.message.reply_text(
         f"✅ **Розыгрыш {game_version} сброшен!**\n\n"
@@ -497,7 +401,7 @@ async def rollstatus_command(update: Update, context: ContextTypes.DEFAULT_TYPE)
     command_text = update.message.text
     game_version = roll_game.get_game_version(command_text)
     
-    participants = roll_game.games_data[game_version]['participants']
+    participants = roll_game.numbers.participants(game_version)
     
     if not participants:
         await update.message.reply_text(f"📊 Розыгрыш {game_version}: нет участников")
@@ -1,121 +1,31 @@
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram import Update
 from telegram.ext import ContextTypes
 from config import Config
+from services.menu import menu
+from services.callbacks import callback_router
 import logging
 
 logger = logging.getLogger(__name__)
 
-async def handle_menu_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Handle menu callbacks"""
-    query = update.callback_query
-    await query.answer()
-    
-    data = query.data.split(":")
-    action = data[1] if len(data) > 1 else None
-    
-    logger.info(f"Menu callback action: {action}")
-    
-    if action == "write":
-        from handlers.start_handler import show_write_menu
-        await show_write_menu(update, context)
-    elif action == "read":
-        from handlers.start_handler import show_main_menu
-        await show_main_menu(update, context)
-    elif action == "budapest":
-        await show_budapest_menu(update, context)
-    elif action == "catalog":
-        await show_catalog(update, context)
-    elif action == "services":  # Заявка в каталог услуг (бывший пиар)
-        await start_piar(update, context)
-    elif action == "actual":  # НОВЫЙ РАЗДЕЛ
-        await start_actual_post(update, context)
-    elif action == "back":
-        from handlers.start_handler import show_main_menu
-        await show_main_menu(update, context)
-    elif action == "announcements":
-        await show_announcements_menu(update, context)
-    elif action == "news":
-        await start_category_post(update, context, "🗯️ Будапешт", "🔔 Новости")
-    elif action == "overheard":
-        await start_category_post(update, context, "🗯️ Будапешт", "🔕 Подслушано", anonymous=True)
-    elif action == "complaints":
-        await start_category_post(update, context, "🗯️ Будапешт", "👸🏼 Жалобы", anonymous=True)
-    else:
-        logger.warning(f"Unknown menu action: {action}")
-        await query.answer("Функция в разработке", show_alert=True)
+def _screen_callback(name: str):
+    """Callback that sends a compiled menu screen"""
+    async def show(update: Update, context: ContextTypes.DEFAULT_TYPE):
+        await menu.show(update, name)
+    return show
 
-async def show_budapest_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Show Budapest category menu"""
-    keyboard = [
-        [InlineKeyboardButton("📣 Объявления", callback_data="menu:announcements")],
-        [InlineKeyboardButton("🔔 Новости", callback_data="menu:news")],
-        [InlineKeyboardButton("🔕 Подслушано (анонимно)", callback_data="menu:overheard")],
-        [InlineKeyboardButton("👸🏼 Жалобы (анонимно)", callback_data="menu:complaints")],
-        [InlineKeyboardButton("🙅‍♂️ Назад", callback_data="menu:write")]
-    ]
-    
-    text = (
-        "🙅‍♂️ *Пост в Будапешт*\n\n"
-        "Выберите тип публикации:\n\n"
-        "📣 *Объявления* - товары, услуги, поиски и предложения. \n"
-        "🔔 *Новости* - новая актуальная информация\n"
-        "🔕 *Подслушано* - анонимные истории, сплетни, ситуации\n"
-        "👑 *Жалобы* - анонимные недовольства и проблемы\n"
-    )
-    
-    try:
-        await update.callback_query.edit_message_text(
-            text,
-            reply_markup=InlineKeyboardMarkup(keyboard),
-            parse_mode='Markdown'
-        )
-    except Exception as e:
-        logger.error(f"Error in show_budapest_menu: {e}")
-        await update.callback_query.message.reply_text(
-            text,
-            reply_markup=InlineKeyboardMarkup(keyboard),
-            parse_mode='Markdown'
-        )
+def _section_callback(section):
+    """Callback that starts a post in a Budapest section without subcategories"""
+    async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
+        await start_category_post(update, context, section.category, section.label, anonymous=section.anonymous)
+    return start
 
-async def show_announcements_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Show announcements subcategories"""
-    keyboard = [
-        [
-            InlineKeyboardButton("🕵🏻‍♀️ Куплю", callback_data="pub:cat:buy"),
-            InlineKeyboardButton("👷‍♀️ Работа", callback_data="pub:cat:work")
-        ],
-        [
-            InlineKeyboardButton("🕵🏼 Отдам", callback_data="pub:cat:free"),
-            InlineKeyboardButton("🏢 Аренда", callback_data="pub:cat:rent")
-        ],
-        [
-            InlineKeyboardButton("🕵🏻‍♂️ Продам", callback_data="pub:cat:sell"),
-            InlineKeyboardButton("🪙 Криптовалюта", callback_data="pub:cat:crypto")
-        ],
-        [
-            InlineKeyboardButton("🫧 Ищу ", callback_data="pub:cat:other"),
-            InlineKeyboardButton("⭐️ О себе", callback_data="pub:cat:events")
-        ],
-        [InlineKeyboardButton("🔑 Назад", callback_data="menu:budapest")]
-    ]
-    
-    text = (
-        "📣 *Объявления*\n\n"
-        "Выберите подкатегорию:"
-    )
-    
-    await update.callback_query.edit_message_text(
-        text,
-        reply_markup=InlineKeyboardMarkup(keyboard),
-        parse_mode='Markdown'
-    )
 async def start_piar(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Start Services form (renamed from Piar)"""
     context.user_data['piar_data'] = {}
     context.user_data['waiting_for'] = 'piar_name'
     context.user_data['piar_step'] = 'name'
     
-    keyboard = [[InlineKeyboardButton("↩️ Назад", callback_data="menu:write")]]
+    keyboard = menu.back("menu:write", "↩️ Назад")
 
     text = (
         "🪄 *Подайте заявку на добавление в каталог Будапешта и всей Венгрии.*\n"
@@ -134,22 +44,22 @@ async def start_piar(update: Update, context: ContextTypes.DEFAULT_TYPE):
     try:
         await update.callback_query.edit_message_text(
             text,
-            reply_markup=InlineKeyboardMarkup(keyboard),
+            reply_markup=keyboard,
             parse_mode='Markdown'
         )
     except Exception as e:
         logger.error(f"Error in start_piar: {e}")
-        await update.callback_query.answer("Ошибка. Попробуйте позже", show_alert=True)
+        await callback_router.answer(update, "Ошибка. Попробуйте позже", show_alert=True)
     
     try:
         await update.callback_query.edit_message_text(
             text,
-            reply_markup=InlineKeyboardMarkup(keyboard),
+            reply_markup=keyboard,
             parse_mode='Markdown'
         )
     except Exception as e:
         logger.error(f"Error in start_piar: {e}")
-        await update.callback_query.answer("Ошибка. Попробуйте позже", show_alert=True)
+        await callback_router.answer(update, "Ошибка. Попробуйте позже", show_alert=True)
 
 async def start_actual_post(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Start Actual post creation - НОВЫЙ РАЗДЕЛ"""
@@ -160,7 +70,7 @@ async def start_actual_post(update: Update, context: ContextTypes.DEFAULT_TYPE):
         'is_actual': True  # Специальный флаг для актуального
     }
     
-    keyboard = [[InlineKeyboardButton("◀️ Назад", callback_data="menu:write")]]
+    keyboard = menu.back("menu:write", "◀️ Назад")
     
     text = (
         "⚡️ *Актуальное*\n"
@@ -187,20 +97,20 @@ async def start_actual_post(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     await update.callback_query.edit_message_text(
         text,
-        reply_markup=InlineKeyboardMarkup(keyboard),
+        reply_markup=keyboard,
         parse_mode='Markdown'
     )
     
     try:
         await update.callback_query.edit_message_text(
             text,
-            reply_markup=InlineKeyboardMarkup(keyboard),
+            reply_markup=keyboard,
             parse_mode='Markdown'
         )
         context.user_data['waiting_for'] = 'post_text'
     except Exception as e:
         logger.error(f"Error in start_actual_post: {e}")
-        await update.callback_query.answer("Ошибка. Попробуйте позже", show_alert=True)
+        await callback_router.answer(update, "Ошибка. Попробуйте позже", show_alert=True)
 
 async def start_category_post(update: Update, context: ContextTypes.DEFAULT_TYPE, 
                               category: str, subcategory: str, anonymous: bool = False):
@@ -211,8 +121,6 @@ async def start_category_post(update: Update, context: ContextTypes.DEFAULT_TYPE
         'anonymous': anonymous
     }
     
-    keyboard = [[InlineKeyboardButton("↩️ Назад", callback_data="menu:budapest")]]
-    
     anon_text = " (анонимно)" if anonymous else ""
     
     text = (
@@ -223,10 +131,24 @@ async def start_category_post(update: Update, context: ContextTypes.DEFAULT_TYPE
     try:
         await update.callback_query.edit_message_text(
             text,
-            reply_markup=InlineKeyboardMarkup(keyboard),
+            reply_markup=menu.back("menu:budapest", "↩️ Назад"),
             parse_mode='Markdown'
         )
         context.user_data['waiting_for'] = 'post_text'
     except Exception as e:
         logger.error(f"Error in start_category_post: {e}")
-        await update.callback_query.answer("Ошибка. Попробуйте позже", show_alert=True)
+        await callback_router.answer(update, "Ошибка. Попробуйте позже", show_alert=True)
+
+# ============= CALLBACK ROUTES =============
+
+# Экраны навигации собраны заранее в services.menu
+for _action, _screen in menu.routes.items():
+    callback_router.route(f'menu:{_action}', _screen_callback(_screen))
+
+# Новости, подслушано, жалобы
+for _section in menu.children('budapest'):
+    if _section.key not in menu.routes:
+        callback_router.route(f'menu:{_section.key}', _section_callback(_section))
+
+callback_router.route('menu:services', start_piar)  # Заявка в каталог услуг (бывший пиар)
+callback_router.route('menu:actual', start_actual_post)
@@ -1,42 +1,36 @@
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
-from telegram.ext import ContextTypes
+from telegram.ext import ContextTypes, filters
 from config import Config
+from services.db import db
+from services.moderation_claims import moderation_claims, TOKEN_PATTERN
+from services.notifier import notifier
+from services.callbacks import callback_router, encode
+from services.repository import fetch_post
+from models import Post, PostStatus
+from sqlalchemy import select, update, func, tuple_, bindparam, any_, ARRAY, Integer
+from utils.permissions import moderator_only
+from datetime import datetime
 import logging
 
 logger = logging.getLogger(__name__)
 
-async def handle_moderation_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Handle moderation callbacks with BigInt support"""
-    query = update.callback_query
-    await query.answer()
-    
-    user_id = update.effective_user.id
-    
-    logger.info(f"Moderation callback from user {user_id}")
-    logger.info(f"Is moderator check: {Config.is_moderator(user_id)}")
-    
-    if not Config.is_moderator(user_id):
-        await query.answer("❌ Доступ запрещен", show_alert=True)
-        logger.warning(f"Access denied for user {user_id}")
-        return
-    
-    data = query.data.split(":")
-    action = data[1] if len(data) > 1 else None
-    post_id = int(data[2]) if len(data) > 2 and data[2].isdigit() else None
-    
-    logger.info(f"Moderation callback: action={action}, post_id={post_id}, user_id={user_id}")
-    
-    if action == "approve" and post_id:
-        await start_approve_process(update, context, post_id)
-    elif action == "approve_chat" and post_id:  # для актуальных постов
-        await start_approve_process(update, context, post_id, chat=True)
-    elif action == "reject" and post_id:
-        await start_reject_process(update, context, post_id)
-    elif action == "edit" and post_id:
-        await query.answer("Редактирование в разработке", show_alert=True)
-    else:
-        logger.error(f"Unknown action or missing post_id: action={action}, post_id={post_id}")
-        await query.answer("Неизвестное действие", show_alert=True)
+# Ответы модераторов на запрос ссылки/причины: reply на сообщение бота или "#ID текст"
+# в группе модерации (или в личке, если очередь открыта там через /queue)
+MODERATION_TEXT_FILTER = (
+    filters.TEXT & ~filters.COMMAND
+    & filters.User(Config.get_all_moderators())
+    & (filters.Chat(Config.MODERATION_GROUP_ID) | filters.ChatType.PRIVATE)
+    & (filters.REPLY | filters.Regex(TOKEN_PATTERN))
+)
+
+async def show_queue_callback(update: Update, context: ContextTypes.DEFAULT_TYPE,
+                              direction: str = None, created_at: datetime = None, post_id: int = None):
+    """mod:queue[:direction:created_at:id] - страница очереди по курсору"""
+    cursor = (created_at, post_id) if created_at and post_id else None
+    await show_queue_page(update, context, direction, cursor)
+
+async def edit_post_callback(update: Update, context: ContextTypes.DEFAULT_TYPE, post_id: int):
+    await callback_router.answer(update, "Редактирование в разработке", show_alert=True)
 
 async def handle_moderation_text(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle text input from moderators"""
@@ -48,53 +42,86 @@ async def handle_moderation_text(update: Update, context: ContextTypes.DEFAULT_T
         logger.warning(f"Non-moderator {user_id} tried to send moderation text")
         return
     
-    # Проверяем, ожидает ли бот ввод от модератора
-    waiting_for = context.user_data.get('mod_waiting_for')
-    logger.info(f"Moderator {user_id} sent text, waiting_for: {waiting_for}")
+    # Ищем заявку, к которой относится ответ: reply на запрос бота, "#ID" или единственная активная
+    reply_to = update.message.reply_to_message
+    try:
+        claim, text, active_ids = await moderation_claims.resolve(
+            user_id,
+            update.effective_chat.id,
+            reply_to.message_id if reply_to else None,
+            update.message.text
+        )
+    except Exception as db_error:
+        logger.error(f"Database error resolving moderation claim for {user_id}: {db_error}")
+        return
+    
+    if not claim:
+        if active_ids:
+            ids_text = ", ".join(f"#{post_id}" for post_id in active_ids)
+            await update.message.reply_text(
+                f"❓ У вас несколько заявок в работе: {ids_text}\n"
+                f"Ответьте (reply) на сообщение бота или начните текст с #ID заявки"
+            )
+        else:
+            logger.info(f"Moderator {user_id} sent text but not in moderation process")
+        return
+    
+    logger.info(f"Moderator {user_id} sent text for post {claim.post_id}, action: {claim.action}")
     
-    if waiting_for == 'approve_link':
-        await process_approve_with_link(update, context)
-    elif waiting_for == 'reject_reason':
-        await process_reject_with_reason(update, context)
-    else:
-        logger.info(f"Moderator {user_id} sent text but not in moderation process")
+    if claim.action == 'approve_link':
+        await process_approve_with_link(update, context, claim, text)
+    elif claim.action == 'reject_reason':
+        await process_reject_with_reason(update, context, claim, text)
+
+async def _claim_post(update: Update, post_id: int, action: str, chat: bool = False):
+    """Load pending post and take the moderation lease on it. Returns post or None"""
+    query = update.callback_query
+    
+    try:
+        async with db.get_session() as session:
+            post = await fetch_post(session, post_id)
+        
+        if not post:
+            logger.error(f"Post {post_id} not found")
+            await callback_router.answer(update, "❌ Пост не найден", show_alert=True)
+            return None
+        
+        if post.status != PostStatus.PENDING:
+            await callback_router.answer(update, "⏭️ Заявка уже обработана", show_alert=True)
+            return None
+        
+        logger.info(f"Found post {post_id}, user {post.user_id}")
+        
+        claimed, holder = await moderation_claims.claim(
+            post_id,
+            update.effective_user.id,
+            post.user_id,
+            action,
+            is_chat=chat,
+            chat_id=query.message.chat_id if query.message else None,
+            prompt_message_id=query.message.message_id if query.message else None
+        )
+    except Exception as db_error:
+        logger.error(f"Database error when claiming post {post_id}: {db_error}")
+        await callback_router.answer(update, "❌ Ошибка базы данных", show_alert=True)
+        return None
+    
+    if not claimed:
+        await callback_router.answer(update, f"🔒 Заявку уже обрабатывает модератор {holder}", show_alert=True)
+        return None
+    
+    logger.info(f"Post {post_id} claimed by {update.effective_user.id} for {action}")
+    return post
 
 async def start_approve_process(update: Update, context: ContextTypes.DEFAULT_TYPE, post_id: int, chat: bool = False):
     """Start approval process - ask for publication link"""
     try:
         logger.info(f"Starting approve process for post {post_id}")
         
-        try:
-            from services.db import db
-            from models import Post
-            from sqlalchemy import select
-            
-            async with db.get_session() as session:
-                result = await session.execute(
-                    select(Post).where(Post.id == post_id)
-                )
-                post = result.scalar_one_or_none()
-                
-                if not post:
-                    logger.error(f"Post {post_id} not found")
-                    await update.callback_query.answer("❌ Пост не найден", show_alert=True)
-                    return
-                    
-                logger.info(f"Found post {post_id}, user {post.user_id}")
-                
-        except Exception as db_error:
-            logger.error(f"Database error when getting post {post_id}: {db_error}")
-            await update.callback_query.answer("❌ Ошибка базы данных", show_alert=True)
+        post = await _claim_post(update, post_id, 'approve_link', chat)
+        if not post:
             return
         
-        # Store post info for later use
-        context.user_data['mod_post_id'] = post_id
-        context.user_data['mod_post_user_id'] = post.user_id
-        context.user_data['mod_waiting_for'] = 'approve_link'
-        context.user_data['mod_is_chat'] = chat
-        
-        logger.info(f"Stored context data for approval: {context.user_data}")
-        
         # Ask moderator for publication link
         destination = "чате" if chat else "канале"
         await update.callback_query.edit_message_text(
@@ -102,104 +129,76 @@ async def start_approve_process(update: Update, context: ContextTypes.DEFAULT_TY
             f"Заявка будет одобрена и пользователь получит уведомление.\n\n"
             f"📎 **Отправьте ссылку на пост в {destination}:**\n"
             f"(Например: https://t.me/snghu/1234)\n\n"
-            f"⚠️ Отправьте только ссылку одним сообщением\n\n"
+            f"⚠️ Ответьте (reply) на это сообщение или начните ссылку с #{post_id}\n\n"
             f"📊 Post ID: {post_id}\n"
             f"👤 User ID: {post.user_id}"
         )
         
     except Exception as e:
         logger.error(f"Error starting approve process for post {post_id}: {e}")
-        await update.callback_query.answer("❌ Ошибка обработки заявки", show_alert=True)
+        await callback_router.answer(update, "❌ Ошибка обработки заявки", show_alert=True)
 
 async def start_reject_process(update: Update, context: ContextTypes.DEFAULT_TYPE, post_id: int):
     """Start rejection process - ask for reason"""
     try:
         logger.info(f"Starting reject process for post {post_id}")
         
-        try:
-            from services.db import db
-            from models import Post
-            from sqlalchemy import select
-            
-            async with db.get_session() as session:
-                result = await session.execute(
-                    select(Post).where(Post.id == post_id)
-                )
-                post = result.scalar_one_or_none()
-                
-                if not post:
-                    logger.error(f"Post {post_id} not found")
-                    await update.callback_query.answer("❌ Пост не найден", show_alert=True)
-                    return
-                    
-                logger.info(f"Found post {post_id}, user {post.user_id}")
-                
-        except Exception as db_error:
-            logger.error(f"Database error when getting post {post_id}: {db_error}")
-            await update.callback_query.answer("❌ Ошибка базы данных", show_alert=True)
+        post = await _claim_post(update, post_id, 'reject_reason')
+        if not post:
             return
         
-        # Store post info for later use
-        context.user_data['mod_post_id'] = post_id
-        context.user_data['mod_post_user_id'] = post.user_id
-        context.user_data['mod_waiting_for'] = 'reject_reason'
-        
-        logger.info(f"Stored context data for rejection: {context.user_data}")
-        
         # Ask moderator for rejection reason
         await update.callback_query.edit_message_text(
             f"❌ **ОТКЛОНЕНИЕ ЗАЯВКИ**\n\n"
             f"Заявка будет отклонена и пользователь получит уведомление.\n\n"
             f"📝 **Напишите причину отклонения:**\n"
             f"(Будет отправлена пользователю)\n\n"
-            f"⚠️ Отправьте причину одним сообщением\n\n"
+            f"⚠️ Ответьте (reply) на это сообщение или начните причину с #{post_id}\n\n"
             f"📊 Post ID: {post_id}\n"
             f"👤 User ID: {post.user_id}"
         )
         
     except Exception as e:
         logger.error(f"Error starting reject process for post {post_id}: {e}")
-        await update.callback_query.answer("❌ Ошибка обработки заявки", show_alert=True)
+        await callback_router.answer(update, "❌ Ошибка обработки заявки", show_alert=True)
+
+async def _decide_claimed_post(update: Update, claim, status) -> bool:
+    """Apply the decision to a claimed post and release the lease"""
+    post_id = claim.post_id
+    
+    try:
+        updated, skipped = await bulk_update_status([post_id], status)
+        await moderation_claims.release(post_id, claim.moderator_id)
+    except Exception as db_error:
+        logger.error(f"Database error updating post {post_id}: {db_error}")
+        await update.message.reply_text("❌ Ошибка обновления статуса заявки")
+        return False
+    
+    if not updated:
+        if skipped.get(post_id) is None:
+            logger.error(f"Post {post_id} not found for status update")
+            await update.message.reply_text("❌ Заявка не найдена")
+        else:
+            await update.message.reply_text(f"⏭️ Заявка #{post_id} уже обработана")
+        return False
+    
+    logger.info(f"Updated post {post_id} status to {status.value}")
+    return True
 
-async def process_approve_with_link(update: Update, context: ContextTypes.DEFAULT_TYPE):
+async def process_approve_with_link(update: Update, context: ContextTypes.DEFAULT_TYPE, claim, link: str):
     """Process approval with publication link"""
     try:
-        link = update.message.text.strip()
-        post_id = context.user_data.get('mod_post_id')
-        user_id = context.user_data.get('mod_post_user_id')
-        is_chat = context.user_data.get('mod_is_chat', False)
+        post_id = claim.post_id
+        user_id = claim.post_user_id
+        is_chat = claim.is_chat
         
         logger.info(f"Processing approval: post_id={post_id}, user_id={user_id}, link={link}")
         
-        if not post_id or not user_id:
-            await update.message.reply_text("❌ Ошибка: данные заявки не найдены")
+        if not link:
+            await update.message.reply_text("❌ Отправьте ссылку на публикацию")
             return
         
-        # Update post status in DB - ИСПРАВЛЕНО: используем правильные значения enum
-        try:
-            from services.db import db
-            from models import Post, PostStatus
-            from sqlalchemy import select
-            
-            async with db.get_session() as session:
-                result = await session.execute(
-                    select(Post).where(Post.id == post_id)
-                )
-                post = result.scalar_one_or_none()
-                
-                if post:
-                    # ИСПРАВЛЕНО: используем enum PostStatus вместо строки
-                    post.status = PostStatus.APPROVED  # Вместо 'approved'
-                    await session.commit()
-                    logger.info(f"Updated post {post_id} status to approved")
-                else:
-                    logger.error(f"Post {post_id} not found for status update")
-                    await update.message.reply_text("❌ Заявка не найдена")
-                    return
-                    
-        except Exception as db_error:
-            logger.error(f"Database error updating post {post_id}: {db_error}")
-            await update.message.reply_text("❌ Ошибка обновления статуса заявки")
+        if not await _decide_claimed_post(update, claim, PostStatus.APPROVED):
             return
         
         # Send notification to user
@@ -238,54 +237,23 @@ async def process_approve_with_link(update: Update, context: ContextTypes.DEFAUL
                 f"User ID: {user_id}\nPost ID: {post_id}"
             )
         
-        # Clear context
-        context.user_data.pop('mod_post_id', None)
-        context.user_data.pop('mod_post_user_id', None)
-        context.user_data.pop('mod_waiting_for', None)
-        context.user_data.pop('mod_is_chat', None)
-        
     except Exception as e:
         logger.error(f"Error processing approval: {e}")
         await update.message.reply_text("❌ Ошибка обработки одобрения")
 
-async def process_reject_with_reason(update: Update, context: ContextTypes.DEFAULT_TYPE):
+async def process_reject_with_reason(update: Update, context: ContextTypes.DEFAULT_TYPE, claim, reason: str):
     """Process rejection with reason"""
     try:
-        reason = update.message.text.strip()
-        post_id = context.user_data.get('mod_post_id')
-        user_id = context.user_data.get('mod_post_user_id')
+        post_id = claim.post_id
+        user_id = claim.post_user_id
         
         logger.info(f"Processing rejection: post_id={post_id}, user_id={user_id}, reason={reason[:50]}...")
         
-        if not post_id or not user_id:
-            await update.message.reply_text("❌ Ошибка: данные заявки не найдены")
+        if not reason:
+            await update.message.reply_text("❌ Напишите причину отклонения")
             return
         
-        # Update post status in DB - ИСПРАВЛЕНО: используем правильные значения enum
-        try:
-            from services.db import db
-            from models import Post, PostStatus
-            from sqlalchemy import select
-            
-            async with db.get_session() as session:
-                result = await session.execute(
-                    select(Post).where(Post.id == post_id)
-                )
-                post = result.scalar_one_or_none()
-                
-                if post:
-                    # ИСПРАВЛЕНО: используем enum PostStatus вместо строки
-                    post.status = PostStatus.REJECTED  # Вместо 'rejected'
-                    await session.commit()
-                    logger.info(f"Updated post {post_id} status to rejected")
-                else:
-                    logger.error(f"Post {post_id} not found for status update")
-                    await update.message.reply_text("❌ Заявка не найдена")
-                    return
-                    
-        except Exception as db_error:
-            logger.error(f"Database error updating post {post_id}: {db_error}")
-            await update.message.reply_text("❌ Ошибка обновления статуса заявки")
+        if not await _decide_claimed_post(update, claim, PostStatus.REJECTED):
             return
         
         # Send notification to user
@@ -315,26 +283,345 @@ async def process_reject_with_reason(update: Update, context: ContextTypes.DEFAU
                 f"User ID: {user_id}\nPost ID: {post_id}"
             )
         
-        # Clear context
-        context.user_data.pop('mod_post_id', None)
-        context.user_data.pop('mod_post_user_id', None)
-        context.user_data.pop('mod_waiting_for', None)
-        
     except Exception as e:
         logger.error(f"Error processing rejection: {e}")
         await update.message.reply_text("❌ Ошибка обработки отклонения")
 
-# Оставляем старые функции для совместимости
+async def expire_moderation_claims(context: ContextTypes.DEFAULT_TYPE):
+    """JobQueue callback: purge expired moderation leases"""
+    try:
+        purged = await moderation_claims.expire_stale()
+        if purged:
+            logger.info(f"Expired {purged} stale moderation claims")
+    except Exception as e:
+        logger.error(f"Error expiring moderation claims: {e}")
+
+# ============= ОЧЕРЕДЬ МОДЕРАЦИИ =============
+
+def _format_wait(delta) -> str:
+    """Human readable waiting time"""
+    minutes = max(0, int(delta.total_seconds()) // 60)
+    days, minutes = divmod(minutes, 24 * 60)
+    hours, minutes = divmod(minutes, 60)
+    
+    if days:
+        return f"{days} д {hours} ч"
+    if hours:
+        return f"{hours} ч {minutes} мин"
+    return f"{minutes} мин"
+
+async def load_queue_page(direction: str = None, cursor: tuple = None, page_size: int = None):
+    """
+    Load one page of pending posts with keyset pagination on (created_at, id).
+    Single query over the partial ix_posts_pending; the oldest waiting time comes
+    from a scalar subquery (index min lookup), not from a separate COUNT/scan.
+    Returns: (rows, oldest_created_at, has_prev, has_next)
+    """
+    page_size = page_size or Config.MODERATION_QUEUE_PAGE_SIZE
+    
+    oldest = (
+        select(func.min(Post.created_at))
+        .where(Post.status == PostStatus.PENDING)
+        .scalar_subquery()
+    )
+    
+    stmt = select(
+        Post.id,
+        Post.user_id,
+        Post.category,
+        Post.subcategory,
+        Post.created_at,
+        oldest.label('oldest')
+    ).where(Post.status == PostStatus.PENDING)
+    
+    backwards = direction == 'p' and cursor is not None
+    
+    if cursor is not None:
+        key = tuple_(Post.created_at, Post.id)
+        if backwards:
+            stmt = stmt.where(key < tuple_(*cursor))
+        else:
+            stmt = stmt.where(key > tuple_(*cursor))
+    
+    if backwards:
+        stmt = stmt.order_by(Post.created_at.desc(), Post.id.desc())
+    else:
+        stmt = stmt.order_by(Post.created_at, Post.id)
+    
+    stmt = stmt.limit(page_size + 1)
+    
+    async with db.get_session() as session:
+        rows = (await session.execute(stmt)).all()
+    
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    
+    if backwards:
+        rows.reverse()
+        has_prev, has_next = has_more, True
+    else:
+        has_prev, has_next = cursor is not None, has_more
+    
+    oldest_created_at = rows[0].oldest if rows else None
+    return rows, oldest_created_at, has_prev, has_next
+
+async def show_queue_page(update: Update, context: ContextTypes.DEFAULT_TYPE,
+                          direction: str = None, cursor: tuple = None):
+    """Render pending posts page with approve/reject and next/prev buttons"""
+    try:
+        rows, oldest, has_prev, has_next = await load_queue_page(direction, cursor)
+    except Exception as e:
+        logger.error(f"Error loading moderation queue: {e}")
+        if update.callback_query:
+            await callback_router.answer(update, "❌ Ошибка базы данных", show_alert=True)
+        else:
+            await update.effective_message.reply_text("❌ Ошибка загрузки очереди")
+        return
+    
+    now = datetime.utcnow()
+    
+    if not rows and cursor is None:
+        text = "📭 Очередь модерации пуста"
+        keyboard = [[InlineKeyboardButton("🔄 Обновить", callback_data=encode('mod', 'queue'))]]
+    else:
+        text = "📥 Очередь модерации\n\n"
+        if oldest:
+            text += f"⏳ Дольше всех ждёт: {_format_wait(now - oldest)}\n\n"
+        
+        keyboard = []
+        for row in rows:
+            section = row.category or 'Unknown'
+            if row.subcategory:
+                section += f" → {row.subcategory}"
+            text += f"#{row.id} · {_format_wait(now - row.created_at)} · {section} · ID {row.user_id}\n"
+            
+            approve_action = "approve_chat" if row.category == '⚡️Актуальное' else "approve"
+            keyboard.append([
+                InlineKeyboardButton(f"✅ #{row.id}", callback_data=encode('mod', approve_action, row.id)),
+                InlineKeyboardButton(f"❌ #{row.id}", callback_data=encode('mod', 'reject', row.id))
+            ])
+        
+        if not rows:
+            text += "На этой странице заявок больше нет\n"
+        else:
+            text += "\n💡 Массово: /bulk approve|reject ID..."
+        
+        nav = []
+        if has_prev and rows:
+            nav.append(InlineKeyboardButton(
+                "◀️", callback_data=encode('mod', 'queue', 'p', rows[0].created_at, rows[0].id)
+            ))
+        nav.append(InlineKeyboardButton("🔄", callback_data=encode('mod', 'queue')))
+        if has_next and rows:
+            nav.append(InlineKeyboardButton(
+                "▶️", callback_data=encode('mod', 'queue', 'n', rows[-1].created_at, rows[-1].id)
+            ))
+        keyboard.append(nav)
+    
+    try:
+        if update.callback_query:
+            await update.callback_query.edit_message_text(
+                text,
+                reply_markup=InlineKeyboardMarkup(keyboard)
+            )
+        else:
+            await update.effective_message.reply_text(
+                text,
+                reply_markup=InlineKeyboardMarkup(keyboard)
+            )
+    except Exception as e:
+        logger.error(f"Error showing moderation queue: {e}")
+
+@moderator_only
+async def queue_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle /queue command - list pending posts oldest first"""
+    await show_queue_page(update, context)
+
+# ============= МАССОВАЯ МОДЕРАЦИЯ =============
+
+def parse_post_ids(tokens, limit: int) -> list:
+    """Parse '12 15 20-25' into a sorted list of unique post IDs"""
+    ids = set()
+    for token in tokens:
+        for part in token.split(','):
+            part = part.strip()
+            if not part:
+                continue
+            if '-' in part:
+                start, _, end = part.partition('-')
+                if not (start.isdigit() and end.isdigit()):
+                    raise ValueError(part)
+                start, end = int(start), int(end)
+                if end < start or end - start >= limit:
+                    raise ValueError(part)
+                ids.update(range(start, end + 1))
+            elif part.isdigit():
+                ids.add(int(part))
+            else:
+                raise ValueError(part)
+            if len(ids) > limit:
+                raise OverflowError(limit)
+    return sorted(ids)
+
+def _id_in(name: str, ids: list):
+    """Post.id in ids as one array parameter - the SQL text doesn't depend on the list length"""
+    if db.is_sqlite:
+        return Post.id.in_(ids)
+    return Post.id == any_(bindparam(name, value=ids, type_=ARRAY(Integer)))
+
+async def bulk_update_status(post_ids: list, status):
+    """
+    Move pending posts to a new status in one UPDATE ... WHERE id = ANY(:ids)
+    (IN (...) on SQLite, which has no arrays).
+    Only PENDING rows are touched, so already decided posts are never re-processed.
+    Returns: (updated rows [(id, user_id, category)], {post_id: current status or None})
+    """
+    stmt = (
+        update(Post)
+        .where(_id_in('ids', post_ids))
+        .where(Post.status == PostStatus.PENDING)
+        .values(status=status)
+        .returning(Post.id, Post.user_id, Post.category)
+        .execution_options(synchronize_session=False)
+    )
+    
+    async with db.get_session() as session:
+        updated = (await session.execute(stmt)).all()
+        
+        skipped = {}
+        leftover = sorted(set(post_ids) - {row.id for row in updated})
+        if leftover:
+            result = await session.execute(
+                select(Post.id, Post.status).where(_id_in('leftover', leftover))
+            )
+            found = dict(result.all())
+            skipped = {post_id: found.get(post_id) for post_id in leftover}
+    
+    return updated, skipped
+
+@moderator_only
+async def bulk_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle /bulk approve|reject <ids> [| причина] - moderate many posts at once"""
+    usage = (
+        "📝 Использование:\n"
+        "/bulk approve 12 15 20-25\n"
+        "/bulk reject 12 15 | причина отклонения\n\n"
+        "ID заявок можно посмотреть в /queue"
+    )
+    
+    raw = ' '.join(context.args or [])
+    ids_part, _, reason = raw.partition('|')
+    tokens = ids_part.split()
+    
+    if len(tokens) < 2 or tokens[0].lower() not in ('approve', 'reject'):
+        await update.message.reply_text(usage)
+        return
+    
+    approve = tokens[0].lower() == 'approve'
+    reason = reason.strip()
+    
+    if not approve and not reason:
+        await update.message.reply_text("❌ Для отклонения укажите причину после символа |\n\n" + usage)
+        return
+    
+    try:
+        post_ids = parse_post_ids(tokens[1:], Config.MODERATION_BULK_LIMIT)
+    except OverflowError:
+        await update.message.reply_text(f"❌ Не больше {Config.MODERATION_BULK_LIMIT} заявок за раз")
+        return
+    except ValueError as e:
+        await update.message.reply_text(f"❌ Некорректный ID или диапазон: {e}")
+        return
+    
+    if not post_ids:
+        await update.message.reply_text(usage)
+        return
+    
+    new_status = PostStatus.APPROVED if approve else PostStatus.REJECTED
+    
+    try:
+        updated, skipped = await bulk_update_status(post_ids, new_status)
+    except Exception as db_error:
+        logger.error(f"Database error in bulk moderation: {db_error}")
+        await update.message.reply_text("❌ Ошибка обновления статуса заявок")
+        return
+    
+    logger.info(
+        f"Bulk {new_status.value} by {update.effective_user.id}: "
+        f"{len(updated)} updated, {len(skipped)} skipped"
+    )
+    
+    # Уведомляем авторов через ограничитель скорости
+    messages = []
+    for row in updated:
+        if approve:
+            destination_text = "чате" if row.category == '⚡️Актуальное' else "канале"
+            text = (
+                f"✅ Ваша заявка одобрена!\n\n"
+                f"📝 Ваш пост будет опубликован в {destination_text}.\n\n"
+                f"🔔 Подписывайтесь на наши каналы:"
+            )
+            keyboard = [
+                [InlineKeyboardButton("📺 Наш канал", url="https://t.me/snghu")],
+                [InlineKeyboardButton("📚 Каталог услуг", url="https://t.me/trixvault")]
+            ]
+            messages.append((row.user_id, text, {'reply_markup': InlineKeyboardMarkup(keyboard)}))
+        else:
+            text = (
+                f"❌ Ваша заявка отклонена\n\n"
+                f"📝 Причина:\n{reason}\n\n"
+                f"💡 Вы можете создать новую заявку, учтя указанные замечания."
+            )
+            messages.append((row.user_id, text, None))
+    
+    results = await notifier.send_many(context.bot, messages)
+    
+    # Сводка по каждой заявке
+    status_names = {
+        PostStatus.PENDING: "на модерации",
+        PostStatus.APPROVED: "уже одобрена",
+        PostStatus.REJECTED: "уже отклонена"
+    }
+    
+    lines = []
+    failed = 0
+    for row, result in zip(updated, results):
+        if result.ok:
+            lines.append(f"#{row.id} ✅ уведомление отправлено")
+        else:
+            failed += 1
+            lines.append(f"#{row.id} ⚠️ не уведомлен ({result.error})")
+    for post_id, status in skipped.items():
+        lines.append(f"#{post_id} ⏭️ {status_names.get(status, 'не найдена')}")
+    
+    title = "✅ МАССОВОЕ ОДОБРЕНИЕ" if approve else "❌ МАССОВОЕ ОТКЛОНЕНИЕ"
+    summary = (
+        f"{title}\n\n"
+        f"📊 Обработано: {len(updated)} из {len(post_ids)}\n"
+        f"⏭️ Пропущено: {len(skipped)}\n"
+        f"⚠️ Без уведомления: {failed}\n"
+    )
+    if not approve:
+        summary += f"📝 Причина: {reason}\n"
+    
+    shown = lines[:50]
+    summary += "\n" + "\n".join(shown)
+    if len(lines) > len(shown):
+        summary += f"\n... и ещё {len(lines) - len(shown)}"
+    
+    await update.message.reply_text(summary)
+
+# Кнопки заявок (маршруты mod:approve / mod:approve_chat / mod:reject)
 async def approve_post(update: Update, context: ContextTypes.DEFAULT_TYPE, post_id: int):
-    """Legacy function - redirects to new process"""
+    """Approve button - starts the approve process"""
     await start_approve_process(update, context, post_id)
 
 async def approve_post_to_chat(update: Update, context: ContextTypes.DEFAULT_TYPE, post_id: int):
-    """Legacy function - redirects to new process"""
+    """Approve to chat button (Актуальное)"""
     await start_approve_process(update, context, post_id, chat=True)
 
 async def reject_post(update: Update, context: ContextTypes.DEFAULT_TYPE, post_id: int):
-    """Legacy function - redirects to new process"""
+    """Reject button - starts the reject process"""
     await start_reject_process(update, context, post_id)
 
 async def publish_to_channel(bot, post):
@@ -344,3 +631,12 @@ async def publish_to_channel(bot, post):
 async def publish_to_chat(bot, post):
     """Publish post to target CHAT - DEPRECATED"""
     logger.warning("publish_to_chat called but manual publication is now used")
+
+# ============= CALLBACK ROUTES =============
+
+callback_router.guard('mod', Config.is_moderator)
+callback_router.route('mod:queue', show_queue_callback)
+callback_router.route('mod:approve', approve_post)
+callback_router.route('mod:approve_chat', approve_post_to_chat)
+callback_router.route('mod:reject', reject_post)
+callback_router.route('mod:edit', edit_post_callback)
@@ -2,8 +2,10 @@ from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, InputMe
 from telegram.ext import ContextTypes
 from config import Config
 from services.db import db
-from models import User, Post
-from sqlalchemy import select
+from services.albums import albums
+from services.callbacks import callback_router, encode
+from services.repository import fetch_user, UserRow
+from models import Post
 import logging
 
 logger = logging.getLogger(__name__) 
@@ -71,31 +73,6 @@ PIAR_STEPS = [
         "💭 Начнем с описания ваших услуг. *Добавьте текст*:"
     )
 ]
-async def handle_piar_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Handle piar callbacks"""
-    query = update.callback_query
-    await query.answer()
-    
-    data = query.data.split(":")
-    action = data[1] if len(data) > 1 else None
-    
-    if action == "preview":
-        await show_piar_preview(update, context)
-    elif action == "send":
-        await send_piar_to_moderation(update, context)
-    elif action == "edit":
-        await restart_piar_form(update, context)
-    elif action == "cancel":
-        await cancel_piar(update, context)
-    elif action == "add_photo":
-        await request_piar_photo(update, context)
-    elif action == "skip_photo":
-        await show_piar_preview(update, context)
-    elif action == "next_photo":
-        await show_piar_preview(update, context)
-    elif action == "back":
-        await go_back_step(update, context)
-
 async def handle_piar_text(update: Update, context: ContextTypes.DEFAULT_TYPE, 
                            field: str, value: str):
     """Handle text input for piar form"""
@@ -229,6 +206,18 @@ async def handle_piar_photo(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if 'piar_data' not in context.user_data:
         return
     
+    # Альбом добавляем целиком одним ответом
+    async def add_album(messages):
+        await add_piar_media(messages, context)
+    
+    if not albums.add(update.message, add_album):
+        await add_piar_media([update.message], context)
+
+async def add_piar_media(messages, context: ContextTypes.DEFAULT_TYPE):
+    """Add photos/videos of one message or a whole album and acknowledge once"""
+    if 'piar_data' not in context.user_data:
+        return
+    
     if 'photos' not in context.user_data['piar_data']:
         context.user_data['piar_data']['photos'] = []
     
@@ -239,20 +228,23 @@ async def handle_piar_photo(update: Update, context: ContextTypes.DEFAULT_TYPE):
     media = context.user_data['piar_data']['media']
     
     if len(photos) >= Config.MAX_PHOTOS_PIAR:
-        await update.message.reply_text(
+        await messages[-1].reply_text(
             f"💿 Не вмещается, максимум {Config.MAX_PHOTOS_PIAR} фотографии"
         )
         return
     
-    media_added = False
-    if update.message.photo:
-        photos.append(update.message.photo[-1].file_id)
-        media.append({'type': 'photo', 'file_id': update.message.photo[-1].file_id})
-        media_added = True
-    elif update.message.video:
-        photos.append(update.message.video.file_id)
-        media.append({'type': 'video', 'file_id': update.message.video.file_id})
-        media_added = True
+    media_added = 0
+    for message in messages:
+        if len(photos) >= Config.MAX_PHOTOS_PIAR:
+            break
+        if message.photo:
+            photos.append(message.photo[-1].file_id)
+            media.append({'type': 'photo', 'file_id': message.photo[-1].file_id})
+            media_added += 1
+        elif message.video:
+            photos.append(message.video.file_id)
+            media.append({'type': 'video', 'file_id': message.video.file_id})
+            media_added += 1
     
     if media_added:
         remaining = Config.MAX_PHOTOS_PIAR - len(photos)
@@ -273,7 +265,7 @@ async def handle_piar_photo(update: Update, context: ContextTypes.DEFAULT_TYPE):
         keyboard.append([InlineKeyboardButton("🔙 Вернуться назад", callback_data="piar:back")])
         keyboard.append([InlineKeyboardButton("👹 Отмена", callback_data="piar:cancel")])
         
-        await update.message.reply_text(
+        await messages[-1].reply_text(
             f"🎬 Добавлено (Файлов: {len(photos)})\n\n"
             f"🏞️ Добавим еще медиа❔ Предпросмотр❓",
             reply_markup=InlineKeyboardMarkup(keyboard)
@@ -392,10 +384,7 @@ async def send_piar_to_moderation(update: Update, context: ContextTypes.DEFAULT_
     try:
         async with db.get_session() as session:
             # Get user
-            result = await session.execute(
-                select(User).where(User.id == user_id)
-            )
-            user = result.scalar_one_or_none()
+            user = await fetch_user(session, user_id)
             
             if not user:
                 await update.callback_query.edit_message_text(
@@ -471,7 +460,7 @@ async def send_piar_to_moderation(update: Update, context: ContextTypes.DEFAULT_
         )
 
 async def send_piar_to_mod_group_safe(update: Update, context: ContextTypes.DEFAULT_TYPE,
-                                     post: Post, user: User, data: dict):
+                                     post: Post, user: UserRow, data: dict):
     """Send piar to moderation group with safe text handling"""
     bot = context.bot
     
@@ -527,8 +516,8 @@ async def send_piar_to_mod_group_safe(update: Update, context: ContextTypes.DEFA
     # ИСПРАВЛЕННЫЕ КНОПКИ - убираем кнопку "Написать автору" которая вызывает ошибку
     keyboard = [
         [
-            InlineKeyboardButton("✅ Опубликовать", callback_data=f"mod:approve:{post.id}"),
-            InlineKeyboardButton("❌ Отклонить", callback_data=f"mod:reject:{post.id}")
+            InlineKeyboardButton("✅ Опубликовать", callback_data=encode('mod', 'approve', post.id)),
+            InlineKeyboardButton("❌ Отклонить", callback_data=encode('mod', 'reject', post.id))
         ]
     ]
     
@@ -680,3 +669,14 @@ async def cancel_piar(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     from handlers.start_handler import show_main_menu
     await show_main_menu(update, context)
+
+# ============= CALLBACK ROUTES =============
+
+callback_router.route('piar:preview', show_piar_preview)
+callback_router.route('piar:send', send_piar_to_moderation)
+callback_router.route('piar:edit', restart_piar_form)
+callback_router.route('piar:cancel', cancel_piar)
+callback_router.route('piar:add_photo', request_piar_photo)
+callback_router.route('piar:skip_photo', show_piar_preview)
+callback_router.route('piar:next_photo', show_piar_preview)
+callback_router.route('piar:back', go_back_step)
@@ -1,5 +1,11 @@
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
+from services.db import db
+from services.xp import xp_engine
+from services.referrals import referrals
+from services.callbacks import callback_router
+from models import User
+from sqlalchemy import select
 import logging
 
 logger = logging.getLogger(__name__)
@@ -24,11 +30,7 @@ async def show_profile(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     # Пытаемся получить данные из БД, но не падаем если ошибка
     try:
-        from services.db import db
-        from models import User
-        from sqlalchemy import select
-        
-        async with db.get_session() as session:
+        async with db.get_read_session(user.id) as session:
             result = await session.execute(
                 select(User).where(User.id == user.id)
             )
@@ -36,6 +38,15 @@ async def show_profile(update: Update, context: ContextTypes.DEFAULT_TYPE):
             
             if db_user:
                 profile_text += f"📅 Регистрация: {db_user.created_at.strftime('%d.%m.%Y')}\n"
+                
+                level = xp_engine.level_info(xp_engine.total_xp(db_user.xp, user.id))
+                profile_text += f"⭐ Уровень: {level['name']} ({level['xp']} XP"
+                profile_text += f", до следующего {level['to_next']})\n" if level['to_next'] else ")\n"
+                
+                if db_user.referral_code:
+                    invited = await referrals.count(user.id)
+                    profile_text += f"🔗 Приглашение: `https://t.me/{context.bot.username}?start={db_user.referral_code}`\n"
+                    profile_text += f"👥 Приглашено: {invited}\n"
             
     except Exception as e:
         logger.warning(f"Could not load profile data from DB: {e}")
@@ -64,9 +75,6 @@ async def show_profile(update: Update, context: ContextTypes.DEFAULT_TYPE):
             reply_markup=InlineKeyboardMarkup(keyboard)
         )
 
-async def handle_profile_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Handle profile callbacks"""
-    query = update.callback_query
-    await query.answer()
-    
-    await show_profile(update, context)
+# ============= CALLBACK ROUTES =============
+
+callback_router.route('profile', show_profile)
@@ -3,70 +3,33 @@ from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, InputMe
 from telegram.ext import ContextTypes
 from config import Config
 from services.db import db
-from services.cooldown import CooldownService
-from services.hashtags import HashtagService
-from services.filter_service import FilterService
-from models import User, Post, PostStatus
-from sqlalchemy import select
+from services.container import get_service
+from services.albums import albums
+from services.menu import menu
+from services.callbacks import callback_router, encode
+from services.repository import fetch_user, UserRow
+from models import Post, PostStatus
 from datetime import datetime
 import logging
 
 logger = logging.getLogger(__name__)
 
-async def handle_publication_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Handle publication callbacks"""
-    query = update.callback_query
-    await query.answer()
-    
-    data = query.data.split(":")
-    action = data[1] if len(data) > 1 else None
-    
-    if action == "cat":
-        # Subcategory selected
-        subcategory = data[2] if len(data) > 2 else None
-        await start_post_creation(update, context, subcategory)
-    elif action == "preview":
-        await show_preview(update, context)
-    elif action == "send":
-        await send_to_moderation(update, context)
-    elif action == "edit":
-        await edit_post(update, context)
-    elif action == "cancel":
-        await cancel_post_with_reason(update, context)
-    elif action == "cancel_confirm":
-        await cancel_post(update, context)
-    elif action == "add_media":
-        await request_media(update, context)
-    elif action == "back":
-        # Возврат к предпросмотру
-        await show_preview(update, context)
-
-async def start_post_creation(update: Update, context: ContextTypes.DEFAULT_TYPE, subcategory: str):
+async def start_post_creation(update: Update, context: ContextTypes.DEFAULT_TYPE, subcategory: str = None):
     """Start creating a post with selected subcategory"""
-    subcategory_names = {
-        'work': '👷 Работа',
-        'rent': '🏚️ Аренда',
-        'buy': '🕵🏻‍♀️ Куплю',
-        'sell': '🕵🏽 Продам',
-        'events': '🎉 События',
-        'free': '🕵🏼 Отдам даром',
-        'important': '‼️ Важно',
-        'other': '❔ Другое'
-    }
+    # Подкатегории объявлений - из Config.PUBLICATION_TREE
+    section = menu.section(subcategory) or menu.section('other')
     
     # Сохраняем данные поста
     context.user_data['post_data'] = {
-        'category': '🗯️ Будапешт',
-        'subcategory': subcategory_names.get(subcategory, '❔ Другое'),
-        'anonymous': False
+        'category': section.category,
+        'subcategory': section.label,
+        'anonymous': section.anonymous
     }
-
-    keyboard = [[InlineKeyboardButton("⏮️ Вернуться", callback_data="menu:announcements")]]
     
     await update.callback_query.edit_message_text(
-        f"🗯️ Будапешт → ‼️ Объявления → {subcategory_names.get(subcategory)}\n\n"
+        f"{' → '.join(section.path)}\n\n"
         "💥 Напишите текст, добавьте фото, видео контент:",
-        reply_markup=InlineKeyboardMarkup(keyboard),
+        reply_markup=menu.back("menu:announcements", "⏮️ Вернуться"),
         parse_mode='Markdown'
     )
     
@@ -85,7 +48,7 @@ async def handle_text_input(update: Update, context: ContextTypes.DEFAULT_TYPE):
         # Если ждём текст поста
         if context.user_data.get('waiting_for') == 'post_text':
             # Проверяем на запрещённые ссылки
-            filter_service = FilterService()
+            filter_service = get_service(context, 'filter')
             if filter_service.contains_banned_link(text) and not Config.is_moderator(update.effective_user.id):
                 await handle_link_violation(update, context)
                 return
@@ -145,7 +108,7 @@ async def handle_text_input(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     if waiting_for == 'post_text':
         # Check for links
-        filter_service = FilterService()
+        filter_service = get_service(context, 'filter')
         if filter_service.contains_banned_link(text) and not Config.is_moderator(update.effective_user.id):
             await handle_link_violation(update, context)
             return
@@ -192,38 +155,37 @@ async def handle_media_input(update: Update, context: ContextTypes.DEFAULT_TYPE)
     if 'post_data' not in context.user_data:
         return
     
+    # Альбом добавляем целиком одним ответом
+    async def add_album(messages):
+        await add_post_media(messages, context)
+    
+    if not albums.add(update.message, add_album):
+        await add_post_media([update.message], context)
+
+def media_item(message) -> dict:
+    """Photo / video / document of a message as a post media entry"""
+    if message.photo:
+        # Get highest quality photo
+        return {'type': 'photo', 'file_id': message.photo[-1].file_id}
+    if message.video:
+        return {'type': 'video', 'file_id': message.video.file_id}
+    if message.document:
+        return {'type': 'document', 'file_id': message.document.file_id}
+    return None
+
+async def add_post_media(messages, context: ContextTypes.DEFAULT_TYPE):
+    """Add media of one message or a whole album and acknowledge once"""
+    if 'post_data' not in context.user_data:
+        return
+    
     # Принимаем медиа даже если waiting_for не установлен
     if 'media' not in context.user_data['post_data']:
         context.user_data['post_data']['media'] = []
     
-    media_added = False
-    
-    if update.message.photo:
-        # Get highest quality photo
-        context.user_data['post_data']['media'].append({
-            'type': 'photo',
-            'file_id': update.message.photo[-1].file_id
-        })
-        media_added = True
-        logger.info(f"Added photo: {update.message.photo[-1].file_id}")
-        
-    elif update.message.video:
-        context.user_data['post_data']['media'].append({
-            'type': 'video',
-            'file_id': update.message.video.file_id
-        })
-        media_added = True
-        logger.info(f"Added video: {update.message.video.file_id}")
-        
-    elif update.message.document:
-        context.user_data['post_data']['media'].append({
-            'type': 'document',
-            'file_id': update.message.document.file_id
-        })
-        media_added = True
-        logger.info(f"Added document: {update.message.document.file_id}")
-    
-    if media_added:
+    items = [item for item in map(media_item, messages) if item]
+    context.user_data['post_data']['media'].extend(items)
+    if items:
+        logger.info(f"Added {len(items)} media: {', '.join(item['type'] for item in items)}")
         total_media = len(context.user_data['post_data']['media'])
         
         keyboard = [
@@ -234,7 +196,7 @@ async def handle_media_input(update: Update, context: ContextTypes.DEFAULT_TYPE)
             [InlineKeyboardButton("🚶 Назад", callback_data="menu:back")]
         ]
         
-        await update.message.reply_text(
+        await messages[-1].reply_text(
             f"✅ Медиа получено! (Всего: {total_media})\n\n"
             "💚 Добавить еще или смотреть результат?",
             reply_markup=InlineKeyboardMarkup(keyboard)
@@ -262,7 +224,7 @@ async def show_preview(update: Update, context: ContextTypes.DEFAULT_TYPE):
     post_data = context.user_data['post_data']
     
     # Generate hashtags
-    hashtag_service = HashtagService()
+    hashtag_service = get_service(context, 'hashtags')
     
     # Специальные хештеги для Актуального
     if post_data.get('is_actual'):
@@ -347,10 +309,7 @@ async def send_to_moderation(update: Update, context: ContextTypes.DEFAULT_TYPE)
     try:
         async with db.get_session() as session:
             # Get user
-            result = await session.execute(
-                select(User).where(User.id == user_id)
-            )
-            user = result.scalar_one_or_none()
+            user = await fetch_user(session, user_id)
             
             if not user:
                 await update.callback_query.edit_message_text(
@@ -359,8 +318,7 @@ async def send_to_moderation(update: Update, context: ContextTypes.DEFAULT_TYPE)
                 return
             
             # ИСПРАВЛЕНИЕ: проверяем кулдаун правильно - с await
-            from services.cooldown import CooldownService
-            cooldown_service = CooldownService()
+            cooldown_service = get_service(context, 'cooldown')
             
             try:
                 can_post, remaining_seconds = await cooldown_service.can_post(user_id)
@@ -390,6 +348,7 @@ async def send_to_moderation(update: Update, context: ContextTypes.DEFAULT_TYPE)
             
             session.add(post)
             await session.commit()
+            db.pin_primary(user_id)
             
             # Send to moderation
             await send_to_moderation_group(update, context, post, user)
@@ -416,7 +375,7 @@ async def send_to_moderation(update: Update, context: ContextTypes.DEFAULT_TYPE)
         )
 
 async def send_to_moderation_group(update: Update, context: ContextTypes.DEFAULT_TYPE, 
-                                   post: Post, user: User):
+                                   post: Post, user: UserRow):
     """Send post to moderation group with safe markdown parsing"""
     bot = context.bot
     
@@ -495,15 +454,15 @@ async def send_to_moderation_group(update: Update, context: ContextTypes.DEFAULT
     if is_actual:
         keyboard = [
             [
-                InlineKeyboardButton("✅ В ЧАТ + ЗАКРЕПИТЬ", callback_data=f"mod:approve_chat:{post.id}"),
-                InlineKeyboardButton("❌ Отклонить", callback_data=f"mod:reject:{post.id}")
+                InlineKeyboardButton("✅ В ЧАТ + ЗАКРЕПИТЬ", callback_data=encode('mod', 'approve_chat', post.id)),
+                InlineKeyboardButton("❌ Отклонить", callback_data=encode('mod', 'reject', post.id))
             ]
         ]
     else:
         keyboard = [
             [
-                InlineKeyboardButton("✅ Опубликовать", callback_data=f"mod:approve:{post.id}"),
-                InlineKeyboardButton("❌ Отклонить", callback_data=f"mod:reject:{post.id}")
+                InlineKeyboardButton("✅ Опубликовать", callback_data=encode('mod', 'approve', post.id)),
+                InlineKeyboardButton("❌ Отклонить", callback_data=encode('mod', 'reject', post.id))
             ]
         ]
     
@@ -660,3 +619,14 @@ async def cancel_post(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     from handlers.start_handler import show_main_menu
     await show_main_menu(update, context)
+
+# ============= CALLBACK ROUTES =============
+
+callback_router.route('pub:cat', start_post_creation)
+callback_router.route('pub:preview', show_preview)
+callback_router.route('pub:send', send_to_moderation)
+callback_router.route('pub:edit', edit_post)
+callback_router.route('pub:cancel', cancel_post_with_reason)
+callback_router.route('pub:cancel_confirm', cancel_post)
+callback_router.route('pub:add_media', request_media)
+callback_router.route('pub:back', show_preview)  # возврат к предпросмотру
@@ -3,19 +3,23 @@
 
 import logging
 import os
-import random
 import asyncio
-import json
 from datetime import datetime, timedelta
 from telegram.ext import (
     Application, 
+    CallbackContext, 
     CommandHandler, 
-    CallbackQueryHandler, 
     MessageHandler,
     filters
 )
 from telegram import InlineKeyboardMarkup, InlineKeyboardButton, ChatMember
 from dotenv import load_dotenv
+from services.leaderboard import leaderboards
+from services.roll_numbers import roll_numbers
+from services.word_games import word_games
+from services.container import services
+from services.expiring import ExpiringDict, timer_wheel
+from config import Config
 
 load_dotenv()
 
@@ -32,45 +36,9 @@ MODERATION_GROUP_ID = -1002734837434  # ID группы модерации
 
 # ============= ИГРОВЫЕ ДАННЫЕ =============
 
-# Система игры "Угадай слово"
-word_games = {
-    'play3xia': {
-        'words': {}, 
-        'current_word': None, 
-        'active': False, 
-        'winners': [], 
-        'interval': 60,
-        'description': 'Конкурс пока не активен',
-        'media_url': None
-    },
-    'play3x': {
-        'words': {}, 
-        'current_word': None, 
-        'active': False, 
-        'winners': [], 
-        'interval': 60,
-        'description': 'Конкурс пока не активен',
-        'media_url': None
-    },
-    'playxxx': {
-        'words': {}, 
-        'current_word': None, 
-        'active': False, 
-        'winners': [], 
-        'interval': 60,
-        'description': 'Конкурс пока не активен',
-        'media_url': None
-    }
-}
-
-user_attempts = {}  # {user_id: {game_version: last_attempt_time}}
+# Система игры "Угадай слово" - services.word_games.word_games (общая с handlers/games_handler.py)
 
-# Система розыгрыша номеров
-roll_games = {
-    'play3xia': {'participants': {}, 'active': True},
-    'play3x': {'participants': {}, 'active': True},
-    'playxxx': {'participants': {}, 'active': True}
-}
+# Система розыгрыша номеров - services.roll_numbers.roll_numbers (общая с handlers/games_handler.py)
 
 # Ссылки
 trix_links = [
@@ -83,8 +51,8 @@ trix_links = [
 # Участники розыгрыша (основной)
 lottery_participants = {}
 
-# Пользователи ожидающие ввода для ссылок
-waiting_users = {}
+# Пользователи ожидающие ввода для ссылок (брошенный ввод забывается)
+waiting_users = ExpiringDict(Config.WAITING_INPUT_TTL, name='waiting_users')
 
 # Данные пользователей для статистики
 user_data = {}  # {user_id: {username, join_date, last_activity, message_count, banned, muted_until}}
@@ -105,6 +73,75 @@ autopost_data = {
     'last_post': None
 }
 
+# ============= СЕРВИСЫ БД =============
+
+# Сервисы из services/ подключаются лениво: без DATABASE_URL бот работает только в памяти
+_db_services = {}
+
+def get_db_service(module, name):
+    """Глобальный объект из services.<module> или None, если БД не настроена"""
+    key = (module, name)
+    if key not in _db_services:
+        _db_services[key] = None
+        if os.getenv("DATABASE_URL"):
+            try:
+                _db_services[key] = getattr(__import__(f"services.{module}", fromlist=[name]), name)
+            except Exception as e:
+                logger.warning(f"Сервис services.{module}.{name} недоступен: {e}")
+    return _db_services[key]
+
+# Периодические задачи (JobQueue требует python-telegram-bot[job-queue], его нет в requirements.txt)
+_background_tasks = []
+
+def run_repeating(application, callback, interval):
+    """Вызывать callback(context) каждые interval секунд до post_shutdown"""
+    async def repeat():
+        context = CallbackContext(application)
+        while True:
+            await asyncio.sleep(interval)
+            await callback(context)
+    
+    _background_tasks.append(asyncio.get_running_loop().create_task(repeat()))
+
+async def post_init(application):
+    """Подключение к БД после старта приложения"""
+    db = get_db_service('db', 'db')
+    if db:
+        try:
+            await db.init()
+            await leaderboards.load()
+            await roll_numbers.load()
+            await word_games.load()
+            
+            # Просроченные заявки модераторов (брошенный ввод ссылки/причины)
+            from handlers.moderation_handler import expire_moderation_claims
+            run_repeating(application, expire_moderation_claims, Config.MODERATION_CLAIM_TTL)
+        except Exception as e:
+            logger.error(f"БД недоступна, данные хранятся только в памяти: {e}")
+    archiver = get_db_service('partitions', 'post_archiver')
+    if archiver:
+        archiver.start()
+    await services.start()
+
+async def post_shutdown(application):
+    """Сброс накопленных данных и закрытие БД"""
+    for task in _background_tasks:
+        task.cancel()
+    await asyncio.gather(*_background_tasks, return_exceptions=True)
+    _background_tasks.clear()
+    activity = get_db_service('activity', 'activity')
+    if activity:
+        await activity.stop()
+    archiver = get_db_service('partitions', 'post_archiver')
+    if archiver:
+        await archiver.stop()
+    await leaderboards.stop()
+    await word_games.close()
+    await services.close()
+    db = get_db_service('db', 'db')
+    if db:
+        await db.close()
+
 # ============= ВСПОМОГАТЕЛЬНЫЕ ФУНКЦИИ =============
 
 def get_game_version(command):
@@ -117,27 +154,6 @@ def get_game_version(command):
         return 'playxxx'
     return 'play3xia'
 
-def can_attempt(user_id, game_version):
-    """Проверяет интервал между попытками"""
-    if user_id not in user_attempts:
-        return True
-    if game_version not in user_attempts[user_id]:
-        return True
-    
-    last_attempt = user_attempts[user_id][game_version]
-    interval_minutes = word_games[game_version]['interval']
-    return datetime.now() - last_attempt >= timedelta(minutes=interval_minutes)
-
-def record_attempt(user_id, game_version):
-    """Записывает попытку пользователя"""
-    if user_id not in user_attempts:
-        user_attempts[user_id] = {}
-    user_attempts[user_id][game_version] = datetime.now()
-
-def normalize_word(word):
-    """Нормализует слово для сравнения"""
-    return word.lower().strip().replace('ё', 'е')
-
 def update_user_activity(user_id, username=None):
     """Обновляет активность пользователя"""
     if user_id not in user_data:
@@ -155,6 +171,19 @@ def update_user_activity(user_id, username=None):
             user_data[user_id]['username'] = username
     
     user_data[user_id]['message_count'] += 1
+    leaderboards.record(user_id, messages=1)
+    
+    # В БД уходит пачкой раз в ACTIVITY_FLUSH_INTERVAL, не на каждое сообщение
+    activity = get_db_service('activity', 'activity')
+    if activity:
+        activity.record(user_id, username)
+
+def award_xp(user_id, event):
+    """Начисляет XP за событие с учётом часового лимита"""
+    xp_engine = get_db_service('xp', 'xp_engine')
+    if xp_engine:
+        return xp_engine.award(user_id, event)
+    return 0
 
 def is_user_banned(user_id):
     """Проверяет забанен ли пользователь"""
@@ -208,6 +237,21 @@ async def check_user_membership(context, user_id):
 
 # ============= БАЗОВЫЕ КОМАНДЫ =============
 
+async def register_user(user, referral_code=None):
+    """Создаёт или обновляет строку пользователя в БД при /start, засчитывает реферала по коду из ссылки"""
+    users = get_db_service('users', 'users')
+    referrals = get_db_service('referrals', 'referrals')
+    if not users:
+        return
+    try:
+        created, code = await users.register(user.id, user.username, user.first_name, user.last_name)
+        if created and referrals:
+            referrals.remember(code, user.id)
+            if referral_code:
+                await referrals.attribute(user.id, referral_code)
+    except Exception as e:
+        logger.warning(f"Не удалось сохранить пользователя {user.id} в БД: {e}")
+
 async def start_command(update, context):
     keyboard = [
         [InlineKeyboardButton("🙅‍♂️ Будапешт - канал", url="https://t.me/snghu")],
@@ -233,6 +277,11 @@ async def start_command(update, context):
     
     user = update.effective_user
     update_user_activity(user.id, user.username)
+    await register_user(user, context.args[0] if context.args else None)
+    
+    # Меню публикаций (services.menu, маршруты menu:*) - ввод текста и медиа принимается только в личке
+    if update.effective_chat.type == 'private':
+        keyboard.append([InlineKeyboardButton("🚶‍♀️‍➡️ Писать", callback_data="menu:write")])
     
     await update.message.reply_text(
         text, 
@@ -677,20 +726,78 @@ async def stats_command(update, context):
     
     await update.message.reply_text(text, parse_mode='Markdown')
 
-async def top_command(update, context):
-    """Топ активных пользователей"""
-    if not user_data:
-        await update.message.reply_text("📝 **Нет данных о пользователях**")
+async def dbstats_command(update, context):
+    """Состояние пулов соединений с БД"""
+    if update.effective_user.id not in ADMIN_IDS:
+        await update.message.reply_text("❌ У вас нет прав для использования этой команды")
+        return
+    
+    db = get_db_service('db', 'db')
+    if not db or db.engine is None:
+        await update.message.reply_text("🗄 БД не подключена, данные хранятся в памяти")
+        return
+    
+    lines = ["🗄 Пулы соединений:"]
+    for name, stats in db.pool_stats().items():
+        health = {True: '🟢', False: '🔴', None: '⚪️'}[stats['healthy']]
+        lines.append(f"\n{health} {name} ({stats['pool']})")
+        if 'size' in stats:
+            lines.append(f"Занято: {stats['checked_out']} из {stats['size']}, переполнение: {stats['overflow']}")
+        if 'saturation' in stats:
+            lines.append(f"Загрузка: {stats['saturation']:.0%}")
+        lines.append(f"Сессий: {stats['sessions']}, выдач соединений: {stats['checkouts']}")
+        lines.append(f"Ожидание: среднее {stats['avg_wait_ms']:.1f} мс, макс {stats['max_wait_ms']:.1f} мс")
+        lines.append(f"Таймаутов: {stats['timeouts']}")
+    if db.last_health_check:
+        lines.append(f"\nПроверка: {db.last_health_check.strftime('%d.%m.%Y %H:%M:%S')} UTC")
+    
+    await update.message.reply_text("\n".join(lines))
+
+async def memstats_command(update, context):
+    """Размеры реестров в памяти и число удалённых по истечении записей"""
+    if update.effective_user.id not in ADMIN_IDS:
+        await update.message.reply_text("❌ У вас нет прав для использования этой команды")
         return
     
-    # Сортируем по количеству сообщений
-    sorted_users = sorted(user_data.items(), key=lambda x: x[1]['message_count'], reverse=True)[:10]
+    lines = ["🧠 Реестры в памяти:"]
+    for stats in timer_wheel.stats():
+        lines.append(f"• {stats['name']}: {stats['size']} записей, удалено по сроку: {stats['evicted']}")
     
-    text = "🏆 **Топ-10 активных пользователей:**\n\n"
+    await update.message.reply_text("\n".join(lines))
+
+TOP_WINDOWS = {'day': 'за сегодня', 'week': 'за неделю', 'all': 'за всё время'}
+
+async def top_command(update, context):
+    """Топ активных пользователей: /top [day|week|all] [xp]"""
+    args = [arg.lower() for arg in context.args or []]
+    window = next((arg for arg in args if arg in TOP_WINDOWS), 'all')
+    board = 'xp' if 'xp' in args else 'messages'
+    
+    top = leaderboards.top(board, window, 10)
+    if not top:
+        await update.message.reply_text("📝 **Нет данных о пользователях**", parse_mode='Markdown')
+        return
+    
+    unit = "XP" if board == 'xp' else "сообщений"
+    text = f"🏆 **Топ-10 {'по опыту' if board == 'xp' else 'активных пользователей'} {TOP_WINDOWS[window]}:**\n\n"
     
-    for i, (user_id, data) in enumerate(sorted_users, 1):
+    for i, (user_id, score) in enumerate(top, 1):
         emoji = "🥇" if i == 1 else "🥈" if i == 2 else "🥉" if i == 3 else f"{i}."
-        text += f"{emoji} @{data['username']} - {data['message_count']} сообщений\n"
+        username = user_data.get(user_id, {}).get('username', f'ID_{user_id}')
+        text += f"{emoji} @{username} - {score} {unit}\n"
+    
+    await update.message.reply_text(text, parse_mode='Markdown')
+
+async def myrank_command(update, context):
+    """Место пользователя в рейтингах"""
+    user_id = update.effective_user.id
+    
+    text = "📊 **Ваше место в рейтинге:**\n"
+    for board, title, unit in (('messages', '💬 Сообщения', 'сообщ.'), ('xp', '⭐ Опыт', 'XP')):
+        text += f"\n{title}\n"
+        for window, label in TOP_WINDOWS.items():
+            place, score, total = leaderboards.rank(user_id, board, window)
+            text += f"• {label}: " + (f"{place} из {total} ({score} {unit})" if place else "нет данных") + "\n"
     
     await update.message.reply_text(text, parse_mode='Markdown')
 
@@ -825,8 +932,13 @@ async def admin_command(update, context):
 • `/mute @user время` - временный мут (10m, 1h, 1d)
 • `/unmute @user` - снять мут
 • `/banlist` - список забаненных
+• `/queue` - очередь заявок на модерации
+• `/bulk approve|reject ID... [| причина]` - массовая модерация
 • `/stats` - статистика чата
-• `/top` - топ активных пользователей
+• `/dbstats` - пулы соединений с БД
+• `/memstats` - реестры в памяти
+• `/top [day|week|all] [xp]` - топ активных пользователей
+• `/myrank` - ваше место в рейтинге
 • `/lastseen @user` - последняя активность
 
 **Ссылки:**
@@ -882,10 +994,7 @@ async def wordadd_command(update, context):
     game_version = get_game_version(command_text)
     word = context.args[0].lower()
     
-    word_games[game_version]['words'][word] = {
-        'description': f'Угадайте слово: {word}',
-        'hints': []
-    }
+    await word_games.add_word(game_version, word)
     
     await update.message.reply_text(
         f"✅ **Слово добавлено в игру {game_version}:**\n\n"
@@ -903,7 +1012,7 @@ async def wordedit_command(update, context):
     game_version = get_game_version(command_text)
     
     if not context.args:
-        words_list = list(word_games[game_version]['words'].keys())
+        words_list = list(word_games.game(game_version).words)
         if not words_list:
             await update.message.reply_text(f"❌ Нет слов для игры {game_version}")
             return
@@ -918,7 +1027,7 @@ async def wordedit_command(update, context):
     
     word = context.args[0].lower()
     
-    if word in word_games[game_version]['words']:
+    if word in word_games.game(game_version).words:
         waiting_users[update.effective_user.id] = {
             'action': 'edit_word',
             'game_version': game_version,
@@ -941,21 +1050,19 @@ async def wordon_command(update, context):
     command_text = update.message.text
     game_version = get_game_version(command_text)
     
-    if not word_games[game_version]['words']:
+    # Выбираем случайное слово
+    current_word = await word_games.start(
+        game_version,
+        description=f"🎮 Конкурс активен! Угадайте слово используя /{game_version}say"
+    )
+    if current_word is None:
         await update.message.reply_text(f"❌ Нет слов для игры {game_version}")
         return
     
-    # Выбираем случайное слово
-    current_word = random.choice(list(word_games[game_version]['words'].keys()))
-    word_games[game_version]['current_word'] = current_word
-    word_games[game_version]['active'] = True
-    word_games[game_version]['winners'] = []
-    word_games[game_version]['description'] = f"🎮 Конкурс активен! Угадайте слово используя /{game_version}say"
-    
     await update.message.reply_text(
         f"🎮 **Конкурс {game_version} НАЧАЛСЯ!**\n\n"
         f"🎯 Используйте команду `/{game_version}say слово` для участия\n"
-        f"⏰ Интервал между попытками: {word_games[game_version]['interval']} минут",
+        f"⏰ Интервал между попытками: {word_games.game(game_version).interval} минут",
         parse_mode='Markdown'
     )
 
@@ -968,15 +1075,15 @@ async def wordoff_command(update, context):
     command_text = update.message.text
     game_version = get_game_version(command_text)
     
-    word_games[game_version]['active'] = False
-    current_word = word_games[game_version]['current_word']
-    winners = word_games[game_version]['winners']
+    game = word_games.game(game_version)
+    current_word = game.current_word
     
-    if winners:
-        winner_list = ", ".join([f"@{winner}" for winner in winners])
-        word_games[game_version]['description'] = f"🏆 Последний конкурс завершен! Победители: {winner_list}. Слово было: {current_word}"
+    if game.winners:
+        winner_list = ", ".join([f"@{winner}" for winner in game.winners])
+        description = f"🏆 Последний конкурс завершен! Победители: {winner_list}. Слово было: {current_word}"
     else:
-        word_games[game_version]['description'] = f"Конкурс завершен. Слово было: {current_word or 'не выбрано'}"
+        description = f"Конкурс завершен. Слово было: {current_word or 'не выбрано'}"
+    await word_games.stop(game_version, description=description)
     
     await update.message.reply_text(
         f"🛑 **Конкурс {game_version} ЗАВЕРШЕН!**\n\n"
@@ -989,14 +1096,14 @@ async def wordinfo_command(update, context):
     command_text = update.message.text
     game_version = get_game_version(command_text)
     
-    game_data = word_games[game_version]
+    game = word_games.game(game_version)
     
     text = f"ℹ️ **Информация о конкурсе {game_version}:**\n\n"
-    text += f"📝 {game_data['description']}\n\n"
+    text += f"📝 {game.description}\n\n"
     
-    if game_data['active']:
+    if game.active:
         text += f"🎮 Статус: Активен\n"
-        text += f"⏰ Интервал попыток: {game_data['interval']} минут\n"
+        text += f"⏰ Интервал попыток: {game.interval} минут\n"
         text += f"🎯 Команда для участия: `/{game_version}say слово`"
     else:
         text += f"🎮 Статус: Неактивен"
@@ -1017,7 +1124,7 @@ async def wordinfoedit_command(update, context):
     game_version = get_game_version(command_text)
     new_description = ' '.join(context.args)
     
-    word_games[game_version]['description'] = new_description
+    await word_games.update(game_version, description=new_description)
     
     await update.message.reply_text(
         f"✅ **Описание {game_version} изменено:**\n\n{new_description}",
@@ -1038,7 +1145,7 @@ async def anstimeset_command(update, context):
     game_version = get_game_version(command_text)
     minutes = int(context.args[0])
     
-    word_games[game_version]['interval'] = minutes
+    await word_games.update(game_version, interval=minutes)
     
     await update.message.reply_text(
         f"✅ **Интервал обновлен для {game_version}: {minutes} минут**",
@@ -1124,38 +1231,29 @@ async def game_say_command(update, context):
     
     update_user_activity(user_id, update.effective_user.username)
     
+    game = word_games.game(game_version)
+    
     # Проверяем активность игры
-    if not word_games[game_version]['active']:
+    if not game.active:
         await update.message.reply_text(f"❌ Конкурс {game_version} неактивен")
         return
     
-    # Проверяем интервал
-    if not can_attempt(user_id, game_version):
-        interval = word_games[game_version]['interval']
-        await update.message.reply_text(f"⏰ Попытка раз в {interval} минут")
+    # Проверяем интервал и ответ
+    won, wait = await word_games.guess(game_version, user_id, guess)
+    if wait:
+        await update.message.reply_text(f"⏰ Попытка раз в {game.interval} минут")
         return
     
-    record_attempt(user_id, game_version)
-    current_word = word_games[game_version]['current_word']
+    current_word = game.current_word
     
-    # Уведомляем модераторов
-    try:
-        await context.bot.send_message(
-            chat_id=MODERATION_GROUP_ID,
-            text=f"🎮 **Игровая попытка {game_version}:**\n\n"
-                 f"👤 @{username} (ID: {user_id})\n"
-                 f"🎯 Попытка: {guess}\n"
-                 f"✅ Правильный ответ: {current_word}",
-            parse_mode='Markdown'
-        )
-    except:
-        pass
+    # Попытки уходят модераторам сводкой раз в GAME_DIGEST_INTERVAL
+    word_games.report_guess(context.bot, MODERATION_GROUP_ID, game_version, user_id, username, guess, won)
     
-    # Проверяем ответ
-    if normalize_word(guess) == normalize_word(current_word):
-        word_games[game_version]['winners'].append(username)
-        word_games[game_version]['active'] = False
-        word_games[game_version]['description'] = f"🏆 @{username} угадал слово '{current_word}' и стал победителем! Ожидайте новый конкурс."
+    if won:
+        await word_games.win(
+            game_version, username,
+            description=f"🏆 @{username} угадал слово '{current_word}' и стал победителем! Ожидайте новый конкурс."
+        )
         
         await update.message.reply_text(
             f"🎉 **ПОЗДРАВЛЯЕМ!**\n\n"
@@ -1175,7 +1273,7 @@ async def game_say_command(update, context):
         except:
             pass
     else:
-        await update.message.reply_text(f"❌ Неправильно. Следующая попытка через {word_games[game_version]['interval']} минут")
+        await update.message.reply_text(f"❌ Неправильно. Следующая попытка через {game.interval} минут")
 
 # ============= РОЗЫГРЫШ НОМЕРОВ =============
 
@@ -1197,7 +1295,7 @@ async def roll_command(update, context):
         1 <= int(context.args[0]) <= 5):
         
         winners_count = int(context.args[0])
-        participants = roll_games[game_version]['participants']
+        participants = roll_numbers.participants(game_version)
         
         if len(participants) < winners_count:
             await update.message.reply_text(
@@ -1206,28 +1304,20 @@ async def roll_command(update, context):
             )
             return
         
-        # Генерируем случайное число от 1 до 9999
-        target_number = random.randint(1, 9999)
-        
-        # Находим ближайшие номера
-        numbers_with_distance = []
-        for uid, data in participants.items():
-            distance = abs(data['number'] - target_number)
-            numbers_with_distance.append((distance, uid, data['number'], data['username']))
-        
-        # Сортируем по расстоянию и берем нужное количество победителей
-        numbers_with_distance.sort(key=lambda x: x[0])
-        winners = numbers_with_distance[:winners_count]
+        # Выпавшее число и ближайшие номера; сид сохраняется для проверки
+        draw = await roll_numbers.draw(game_version, winners_count)
+        target_number = draw.target
         
         # Формируем сообщение о победителях
         winners_text = []
-        for i, (distance, uid, number, username) in enumerate(winners, 1):
+        for i, (uid, username, number) in enumerate(draw.winners, 1):
             emoji = "🥇" if i == 1 else "🥈" if i == 2 else "🥉" if i == 3 else f"{i}."
             winners_text.append(f"{emoji} @{username} (номер {number})")
         
         result_text = (
             f"🎉 **РОЗЫГРЫШ {game_version} ЗАВЕРШЕН!**\n\n"
-            f"🎲 Выпавшее число: {target_number}\n\n"
+            f"🎲 Выпавшее число: {target_number}\n"
+            f"🔑 Сид: `{draw.seed}`\n\n"
             f"🏆 **Победители:**\n"
             f"{chr(10).join(winners_text)}\n\n"
             f"🎊 Поздравляем победителей!"
@@ -1241,6 +1331,7 @@ async def roll_command(update, context):
                 chat_id=MODERATION_GROUP_ID,
                 text=f"🎲 **Розыгрыш {game_version} проведен:**\n\n"
                      f"🎯 Число: {target_number}\n"
+                     f"🔑 Сид: `{draw.seed}`\n"
                      f"🏆 Победителей: {winners_count}\n"
                      f"👥 Участников было: {len(participants)}",
                 parse_mode='Markdown'
@@ -1261,34 +1352,20 @@ async def roll_command(update, context):
             )
             return
         
-        # Проверяем, есть ли уже номер у пользователя
-        if user_id in roll_games[game_version]['participants']:
-            existing_number = roll_games[game_version]['participants'][user_id]['number']
+        # Случайный свободный номер за O(1), сохраняется в БД
+        new_number, created = await roll_numbers.join(game_version, user_id, username)
+        
+        if new_number is None:
+            await update.message.reply_text("❌ Все номера уже разобраны")
+            return
+        
+        if not created:
             await update.message.reply_text(
-                f"🎲 @{username}, у вас уже есть номер: **{existing_number}**",
+                f"🎲 @{username}, у вас уже есть номер: **{new_number}**",
                 parse_mode='Markdown'
             )
             return
         
-        # Генерируем уникальный номер
-        existing_numbers = set(data['number'] for data in roll_games[game_version]['participants'].values())
-        
-        # Пытаемся найти свободный номер
-        for _ in range(100):  # Ограничиваем попытки
-            new_number = random.randint(1, 9999)
-            if new_number not in existing_numbers:
-                break
-        else:
-            await update.message.reply_text("❌ Не удалось найти свободный номер")
-            return
-        
-        # Сохраняем участника
-        roll_games[game_version]['participants'][user_id] = {
-            'username': username,
-            'number': new_number,
-            'joined_at': datetime.now()
-        }
-        
         await update.message.reply_text(
             f"🎲 @{username}, ваш номер для розыгрыша: **{new_number}**",
             parse_mode='Markdown'
@@ -1334,8 +1411,7 @@ async def rollreset_command(update, context):
     command_text = update.message.text
     game_version = get_game_version(command_text)
     
-    participants_count = len(roll_games[game_version]['participants'])
-    roll_games[game_version]['participants'] = {}
+    participants_count = await roll_numbers.reset(game_version)
     
     await update.message.reply_text(
         f"✅ **Участники розыгрыша {game_version} сброшены**\n\n"
@@ -1351,7 +1427,7 @@ async def rollstatus_command(update, context):
     
     command_text = update.message.text
     game_version = get_game_version(command_text)
-    participants = roll_games[game_version]['participants']
+    participants = roll_numbers.participants(game_version)
     
     if not participants:
         await update.message.reply_text(f"🎲 Нет участников в розыгрыше {game_version}")
@@ -1373,8 +1449,8 @@ async def mynumber_command(update, context):
     command_text = update.message.text
     game_version = get_game_version(command_text)
     
-    if user_id in roll_games[game_version]['participants']:
-        number = roll_games[game_version]['participants'][user_id]['number']
+    number = roll_numbers.number_of(game_version, user_id)
+    if number is not None:
         username = update.effective_user.username or f"ID_{user_id}"
         
         await update.message.reply_text(
@@ -1413,6 +1489,8 @@ async def handle_text_messages(update, context):
             pass
         return
     
+    award_xp(user_id, 'message')
+    
     # Проверяем, ожидает ли пользователь ввод данных
     if user_id in waiting_users:
         action_data = waiting_users[user_id]
@@ -1472,7 +1550,7 @@ async def handle_text_messages(update, context):
             game_version = action_data['game_version']
             word = action_data['word']
             
-            word_games[game_version]['words'][word]['description'] = text.strip()
+            await word_games.edit_word(game_version, word, text.strip())
             
             await update.message.reply_text(
                 f"✅ **Описание слова '{word}' обновлено для {game_version}:**\n\n{text.strip()}",
@@ -1482,6 +1560,13 @@ async def handle_text_messages(update, context):
             del waiting_users[user_id]
             return
     
+    # Текст публикации или шаг заявки в каталог (handlers.publication_handler) - только в личке.
+    # Запрещённые ссылки проверяет общий FilterService из контейнера сервисов
+    if update.effective_chat.type == 'private' and context.user_data.get('waiting_for'):
+        from handlers.publication_handler import handle_text_input
+        await handle_text_input(update, context)
+        return
+    
     # Проверка на ссылки-приглашения (если включена защита)
     if chat_settings.get('antiinvite') and ('t.me/' in text or 'telegram.me/' in text):
         if user_id not in ADMIN_IDS:
@@ -1509,11 +1594,52 @@ async def autopost_task():
             logger.error(f"Ошибка в autopost_task: {e}")
             await asyncio.sleep(60)
 
+async def handle_media_messages(update, context):
+    """Обработка фото, видео и других медиа"""
+    user_id = update.effective_user.id
+    
+    update_user_activity(user_id, update.effective_user.username)
+    
+    if is_user_banned(user_id) or is_user_muted(user_id):
+        try:
+            await update.message.delete()
+        except:
+            pass
+        return
+    
+    award_xp(user_id, 'media')
+    
+    # Медиа для публикации или заявки в каталог - только в личке.
+    # Части альбома собирает services.albums, ответ - один на альбом
+    if update.effective_chat.type == 'private':
+        waiting_for = context.user_data.get('waiting_for')
+        if waiting_for == 'piar_photo':
+            from handlers.piar_handler import handle_piar_photo
+            await handle_piar_photo(update, context)
+        elif waiting_for == 'post_text' and update.message.caption:
+            from handlers.publication_handler import handle_text_input
+            await handle_text_input(update, context)
+        elif 'post_data' in context.user_data:
+            from handlers.publication_handler import handle_media_input
+            await handle_media_input(update, context)
+
 # ============= ОСНОВНАЯ ФУНКЦИЯ =============
 
+def build_persistence():
+    """Хранилище user_data в БД, если доступна база"""
+    if not Config.PERSISTENCE_ENABLED:
+        return None
+    persistence_class = get_db_service('persistence', 'DatabasePersistence')
+    return persistence_class() if persistence_class else None
+
 def main():
     """Основная функция запуска бота"""
-    application = Application.builder().token(BOT_TOKEN).build()
+    builder = Application.builder().token(BOT_TOKEN).post_init(post_init).post_shutdown(post_shutdown)
+    persistence = build_persistence()
+    if persistence:
+        builder = builder.persistence(persistence)
+    application = builder.build()
+    services.install(application)
     
     # Базовые команды
     application.add_handler(CommandHandler("start", start_command))
@@ -1538,9 +1664,21 @@ def main():
     application.add_handler(CommandHandler("unmute", unmute_command))
     application.add_handler(CommandHandler("banlist", banlist_command))
     application.add_handler(CommandHandler("stats", stats_command))
+    application.add_handler(CommandHandler("dbstats", dbstats_command))
+    application.add_handler(CommandHandler("memstats", memstats_command))
     application.add_handler(CommandHandler("top", top_command))
+    application.add_handler(CommandHandler("myrank", myrank_command))
     application.add_handler(CommandHandler("lastseen", lastseen_command))
     
+    # Очередь заявок (handlers.moderation_handler)
+    from handlers.moderation_handler import (
+        queue_command, bulk_command, handle_moderation_text, MODERATION_TEXT_FILTER
+    )
+    application.add_handler(CommandHandler("queue", queue_command))
+    application.add_handler(CommandHandler("bulk", bulk_command))
+    # Ссылка/причина по заявке - раньше общего обработчика текста
+    application.add_handler(MessageHandler(MODERATION_TEXT_FILTER, handle_moderation_text))
+    
     # Автопостинг
     application.add_handler(CommandHandler("autopost", autopost_command))
     
@@ -1568,8 +1706,16 @@ def main():
         application.add_handler(CommandHandler(f"{version}rollstatus", rollstatus_command))
         application.add_handler(CommandHandler(f"{version}mynumber", mynumber_command))
     
+    # Inline-кнопки: один CallbackQueryHandler и маршрутизатор services.callbacks
+    from handlers import callbacks
+    callbacks.register(application)
+    
     # Обработка текстовых сообщений
     application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_text_messages))
+    application.add_handler(MessageHandler(
+        filters.PHOTO | filters.VIDEO | filters.ANIMATION | filters.VOICE | filters.VIDEO_NOTE | filters.Document.ALL,
+        handle_media_messages
+    ))
     
     # Запуск задачи автопостинга
     loop = asyncio.new_event_loop()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Миграции БД (заменяет migrate_db.py, migrate_to_bigint.py и fix_database.py)
+
+    python migrate.py                 # применить все новые миграции
+    python migrate.py --status        # показать применённые / ожидающие
+    python migrate.py --to 3          # применить до версии 3 включительно
+    python migrate.py --batch-size 500
+
+Миграции выполняются без остановки бота: индексы строятся CONCURRENTLY,
+данные переносятся пачками, смена типов столбцов идёт через expand/contract.
+"""
+
+import argparse
+import asyncio
+import asyncpg
+import os
+from dotenv import load_dotenv
+from services.migrations import MIGRATIONS, DEFAULT_BATCH_SIZE, applied_versions, run_migrations
+
+load_dotenv()
+
+DATABASE_URL = os.getenv("DATABASE_URL")
+
+async def main(args):
+    if not DATABASE_URL:
+        # Шаг release в Procfile не должен ронять деплой бота без БД
+        print("ℹ️ DATABASE_URL не задан: бот работает без БД, миграции не нужны")
+        return 0
+
+    if DATABASE_URL.startswith("sqlite"):
+        print("ℹ️ Миграции только для PostgreSQL: схему SQLite создаёт бот при запуске")
+        return 0
+
+    # asyncpg понимает только postgresql:// и postgres://
+    url = DATABASE_URL.replace("postgresql+asyncpg://", "postgresql://")
+    conn = await asyncpg.connect(url)
+    print("✅ Подключение к БД успешно")
+
+    try:
+        if args.status:
+            done = await applied_versions(conn)
+            for migration in MIGRATIONS:
+                mark = "✅" if migration.version in done else "⏳"
+                print(f"  {mark} {migration.version:04d} {migration.name}")
+            return 0
+
+        applied = await run_migrations(conn, target=args.to, batch_size=args.batch_size)
+        if applied:
+            print(f"\n🎉 Применено миграций: {len(applied)}")
+        else:
+            print("\n✅ Схема актуальна")
+        return 0
+    except Exception as e:
+        print(f"❌ Ошибка миграции: {e}")
+        print("Повторный запуск продолжит с места остановки")
+        return 1
+    finally:
+        await conn.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Применить миграции БД")
+    parser.add_argument('--status', action='store_true', help="показать состояние миграций")
+    parser.add_argument('--to', type=int, help="применить до указанной версии")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help="строк в пачке при переносе данных")
+    raise SystemExit(asyncio.run(main(parser.parse_args())))
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, BigInteger, String, DateTime, Boolean, Text, JSON, Enum
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, Boolean, Text, JSON, Enum, Index, Sequence, LargeBinary, text as sa_text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.sql import func
 from datetime import datetime
@@ -6,6 +6,12 @@ import enum
 
 Base = declarative_base()
 
+# Номер последней миграции из services/migrations.py - db.init пропускает create_all, если версия в БД актуальна
+SCHEMA_VERSION = 15
+
+# Счётчик реферальных кодов: один nextval резервирует блок из `increment` кодов
+REFERRAL_CODE_SEQUENCE = Sequence('referral_code_seq', increment=1000, metadata=Base.metadata)
+
 class Gender(enum.Enum):
     MALE = "male"
     FEMALE = "female"
@@ -24,8 +30,12 @@ class User(Base):
     first_name = Column(String(255))
     last_name = Column(String(255))
     gender = Column(Enum(Gender), default=Gender.UNKNOWN)
-    referral_code = Column(String(255), unique=True)
+    referral_code = Column(String(255), unique=True)  # 7 символов base32, старые - 8 случайных
     created_at = Column(DateTime, default=datetime.utcnow)
+    last_activity = Column(DateTime)
+    message_count = Column(Integer, default=0, server_default='0', nullable=False)
+    xp = Column(Integer, default=0, server_default='0', nullable=False)
+    cooldown_expires_at = Column(DateTime)  # следующий пост не раньше
 
 class Post(Base):
     __tablename__ = 'posts'
@@ -51,3 +61,108 @@ class Post(Base):
     piar_instagram = Column(String(255))  
     piar_telegram = Column(String(255))   
     piar_price = Column(String(255))
+    
+    # В PostgreSQL таблица разбита по месяцам created_at (services/partitions.py),
+    # первичный ключ там (id, created_at); id по-прежнему уникален - из последовательности
+    __table_args__ = (
+        # Очередь модерации: WHERE status = 'PENDING' ORDER BY created_at, id.
+        # Частичный индекс содержит только ожидающие заявки и не растёт вместе с архивом
+        Index('ix_posts_pending', 'created_at', 'id',
+              postgresql_where=sa_text("status = 'PENDING'"), sqlite_where=sa_text("status = 'PENDING'")),
+    )
+
+class PostArchive(Base):
+    __tablename__ = 'posts_archive'
+    
+    # Решённые заявки старше POSTS_RETENTION_DAYS: ключевые поля + вся строка сжатым JSON
+    id = Column(Integer, primary_key=True)  # id поста
+    user_id = Column(BigInteger, nullable=False, index=True)
+    status = Column(String(16), nullable=False)
+    category = Column(String(255))
+    created_at = Column(DateTime, nullable=False, index=True)
+    archived_at = Column(DateTime, default=datetime.utcnow)
+    data = Column(LargeBinary, nullable=False)  # zlib(JSON)
+
+class ModerationClaim(Base):
+    __tablename__ = 'moderation_claims'
+    
+    # Одна активная заявка - один модератор: PK по post_id исключает двойную обработку
+    post_id = Column(Integer, primary_key=True)
+    moderator_id = Column(BigInteger, nullable=False, index=True)
+    post_user_id = Column(BigInteger, nullable=False)
+    action = Column(String(32), nullable=False)  # approve_link / reject_reason
+    is_chat = Column(Boolean, default=False)
+    chat_id = Column(BigInteger)
+    prompt_message_id = Column(Integer)
+    claimed_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    
+    __table_args__ = (
+        Index('ix_moderation_claims_prompt', 'chat_id', 'prompt_message_id'),
+    )
+
+class UserState(Base):
+    __tablename__ = 'user_state'
+    
+    # Одна строка на ключ context.user_data - пишутся только изменившиеся ключи
+    user_id = Column(BigInteger, primary_key=True)
+    key = Column(String(64), primary_key=True)
+    value = Column(Text, nullable=False)  # компактный JSON
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+class Referral(Base):
+    __tablename__ = 'referrals'
+    
+    # PK по приглашённому: каждого можно привлечь только один раз
+    referred_id = Column(BigInteger, primary_key=True)
+    referrer_id = Column(BigInteger, nullable=False, index=True)
+    code = Column(String(32), nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class RollParticipant(Base):
+    __tablename__ = 'roll_participants'
+    
+    version = Column(String(16), primary_key=True)  # play3xia / play3x / playxxx
+    user_id = Column(BigInteger, primary_key=True)
+    username = Column(String(255))
+    number = Column(Integer, nullable=False)
+    joined_at = Column(DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        # Номер в розыгрыше уникален
+        Index('ix_roll_participants_version_number', 'version', 'number', unique=True),
+    )
+
+class RollDraw(Base):
+    __tablename__ = 'roll_draws'
+    
+    id = Column(Integer, primary_key=True)
+    version = Column(String(16), nullable=False, index=True)
+    seed = Column(BigInteger, nullable=False)  # выпавшее число = Random(seed).randint(1, 9999)
+    target = Column(Integer, nullable=False)
+    winners = Column(JSON, default=list)  # [{user_id, username, number}]
+    participants_count = Column(Integer, nullable=False)
+    drawn_at = Column(DateTime, default=datetime.utcnow)
+
+class WordGameRecord(Base):
+    __tablename__ = 'word_games'
+    
+    version = Column(String(16), primary_key=True)  # play3xia / play3x / playxxx
+    state = Column(JSON, nullable=False)  # слова, текущее слово, победители, интервал, описание
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+class LeaderboardSnapshot(Base):
+    __tablename__ = 'leaderboard_snapshots'
+    
+    # board: messages / xp, period: all, 2026-10-19 (день) или 2026-W42 (неделя)
+    board = Column(String(16), primary_key=True)
+    period = Column(String(16), primary_key=True)
+    user_id = Column(BigInteger, primary_key=True)
+    score = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+class SchemaMigration(Base):
+    __tablename__ = 'schema_migrations'
+    
+    version = Column(Integer, primary_key=True)
+    applied_at = Column(DateTime, default=datetime.utcnow)
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Профиль холодного старта воркера.
+
+Запускает импорт модулей в отдельном интерпретаторе с `-X importtime`
+и печатает самые тяжёлые импорты по накопленному времени. Если задан
+DATABASE_URL, дополнительно замеряет db.init().
+
+    python profile_startup.py                  # main + handlers
+    python profile_startup.py main --top 15
+    python profile_startup.py --output bench_output.txt
+"""
+
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+DEFAULT_MODULES = [
+    'main',
+    'handlers.start_handler',
+    'handlers.menu_handler',
+    'handlers.publication_handler',
+    'handlers.piar_handler',
+    'handlers.moderation_handler',
+    'handlers.profile_handler',
+    'handlers.admin_handler',
+]
+
+def profile_imports(modules):
+    """Returns (wall seconds, [(cumulative_us, self_us, module)])"""
+    code = "; ".join(f"import {module}" for module in modules)
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__))
+    )
+    wall = time.perf_counter() - started
+
+    rows = []
+    errors = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:'):
+            errors.append(line)
+            continue
+        parts = line[len('import time:'):].split('|')
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue
+        rows.append((int(parts[1]), int(parts[0]), parts[2].rstrip()))
+
+    if proc.returncode:
+        print("\n".join(errors[-5:]), file=sys.stderr)
+
+    return wall, rows
+
+async def profile_db_init():
+    from services.db import db
+
+    started = time.perf_counter()
+    await db.init()
+    elapsed = time.perf_counter() - started
+    await db.close()
+    return elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Import-time profile of the bot worker")
+    parser.add_argument('modules', nargs='*', default=DEFAULT_MODULES)
+    parser.add_argument('--top', type=int, default=25)
+    parser.add_argument('--output', help="also write the report to a file")
+    args = parser.parse_args()
+
+    wall, rows = profile_imports(args.modules)
+    rows.sort(reverse=True)
+
+    lines = [f"Interpreter + imports: {wall * 1000:.0f} ms", "", f"{'cumulative':>12} {'self':>10}  module"]
+    for cumulative, own, module in rows[:args.top]:
+        lines.append(f"{cumulative / 1000:>10.1f}ms {own / 1000:>8.1f}ms  {module}")
+
+    if os.getenv("DATABASE_URL"):
+        elapsed = asyncio.run(profile_db_init())
+        lines += ["", f"db.init(): {elapsed * 1000:.0f} ms"]
+
+    report = "\n".join(lines)
+    print(report)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(report + "\n")
+
+if __name__ == '__main__':
+    main()
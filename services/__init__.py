@@ -7,5 +7,8 @@ __all__ = [
     'cooldown',
     'scheduler_service',
     'filter_service',
-    'hashtags'
+    'hashtags',
+    'notifier',
+    'persistence',
+    'container'
 ]
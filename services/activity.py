@@ -0,0 +1,182 @@
+import asyncio
+import logging
+from datetime import datetime
+from typing import Dict, Optional
+from sqlalchemy import func
+from services.db import db
+from models import User
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Строк в одном INSERT: 5 параметров на строку, лимит asyncpg - 32767 параметров
+ROWS_PER_STATEMENT = 1000
+
+class _Delta:
+    """Accumulated, not yet persisted activity of one user"""
+    __slots__ = ('messages', 'xp', 'last_activity', 'username')
+
+    def __init__(self):
+        self.messages = 0
+        self.xp = 0
+        self.last_activity = None
+        self.username = None
+
+class ActivityAggregator:
+    """
+    Coalesces per-message activity updates and writes them in batches.
+
+    record() is a dict update - no I/O on the message path. A background task
+    flushes everything accumulated every `flush_interval` seconds with one
+    multi-row INSERT ... ON CONFLICT DO UPDATE, so DB writes scale with the
+    interval, not with message volume.
+
+    Back-pressure: once `max_pending` users are buffered the flush is started
+    early; past `hard_limit` new users are dropped (and counted) instead of
+    growing memory while the DB is unreachable.
+    """
+
+    def __init__(self, flush_interval: float = None, max_pending: int = None, hard_limit: int = None):
+        self.flush_interval = flush_interval or Config.ACTIVITY_FLUSH_INTERVAL
+        self.max_pending = max_pending or Config.ACTIVITY_MAX_PENDING
+        self.hard_limit = max(hard_limit or Config.ACTIVITY_HARD_LIMIT, self.max_pending)
+        self._pending: Dict[int, _Delta] = {}
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self.dropped = 0
+        self.flushed_rows = 0
+
+    def record(self, user_id: int, username: str = None, messages: int = 1,
+               at: datetime = None, xp: int = 0) -> bool:
+        """Buffer one activity event. Returns False if it was dropped under back-pressure"""
+        delta = self._pending.get(user_id)
+        if delta is None:
+            if len(self._pending) >= self.hard_limit:
+                self.dropped += 1
+                if self.dropped % 1000 == 1:
+                    logger.warning(f"Activity buffer full ({self.hard_limit}), dropped {self.dropped} events")
+                return False
+            delta = self._pending[user_id] = _Delta()
+
+        delta.messages += messages
+        delta.xp += xp
+        if messages:
+            delta.last_activity = at or datetime.utcnow()
+        if username:
+            delta.username = username
+
+        self._ensure_running()
+        if len(self._pending) >= self.max_pending and self._wake:
+            self._wake.set()
+        return True
+
+    def add_xp(self, user_id: int, points: int) -> bool:
+        """Buffer an XP increment without counting a message"""
+        return self.record(user_id, messages=0, xp=points)
+
+    def pending_xp(self, user_id: int) -> int:
+        delta = self._pending.get(user_id)
+        return delta.xp if delta else 0
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def _ensure_running(self):
+        """Start the flush loop lazily on the running event loop"""
+        if self._task is not None and not self._task.done():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._wake = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task = loop.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Error flushing activity: {e}")
+                await asyncio.sleep(self.flush_interval)
+
+    async def flush(self) -> int:
+        """Write all buffered deltas, returns number of users written"""
+        if not self._pending or db.engine is None:
+            return 0
+
+        async with self._flush_lock or asyncio.Lock():
+            batch, self._pending = self._pending, {}
+            rows = [
+                {
+                    'id': user_id,
+                    'username': delta.username,
+                    'last_activity': delta.last_activity,
+                    'message_count': delta.messages,
+                    'xp': delta.xp
+                }
+                for user_id, delta in batch.items()
+            ]
+
+            try:
+                async with db.get_session() as session:
+                    for start in range(0, len(rows), ROWS_PER_STATEMENT):
+                        stmt = db.insert(User).values(rows[start:start + ROWS_PER_STATEMENT])
+                        stmt = stmt.on_conflict_do_update(
+                            index_elements=[User.id],
+                            set_={
+                                'username': func.coalesce(stmt.excluded.username, User.username),
+                                'last_activity': db.greatest(stmt.excluded.last_activity, User.last_activity),
+                                'message_count': func.coalesce(User.message_count, 0) + stmt.excluded.message_count,
+                                'xp': func.coalesce(User.xp, 0) + stmt.excluded.xp
+                            }
+                        )
+                        await session.execute(stmt)
+            except Exception:
+                self._merge_back(batch)
+                raise
+
+            self.flushed_rows += len(rows)
+            logger.debug(f"Flushed activity for {len(rows)} users")
+            return len(rows)
+
+    def _merge_back(self, batch: Dict[int, _Delta]):
+        """Return a failed batch to the buffer, newer events win"""
+        for user_id, old in batch.items():
+            delta = self._pending.get(user_id)
+            if delta is None:
+                if len(self._pending) >= self.hard_limit:
+                    self.dropped += 1
+                    continue
+                self._pending[user_id] = old
+                continue
+            delta.messages += old.messages
+            delta.xp += old.xp
+            delta.last_activity = delta.last_activity or old.last_activity
+            delta.username = delta.username or old.username
+
+    async def stop(self):
+        """Cancel the flush loop and write what is left (on shutdown)"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(f"Error flushing activity on shutdown: {e}")
+
+# Global instance
+activity = ActivityAggregator()
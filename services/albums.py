@@ -0,0 +1,65 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+AlbumCallback = Callable[[list], Awaitable[None]]
+
+class _Album:
+    __slots__ = ('messages', 'on_complete', 'timer')
+
+    def __init__(self, on_complete: AlbumCallback):
+        self.messages = []
+        self.on_complete = on_complete
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+class AlbumBuffer:
+    """
+    Collects the updates of one album (same chat and media_group_id).
+
+    Telegram delivers an album as separate messages a few milliseconds apart.
+    Handlers run one update at a time, so they can't wait for the rest of the
+    album themselves. Instead every message re-arms a short timer. When no new
+    part arrives for `delay` seconds, the callback gets all parts in message
+    order once, so the handler updates state and replies once per album.
+    """
+
+    def __init__(self, delay: float = None):
+        self.delay = delay or Config.ALBUM_DEBOUNCE_SECONDS
+        self._albums: Dict[Tuple[int, str], _Album] = {}
+
+    def add(self, message, on_complete: AlbumCallback) -> bool:
+        """
+        Buffer an album part. Returns False for a message outside an album -
+        the caller handles it right away.
+        """
+        if not message.media_group_id:
+            return False
+
+        key = (message.chat_id, message.media_group_id)
+        album = self._albums.get(key)
+        if album is None:
+            album = self._albums[key] = _Album(on_complete)
+        album.messages.append(message)
+
+        if album.timer:
+            album.timer.cancel()
+        album.timer = asyncio.get_running_loop().call_later(self.delay, self._complete, key)
+        return True
+
+    def _complete(self, key: Tuple[int, str]):
+        album = self._albums.pop(key, None)
+        if album is not None:
+            asyncio.get_running_loop().create_task(self._run(album))
+
+    async def _run(self, album: _Album):
+        messages: List = sorted(album.messages, key=lambda message: message.message_id)
+        try:
+            await album.on_complete(messages)
+        except Exception as e:
+            logger.error(f"Error handling album of {len(messages)} messages: {e}")
+
+# Global instance
+albums = AlbumBuffer()
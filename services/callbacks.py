@@ -0,0 +1,196 @@
+import logging
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# ============= КОДЕК callback_data =============
+#
+# v1 (старый, по-прежнему принимается): "mod:approve:123" - префикс, действие, аргументы через ":"
+# v2: "2" + код маршрута + ".аргумент" для каждого аргумента, числа в base36:
+#     "2ma.2n9" = mod:approve:3501. Код и типы аргументов задаёт CALLBACK_SCHEMA.
+
+CALLBACK_VERSION = '2'
+MAX_CALLBACK_BYTES = 64  # лимит Telegram
+ARG_SEPARATOR = '.'
+EPOCH = datetime(1970, 1, 1)
+LEGACY_DATETIME_FORMAT = '%Y%m%d%H%M%S%f'
+
+def _to_base36(value: int) -> str:
+    if value < 0:
+        return '-' + _to_base36(-value)
+    digits = '0123456789abcdefghijklmnopqrstuvwxyz'
+    chars = []
+    while True:
+        value, digit = divmod(value, 36)
+        chars.append(digits[digit])
+        if not value:
+            return ''.join(reversed(chars))
+
+def _encode_datetime(value: datetime) -> str:
+    return _to_base36((value - EPOCH) // timedelta(microseconds=1))
+
+def _decode_datetime(value: str) -> datetime:
+    return EPOCH + timedelta(microseconds=int(value, 36))
+
+# тип аргумента -> (кодирование v2, декодирование v2, декодирование v1)
+ARG_TYPES = {
+    int: (_to_base36, lambda value: int(value, 36), int),
+    str: (str, str, str),
+    datetime: (_encode_datetime, _decode_datetime,
+               lambda value: datetime.strptime(value, LEGACY_DATETIME_FORMAT)),
+}
+
+# Код v2 -> (префикс, действие, типы аргументов). Коды не переиспользовать:
+# кнопки со старыми кодами остаются в сообщениях
+CALLBACK_SCHEMA: Dict[str, Tuple[str, str, tuple]] = {
+    'ma': ('mod', 'approve', (int,)),
+    'mc': ('mod', 'approve_chat', (int,)),
+    'mr': ('mod', 'reject', (int,)),
+    'me': ('mod', 'edit', (int,)),
+    'mq': ('mod', 'queue', (str, datetime, int)),  # направление, курсор (created_at, id)
+    'pc': ('pub', 'cat', (str,)),
+}
+ROUTE_CODES = {(prefix, action): code for code, (prefix, action, _) in CALLBACK_SCHEMA.items()}
+ROUTE_TYPES = {(prefix, action): types for prefix, action, types in CALLBACK_SCHEMA.values()}
+
+class CallbackData(NamedTuple):
+    prefix: str
+    action: Optional[str]
+    args: tuple
+
+def encode(prefix: str, action: str, *args) -> str:
+    """
+    callback_data for a route. Routes from CALLBACK_SCHEMA get the compact v2
+    form, the rest (static menu buttons) stay "prefix:action".
+    """
+    code = ROUTE_CODES.get((prefix, action))
+    if code is None:
+        data = ':'.join([prefix, action] + [str(arg) for arg in args])
+    else:
+        types = ROUTE_TYPES[(prefix, action)]
+        if len(args) > len(types):
+            raise ValueError(f"Too many arguments for {prefix}:{action}")
+        parts = [CALLBACK_VERSION + code]
+        for arg_type, arg in zip(types, args):
+            part = ARG_TYPES[arg_type][0](arg)
+            if ARG_SEPARATOR in part:
+                raise ValueError(f"Argument {part!r} contains {ARG_SEPARATOR!r}")
+            parts.append(part)
+        data = ARG_SEPARATOR.join(parts)
+
+    if len(data.encode('utf-8')) > MAX_CALLBACK_BYTES:
+        raise ValueError(f"callback_data longer than {MAX_CALLBACK_BYTES} bytes: {data}")
+    return data
+
+def _typed(types: tuple, values, version: int) -> tuple:
+    column = 1 if version == 2 else 2
+    return tuple(ARG_TYPES[arg_type][column](value) for arg_type, value in zip(types, values))
+
+def decode(data: str) -> Optional[CallbackData]:
+    """Parse v2 or legacy callback_data, None if malformed"""
+    if not data:
+        return None
+    try:
+        if data[0] == CALLBACK_VERSION:
+            code, *values = data[1:].split(ARG_SEPARATOR)
+            prefix, action, types = CALLBACK_SCHEMA[code]
+            return CallbackData(prefix, action, _typed(types, values, 2))
+
+        prefix, *rest = data.split(':')
+        action = rest[0] if rest else None
+        values = rest[1:]
+        types = ROUTE_TYPES.get((prefix, action), (str,) * len(values))
+        return CallbackData(prefix, action, _typed(types, values, 1))
+    except (KeyError, ValueError):
+        return None
+
+# ============= МАРШРУТИЗАЦИЯ =============
+
+CallbackHandler = Callable[..., Awaitable[None]]
+Guard = Callable[[int], bool]
+
+class _Node:
+    __slots__ = ('children', 'handler', 'guard')
+
+    def __init__(self):
+        self.children: Dict[str, '_Node'] = {}
+        self.handler: Optional[CallbackHandler] = None
+        self.guard: Optional[Guard] = None
+
+class CallbackRouter:
+    """
+    One entry point for every callback query.
+
+    Routes are "prefix:action" paths in a trie of dicts, so dispatch is one
+    decode plus one dict lookup per level. That replaces a CallbackQueryHandler
+    pattern per prefix and the if/elif chains inside each handler. A handler
+    is called as handler(update, context, *args) with args already converted
+    by the codec. A guard set on a prefix (e.g. moderator check) runs before
+    any of its routes.
+
+    The query is answered after the handler returns, unless the handler
+    already answered it itself through answer() (e.g. with an alert):
+    Telegram accepts only one answer per query.
+    """
+
+    def __init__(self):
+        self._root = _Node()
+        self._answered: Dict[str, bool] = {}  # id запроса в обработке -> уже отвечен
+
+    def _node(self, path: str) -> _Node:
+        node = self._root
+        for segment in path.split(':'):
+            node = node.children.setdefault(segment, _Node())
+        return node
+
+    def route(self, path: str, handler: CallbackHandler):
+        self._node(path).handler = handler
+
+    def guard(self, prefix: str, check: Guard):
+        self._node(prefix).guard = check
+
+    def resolve(self, data: CallbackData) -> Tuple[Optional[CallbackHandler], Optional[Guard]]:
+        node = self._root.children.get(data.prefix)
+        if node is None:
+            return None, None
+        guard = node.guard
+        if data.action is not None:
+            child = node.children.get(data.action)
+            if child is None:
+                return None, guard
+            node = child
+        return node.handler, guard
+
+    async def dispatch(self, update, context):
+        query = update.callback_query
+        data = decode(query.data)
+        handler, guard = self.resolve(data) if data else (None, None)
+
+        if guard and not guard(update.effective_user.id):
+            logger.warning(f"Access denied for user {update.effective_user.id}: {query.data}")
+            await query.answer("❌ Доступ запрещен", show_alert=True)
+            return
+        if handler is None:
+            logger.warning(f"Unknown callback: {query.data}")
+            await query.answer("Функция в разработке", show_alert=True)
+            return
+
+        self._answered[query.id] = False
+        try:
+            await handler(update, context, *data.args)
+        finally:
+            if not self._answered.pop(query.id):
+                await query.answer()
+
+    async def answer(self, update, text: str = None, show_alert: bool = False):
+        """Answer the callback query unless it was already answered during dispatch"""
+        query = update.callback_query
+        if self._answered.get(query.id):
+            return
+        if query.id in self._answered:
+            self._answered[query.id] = True
+        await query.answer(text, show_alert=show_alert)
+
+# Global instance
+callback_router = CallbackRouter()
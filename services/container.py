@@ -0,0 +1,89 @@
+import logging
+from typing import Any, Callable, Dict, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+BOT_DATA_KEY = 'services'
+
+class ServiceSpec(NamedTuple):
+    factory: Callable[[], Any]
+    start: Optional[str] = None  # имена методов жизненного цикла (async)
+    flush: Optional[str] = None
+    close: Optional[str] = None
+
+class ServiceContainer:
+    """
+    Application-scoped registry of long-lived services.
+
+    Each service is built once on first use from its factory, so handlers
+    share one instance and its warm state (CooldownService cache, compiled
+    patterns) instead of constructing a new object per update. The container
+    is stored in Application.bot_data and post_init/post_shutdown drive the
+    lifecycle hooks of the services that were actually created.
+    """
+
+    def __init__(self):
+        self._specs: Dict[str, ServiceSpec] = {}
+        self._instances: Dict[str, Any] = {}
+
+    def register(self, name: str, factory: Callable[[], Any], start: str = None,
+                 flush: str = None, close: str = None):
+        self._specs[name] = ServiceSpec(factory, start, flush, close)
+        self._instances.pop(name, None)
+
+    def get(self, name: str) -> Any:
+        instance = self._instances.get(name)
+        if instance is None:
+            instance = self._instances[name] = self._specs[name].factory()
+            logger.info(f"Service {name} created")
+        return instance
+
+    def __getitem__(self, name: str) -> Any:
+        return self.get(name)
+
+    def install(self, application):
+        application.bot_data[BOT_DATA_KEY] = self
+
+    async def _run_hook(self, hook: str):
+        for name, instance in list(self._instances.items()):
+            method = getattr(self._specs[name], hook)
+            if not method:
+                continue
+            try:
+                await getattr(instance, method)()
+            except Exception as e:
+                logger.error(f"Error in {hook} of service {name}: {e}")
+
+    async def start(self):
+        await self._run_hook('start')
+
+    async def flush(self):
+        await self._run_hook('flush')
+
+    async def close(self):
+        await self._run_hook('close')
+
+def get_service(context, name: str) -> Any:
+    """Service from the container in context.bot_data (the global one if not installed)"""
+    container = context.bot_data.get(BOT_DATA_KEY) or services
+    return container.get(name)
+
+# ============= СЕРВИСЫ =============
+
+def _filter_service():
+    from services.filter_service import FilterService
+    return FilterService()
+
+def _hashtag_service():
+    from services.hashtags import HashtagService
+    return HashtagService()
+
+def _cooldown_service():
+    from services.cooldown import CooldownService
+    return CooldownService()
+
+# Global instance
+services = ServiceContainer()
+services.register('filter', _filter_service)
+services.register('hashtags', _hashtag_service)
+services.register('cooldown', _cooldown_service)
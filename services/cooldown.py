@@ -1,17 +1,26 @@
 from datetime import datetime, timedelta
 from services.db import db
-from models import User
-from sqlalchemy import select
+from services.repository import fetch_user, set_cooldown
+from services.expiring import ExpiringDict
 from config import Config
 import logging
 
 logger = logging.getLogger(__name__)
 
 class CooldownService:
-    """Service for managing post cooldowns"""
+    """
+    Service for managing post cooldowns.
+
+    One instance lives in the service container, so the last-post cache is
+    shared by every update: a user still in cooldown is answered from memory
+    without a DB query, and the cache remains the fallback when the DB is
+    unavailable. An entry lives only as long as the user's cooldown.
+    """
     
     def __init__(self):
-        self._cache = {}  # Simple in-memory cache for performance
+        self._cache = ExpiringDict(name='cooldown')  # {user_id: время последнего поста}
+        self.hits = 0
+        self.misses = 0
     
     async def can_post(self, user_id: int) -> tuple[bool, int]:
         """
@@ -23,35 +32,30 @@ class CooldownService:
             if Config.is_moderator(user_id):
                 return True, 0
             
+            remaining = self.get_remaining_time(user_id)
+            if remaining:
+                self.hits += 1
+                return False, remaining
+            self.misses += 1
+            
             async with db.get_session() as session:
-                result = await session.execute(
-                    select(User).where(User.id == user_id)
-                )
-                user = result.scalar_one_or_none()
-                
-                if not user:
-                    return False, 0
-                
-                # Check if user is banned or muted
-                if hasattr(user, 'banned') and user.banned:
-                    return False, 999999
-                
-                if hasattr(user, 'mute_until') and user.mute_until and user.mute_until > datetime.utcnow():
-                    remaining = int((user.mute_until - datetime.utcnow()).total_seconds())
-                    return False, remaining
-                
-                # Check cooldown
-                if hasattr(user, 'cooldown_expires_at') and user.cooldown_expires_at:
-                    if user.cooldown_expires_at > datetime.utcnow():
-                        remaining = int((user.cooldown_expires_at - datetime.utcnow()).total_seconds())
-                        return False, remaining
-                
-                return True, 0
+                user = await fetch_user(session, user_id)
+            
+            if not user:
+                return False, 0
+            
+            remaining = self._remaining_until(user.cooldown_expires_at)
+            if remaining:
+                # Кулдаун из БД (например, после рестарта) - дальше отвечаем из кэша
+                self._remember(user_id, user.cooldown_expires_at - timedelta(seconds=Config.COOLDOWN_SECONDS))
+                return False, remaining
+            return True, 0
                 
         except Exception as e:
             logger.error(f"Error checking cooldown for user {user_id}: {e}")
-            # В случае ошибки разрешаем постить (безопасный fallback)
-            return True, 0
+            # В случае ошибки решаем по кэшу (без записи в кэше - разрешаем)
+            remaining = self.get_remaining_time(user_id)
+            return remaining == 0, remaining
     
     async def update_cooldown(self, user_id: int):
         """Update user's cooldown after posting"""
@@ -59,37 +63,25 @@ class CooldownService:
             if Config.is_moderator(user_id):
                 return  # Модераторы не имеют кулдауна
             
+            self.set_last_post_time(user_id)
             async with db.get_session() as session:
-                result = await session.execute(
-                    select(User).where(User.id == user_id)
-                )
-                user = result.scalar_one_or_none()
-                
-                if user:
-                    if hasattr(user, 'cooldown_expires_at'):
-                        user.cooldown_expires_at = datetime.utcnow() + timedelta(seconds=Config.COOLDOWN_SECONDS)
-                        await session.commit()
-                        logger.info(f"Updated cooldown for user {user_id}")
+                expires_at = datetime.utcnow() + timedelta(seconds=Config.COOLDOWN_SECONDS)
+                if await set_cooldown(session, user_id, expires_at):
+                    logger.info(f"Updated cooldown for user {user_id}")
                         
         except Exception as e:
             logger.error(f"Error updating cooldown for user {user_id}: {e}")
     
     async def reset_cooldown(self, user_id: int) -> bool:
         """Reset user's cooldown (admin command)"""
+        self._cache.pop(user_id, None)
         try:
             async with db.get_session() as session:
-                result = await session.execute(
-                    select(User).where(User.id == user_id)
-                )
-                user = result.scalar_one_or_none()
-                
-                if user and hasattr(user, 'cooldown_expires_at'):
-                    user.cooldown_expires_at = None
-                    await session.commit()
-                    logger.info(f"Reset cooldown for user {user_id}")
-                    return True
-                
-                return False
+                reset = await set_cooldown(session, user_id, None)
+            
+            if reset:
+                logger.info(f"Reset cooldown for user {user_id}")
+            return reset
                 
         except Exception as e:
             logger.error(f"Error resetting cooldown for user {user_id}: {e}")
@@ -97,27 +89,28 @@ class CooldownService:
     
     async def get_cooldown_info(self, user_id: int) -> dict:
         """Get cooldown information for user"""
+        remaining = self.get_remaining_time(user_id)
+        if remaining:
+            return {
+                'has_cooldown': True,
+                'expires_at': datetime.utcnow() + timedelta(seconds=remaining),
+                'remaining_seconds': remaining,
+                'remaining_minutes': remaining // 60
+            }
         try:
             async with db.get_session() as session:
-                result = await session.execute(
-                    select(User).where(User.id == user_id)
-                )
-                user = result.scalar_one_or_none()
-                
-                if not user:
-                    return {'has_cooldown': False}
-                
-                if (hasattr(user, 'cooldown_expires_at') and user.cooldown_expires_at and 
-                    user.cooldown_expires_at > datetime.utcnow()):
-                    remaining = int((user.cooldown_expires_at - datetime.utcnow()).total_seconds())
-                    return {
-                        'has_cooldown': True,
-                        'expires_at': user.cooldown_expires_at,
-                        'remaining_seconds': remaining,
-                        'remaining_minutes': remaining // 60
-                    }
-                
-                return {'has_cooldown': False}
+                user = await fetch_user(session, user_id)
+            
+            remaining = self._remaining_until(user.cooldown_expires_at) if user else 0
+            if remaining:
+                return {
+                    'has_cooldown': True,
+                    'expires_at': user.cooldown_expires_at,
+                    'remaining_seconds': remaining,
+                    'remaining_minutes': remaining // 60
+                }
+            
+            return {'has_cooldown': False}
                 
         except Exception as e:
             logger.error(f"Error getting cooldown info for user {user_id}: {e}")
@@ -140,7 +133,20 @@ class CooldownService:
     def set_last_post_time(self, user_id: int):
         """Устанавливает время последнего поста в кэш"""
         if not Config.is_moderator(user_id):
-            self._cache[user_id] = datetime.utcnow()
+            self._remember(user_id, datetime.utcnow())
+    
+    @staticmethod
+    def _remaining_until(expires_at) -> int:
+        if not expires_at:
+            return 0
+        return max(0, int((expires_at - datetime.utcnow()).total_seconds()))
+    
+    def _remember(self, user_id: int, last_post_time: datetime):
+        # Запись живёт ровно до конца кулдауна
+        elapsed = (datetime.utcnow() - last_post_time).total_seconds()
+        remaining = Config.COOLDOWN_SECONDS - elapsed
+        if remaining > 0:
+            self._cache.set(user_id, last_post_time, ttl=remaining)
     
     def get_remaining_time(self, user_id: int) -> int:
         """Получает оставшееся время кулдауна в секундах"""
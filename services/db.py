@@ -1,35 +1,207 @@
+from sqlalchemy import select, func, inspect, text, event, exc
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
-from sqlalchemy.orm import sessionmaker
-from contextlib import asynccontextmanager
-from typing import Optional
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
+from contextlib import asynccontextmanager, nullcontext
+from datetime import datetime
+from typing import Dict, Optional
+from uuid import uuid4
+import asyncio
 import logging
+import time
 from config import Config
-from models import Base
+from models import Base, SchemaMigration, SCHEMA_VERSION
 
 logger = logging.getLogger(__name__)
 
+def async_url(db_url: str) -> str:
+    """Convert postgresql:// to postgresql+asyncpg:// and sqlite:// to sqlite+aiosqlite:// for async"""
+    if db_url.startswith("postgresql://"):
+        return db_url.replace("postgresql://", "postgresql+asyncpg://")
+    if db_url.startswith("postgres://"):
+        return db_url.replace("postgres://", "postgresql+asyncpg://")
+    if db_url.startswith("sqlite://"):
+        return db_url.replace("sqlite://", "sqlite+aiosqlite://")
+    return db_url
+
+def is_sqlite(db_url: str) -> bool:
+    return db_url.startswith("sqlite")
+
+# ============= SQLITE =============
+
+# Встроенный режим для одной машины: DATABASE_URL=sqlite:///trixbot.db
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",  # читатели не блокируют писателя
+    "PRAGMA synchronous=NORMAL",  # в WAL не теряет целостность, fsync только на checkpoint
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA foreign_keys=ON",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-65536",  # 64 МБ
+    "PRAGMA mmap_size=268435456",  # 256 МБ
+)
+
+# Последовательности PostgreSQL (nextval) в SQLite - строка на последовательность.
+# Префикс sqlite_ зарезервирован самой SQLite
+SQLITE_SEQUENCES_TABLE = "app_sequences"
+
+def _apply_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for pragma in SQLITE_PRAGMAS:
+        cursor.execute(pragma)
+    cursor.close()
+
+class WriterLock:
+    """
+    One writer at a time for SQLite.
+
+    Two connections that both read and then write fail with "database is
+    locked" right away - busy_timeout doesn't cover that case. Sessions on
+    SQLite hold this lock, so writes in the process are serialised while
+    read sessions (WAL snapshots) run freely. The lock is reentrant per
+    task, so a service opening its own session inside a handler's session
+    doesn't wait for itself.
+    """
+
+    def __init__(self):
+        self._lock = asyncio.Lock()
+        self._owner: Optional[asyncio.Task] = None
+
+    @asynccontextmanager
+    async def hold(self):
+        task = asyncio.current_task()
+        if self._owner is task:
+            yield
+            return
+        async with self._lock:
+            self._owner = task
+            try:
+                yield
+            finally:
+                self._owner = None
+
+# ============= ПУЛ СОЕДИНЕНИЙ =============
+
+class PoolMetrics:
+    """How long checkouts of one pool waited for a connection"""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record(self, wait: float):
+        self.checkouts += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+
+    def snapshot(self) -> dict:
+        return {
+            'checkouts': self.checkouts,
+            'timeouts': self.timeouts,
+            'avg_wait_ms': self.total_wait / self.checkouts * 1000 if self.checkouts else 0.0,
+            'max_wait_ms': self.max_wait * 1000
+        }
+
+class _TimedPool:
+    """Pool mixin timing _do_get: the wait for a free connection (or connect time for NullPool)"""
+
+    metrics: PoolMetrics
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.timeouts += 1
+            raise
+        finally:
+            self.metrics.record(time.perf_counter() - started)
+
+def _pgbouncer_statement_name() -> str:
+    # В transaction-режиме соседние транзакции попадают на разные серверные соединения -
+    # имена prepared statements должны быть уникальны
+    return f"__asyncpg_{uuid4()}__"
+
+def engine_options(pool_size: int, metrics: PoolMetrics, sqlite: bool = False) -> dict:
+    """create_async_engine arguments from the DB_* settings"""
+    base = NullPool if Config.DB_NULL_POOL and not sqlite else AsyncAdaptedQueuePool
+    options = {
+        'echo': False,
+        # Класс пула на каждый engine: dispose() пересоздаёт пул тем же классом, счётчики сохраняются
+        'poolclass': type(f"Timed{base.__name__}", (_TimedPool, base), {'metrics': metrics}),
+        'pool_pre_ping': Config.DB_POOL_PRE_PING,
+    }
+    if sqlite:
+        # Файл на локальном диске: соединения дешёвые и не рвутся, PgBouncer не при чём
+        options.update(pool_size=pool_size, max_overflow=Config.DB_MAX_OVERFLOW, pool_timeout=Config.DB_POOL_TIMEOUT)
+        return options
+    if not Config.DB_NULL_POOL:
+        options.update(
+            pool_size=pool_size,
+            max_overflow=Config.DB_MAX_OVERFLOW,
+            pool_timeout=Config.DB_POOL_TIMEOUT,
+            pool_recycle=Config.DB_POOL_RECYCLE
+        )
+    if Config.DB_PGBOUNCER:
+        options['connect_args'] = {
+            'statement_cache_size': 0,  # кэш asyncpg
+            'prepared_statement_cache_size': 0,  # кэш диалекта SQLAlchemy
+            'prepared_statement_name_func': _pgbouncer_statement_name
+        }
+    return options
+
 class Database:
+    """
+    Primary engine for writes plus an optional read replica (DATABASE_READ_URL)
+    with its own pool.
+
+    get_session() always goes to the primary. get_read_session() is for
+    heavy read-only work (/stats, whois, profile counters) and uses the
+    replica when one is configured. A user who has just written is pinned
+    to the primary for READ_YOUR_WRITES_SECONDS (pin_primary), so replica
+    lag never hides their own changes from them.
+
+    Pool settings come from the DB_* config values (DB_PGBOUNCER and
+    DB_NULL_POOL for PgBouncer in transaction mode). Instead of a pre-ping
+    on every checkout, a background task runs SELECT 1 on each engine every
+    DB_HEALTHCHECK_INTERVAL seconds and disposes a pool whose check fails,
+    so dead connections are replaced all at once. pool_stats() exports
+    checkout waits, timeouts and saturation per pool.
+
+    DATABASE_URL=sqlite:///<file> runs on an embedded SQLite file through
+    aiosqlite: WAL journal, tuned pragmas and a WriterLock around write
+    sessions. Code that needs dialect-specific SQL goes through insert()
+    (ON CONFLICT upserts exist in both dialects) or checks is_sqlite.
+    """
+
     def __init__(self):
         self.engine = None
         self.async_session = None
+        self.read_engine = None
+        self.read_session = None
+        self._pinned: Dict[int, float] = {}  # {user_id: monotonic срок}, старые в начале
+        self.sessions = {'primary': 0, 'replica': 0}
+        self.metrics = {'primary': PoolMetrics(), 'replica': PoolMetrics()}
+        self.healthy: Dict[str, bool] = {}
+        self.last_health_check: Optional[datetime] = None
+        self._capacity: Dict[str, int] = {}
+        self._health_task: Optional[asyncio.Task] = None
+        self.is_sqlite = False
+        self._writer = WriterLock()
         
     async def init(self):
         """Initialize database connection"""
         try:
-            # Convert postgresql:// to postgresql+asyncpg:// for async
-            db_url = Config.DATABASE_URL
-            if db_url.startswith("postgresql://"):
-                db_url = db_url.replace("postgresql://", "postgresql+asyncpg://")
-            elif db_url.startswith("postgres://"):
-                db_url = db_url.replace("postgres://", "postgresql+asyncpg://")
-                
+            self.is_sqlite = is_sqlite(Config.DATABASE_URL)
             self.engine = create_async_engine(
-                db_url,
-                echo=False,
-                pool_pre_ping=True,
-                pool_size=20,
-                max_overflow=0
+                async_url(Config.DATABASE_URL),
+                **engine_options(Config.DB_POOL_SIZE, self.metrics['primary'], self.is_sqlite)
             )
+            if self.is_sqlite:
+                event.listen(self.engine.sync_engine, 'connect', _apply_pragmas)
+            self._capacity['primary'] = Config.DB_POOL_SIZE + Config.DB_MAX_OVERFLOW
             
             self.async_session = async_sessionmaker(
                 self.engine,
@@ -37,34 +209,233 @@ class Database:
                 expire_on_commit=False
             )
             
-            # Create tables if they don't exist
+            if Config.DATABASE_READ_URL and not self.is_sqlite:
+                self.read_engine = create_async_engine(
+                    async_url(Config.DATABASE_READ_URL),
+                    **engine_options(Config.DATABASE_READ_POOL_SIZE, self.metrics['replica'])
+                )
+                self._capacity['replica'] = Config.DATABASE_READ_POOL_SIZE + Config.DB_MAX_OVERFLOW
+                self.read_session = async_sessionmaker(
+                    self.read_engine,
+                    class_=AsyncSession,
+                    expire_on_commit=False
+                )
+                logger.info("Read replica configured")
+            
+            # Create tables only when the schema version changed
             async with self.engine.begin() as conn:
-                await conn.run_sync(Base.metadata.create_all)
+                current = await self._schema_version(conn)
+                if current is None or current < SCHEMA_VERSION:
+                    fresh = not await conn.run_sync(
+                        lambda sync_conn: inspect(sync_conn).has_table('posts')
+                    )
+                    await conn.run_sync(Base.metadata.create_all)
+                    if self.is_sqlite:
+                        await conn.execute(text(
+                            f"CREATE TABLE IF NOT EXISTS {SQLITE_SEQUENCES_TABLE} "
+                            f"(name TEXT PRIMARY KEY, value INTEGER NOT NULL)"
+                        ))
+                    if fresh:
+                        # Пустая БД создана сразу в актуальной схеме - миграции считаются применёнными,
+                        # кроме тех, что create_all не воспроизводит (секционирование posts в PostgreSQL)
+                        from services.migrations import MIGRATIONS
+                        versions = [m.version for m in MIGRATIONS if m.fresh or self.is_sqlite]
+                        pending = [m.version for m in MIGRATIONS if m.version not in versions]
+                        await conn.execute(
+                            SchemaMigration.__table__.insert(),
+                            [{'version': version} for version in versions]
+                        )
+                        if pending:
+                            logger.warning(f"Created schema without migrations {pending}, run `python migrate.py`")
+                        else:
+                            logger.info(f"Created schema version {SCHEMA_VERSION}")
+                    elif self.is_sqlite:
+                        # migrate.py работает только с PostgreSQL; новые таблицы уже созданы create_all
+                        logger.warning(
+                            f"SQLite schema version {current} is behind {SCHEMA_VERSION}: "
+                            f"new tables were created, new columns of existing tables are not"
+                        )
+                    else:
+                        logger.warning(
+                            f"Schema version {current} is behind {SCHEMA_VERSION}, run `python migrate.py`"
+                        )
                 
+            self._ensure_healthcheck()
             logger.info("Database initialized successfully")
             
         except Exception as e:
             logger.error(f"Failed to initialize database: {e}")
             raise
             
+    async def _schema_version(self, conn) -> Optional[int]:
+        """Latest applied schema version, None if the version table doesn't exist yet"""
+        has_table = await conn.run_sync(
+            lambda sync_conn: inspect(sync_conn).has_table(SchemaMigration.__tablename__)
+        )
+        if not has_table:
+            return None
+        return await conn.scalar(select(func.max(SchemaMigration.version)))
+            
     async def close(self):
         """Close database connection"""
+        if self._health_task:
+            self._health_task.cancel()
+            try:
+                await self._health_task
+            except asyncio.CancelledError:
+                pass
+            self._health_task = None
+        if self.read_engine:
+            await self.read_engine.dispose()
         if self.engine:
             await self.engine.dispose()
             
     @asynccontextmanager
     async def get_session(self):
         """Get database session"""
-        async with self.async_session() as session:
+        self.sessions['primary'] += 1
+        async with self._writer.hold() if self.is_sqlite else nullcontext():
+            async with self.async_session() as session:
+                try:
+                    yield session
+                    await session.commit()
+                except Exception:
+                    await session.rollback()
+                    raise
+                finally:
+                    await session.close()
+
+    def insert(self, model):
+        """INSERT with on_conflict_do_update / on_conflict_do_nothing for the current dialect"""
+        return sqlite_insert(model) if self.is_sqlite else pg_insert(model)
+
+    def greatest(self, *values):
+        """GREATEST() ignoring NULLs; SQLite's max() returns NULL if any argument is NULL"""
+        if not self.is_sqlite:
+            return func.greatest(*values)
+        return func.max(*(func.coalesce(value, *values[:index], *values[index + 1:])
+                          for index, value in enumerate(values)))
+
+    async def nextval(self, session, sequence) -> int:
+        """nextval() of a Sequence; on SQLite emulated by a counter row"""
+        if not self.is_sqlite:
+            return await session.scalar(text(f"SELECT nextval('{sequence.name}')"))
+        return await session.scalar(
+            text(
+                f"INSERT INTO {SQLITE_SEQUENCES_TABLE} (name, value) VALUES (:name, :start) "
+                f"ON CONFLICT (name) DO UPDATE SET value = value + :increment RETURNING value"
+            ),
+            {'name': sequence.name, 'start': sequence.start or 1, 'increment': sequence.increment or 1}
+        )
+                
+    # ============= РЕПЛИКА =============
+
+    def pin_primary(self, user_id: int, now: float = None):
+        """Read this user's data from the primary for a while (after a write)"""
+        if self.read_engine is None:
+            return
+        now = time.monotonic() if now is None else now
+        self._pinned.pop(user_id, None)
+        self._pinned[user_id] = now + Config.READ_YOUR_WRITES_SECONDS
+
+        while self._pinned:
+            oldest = next(iter(self._pinned))
+            if self._pinned[oldest] > now:
+                break
+            del self._pinned[oldest]
+
+    def is_pinned(self, user_id: Optional[int], now: float = None) -> bool:
+        if user_id is None:
+            return False
+        expires = self._pinned.get(user_id)
+        return expires is not None and expires > (time.monotonic() if now is None else now)
+
+    @asynccontextmanager
+    async def get_read_session(self, user_id: int = None):
+        """
+        Read-only session: the replica if configured and `user_id` hasn't
+        written recently, the primary otherwise. Nothing is committed.
+        """
+        if self.read_session is None or self.is_pinned(user_id):
+            self.sessions['primary'] += 1
+            factory = self.async_session
+        else:
+            self.sessions['replica'] += 1
+            factory = self.read_session
+
+        async with factory() as session:
             try:
                 yield session
-                await session.commit()
-            except Exception:
-                await session.rollback()
-                raise
             finally:
+                await session.rollback()
                 await session.close()
-                
+
+    # ============= СОСТОЯНИЕ ПУЛОВ =============
+
+    def _engines(self):
+        for name, engine in (('primary', self.engine), ('replica', self.read_engine)):
+            if engine is not None:
+                yield name, engine
+
+    def _ensure_healthcheck(self):
+        if not Config.DB_HEALTHCHECK_INTERVAL:
+            return
+        if self._health_task is not None and not self._health_task.done():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._health_task = loop.create_task(self._healthcheck_loop())
+
+    async def _healthcheck_loop(self):
+        while True:
+            await asyncio.sleep(Config.DB_HEALTHCHECK_INTERVAL)
+            await self.check_health()
+
+    async def check_health(self) -> Dict[str, bool]:
+        """SELECT 1 on every engine; a failed pool is disposed and reconnects on next use"""
+        for name, engine in self._engines():
+            try:
+                async with engine.connect() as conn:
+                    await conn.execute(text("SELECT 1"))
+                if self.healthy.get(name) is False:
+                    logger.info(f"Database pool {name} recovered")
+                self.healthy[name] = True
+            except Exception as e:
+                logger.error(f"Database pool {name} health check failed: {e}")
+                self.healthy[name] = False
+                try:
+                    await engine.dispose()
+                except Exception as dispose_error:
+                    logger.error(f"Could not dispose pool {name}: {dispose_error}")
+        self.last_health_check = datetime.utcnow()
+        return dict(self.healthy)
+
+    def pool_stats(self) -> Dict[str, dict]:
+        """Connection usage, checkout waits and health per pool"""
+        stats = {}
+        for name, engine in self._engines():
+            pool = engine.pool
+            entry = {
+                'pool': type(pool).__mro__[2].__name__,  # без Timed-обёртки
+                'sessions': self.sessions[name],
+                'healthy': self.healthy.get(name),
+                **self.metrics[name].snapshot()
+            }
+            if isinstance(pool, QueuePool):
+                entry.update(
+                    size=pool.size(),
+                    checked_out=pool.checkedout(),
+                    checked_in=pool.checkedin(),
+                    overflow=pool.overflow()
+                )
+                capacity = self._capacity.get(name, 0)
+                if capacity > 0 and Config.DB_MAX_OVERFLOW >= 0:
+                    entry['saturation'] = pool.checkedout() / capacity
+            stats[name] = entry
+        return stats
+
     async def execute(self, query, *args, **kwargs):
         """Execute raw SQL query"""
         async with self.get_session() as session:
@@ -0,0 +1,142 @@
+"""
+Expiring in-memory maps.
+
+ExpiringDict is a dict whose entries live for a TTL. Deadlines are not
+tracked per map. Every ExpiringDict schedules its entries on one shared
+TimerWheel: a ring of slots, each holding the entries that fall due in one
+tick. Scheduling appends to a slot and eviction pops whole slots, so both
+are O(1) amortised per entry. An entry with a TTL longer than one turn of
+the ring is re-filed once per turn.
+
+The wheel is advanced by the maps themselves on every write and size
+query, so eviction needs no background task. Idle registries do not
+shrink, but they do not grow either. Reads check the deadline directly,
+so an expired entry is never returned even if its slot has not been
+swept yet. A re-set key gets a new deadline. Its old wheel entry is
+ignored when it comes due.
+"""
+
+import time
+import weakref
+from collections.abc import MutableMapping
+from typing import Any, Dict, Hashable, List, Tuple
+
+class TimerWheel:
+    """Hashed timer wheel shared by all ExpiringDict instances"""
+
+    def __init__(self, resolution: float = 5.0, slots: int = 1024):
+        self.resolution = resolution
+        self.slots = slots
+        self._wheel: List[list] = [[] for _ in range(slots)]
+        self._tick = self._tick_of(time.monotonic())
+        self._maps = weakref.WeakValueDictionary()  # id -> ExpiringDict (Mapping не хешируется)
+
+    def _tick_of(self, moment: float) -> int:
+        return int(moment // self.resolution)
+
+    def register(self, mapping: 'ExpiringDict'):
+        self._maps[id(mapping)] = mapping
+
+    def schedule(self, mapping: 'ExpiringDict', key: Hashable, deadline: float):
+        tick = max(self._tick_of(deadline), self._tick + 1)
+        self._wheel[tick % self.slots].append((deadline, mapping, key))
+
+    def advance(self, now: float = None) -> int:
+        """Sweep the slots of the ticks elapsed since the last call; returns evicted entries"""
+        now = time.monotonic() if now is None else now
+        target = self._tick_of(now)
+        if target <= self._tick:
+            return 0
+
+        # После долгого простоя хватает одного оборота кольца
+        first = max(self._tick + 1, target - self.slots + 1)
+        self._tick = target
+        evicted = 0
+        for tick in range(first, target + 1):
+            index = tick % self.slots
+            due, self._wheel[index] = self._wheel[index], []
+            for deadline, mapping, key in due:
+                if deadline <= now:
+                    evicted += mapping._expire(key, deadline)
+                else:
+                    self.schedule(mapping, key, deadline)
+        return evicted
+
+    def stats(self) -> List[dict]:
+        self.advance()
+        return sorted((mapping.stats() for mapping in list(self._maps.values())), key=lambda stats: stats['name'])
+
+class ExpiringDict(MutableMapping):
+    """
+    Dict with per-entry TTL (seconds).
+
+    `ttl` is the default for item assignment; set() takes a per-entry one.
+    size and evicted are exposed through stats() for monitoring.
+    """
+
+    def __init__(self, ttl: float = None, name: str = None, wheel: TimerWheel = None):
+        self.ttl = ttl
+        self.name = name or f"map_{id(self):x}"
+        self.evicted = 0
+        self._data: Dict[Hashable, Tuple[Any, float]] = {}
+        self._wheel = wheel or timer_wheel
+        self._wheel.register(self)
+
+    def set(self, key: Hashable, value: Any, ttl: float = None):
+        ttl = self.ttl if ttl is None else ttl
+        if ttl is None:
+            raise ValueError(f"{self.name}: TTL is not set")
+        self._wheel.advance()
+        deadline = time.monotonic() + ttl
+        self._data[key] = (value, deadline)
+        self._wheel.schedule(self, key, deadline)
+
+    def __setitem__(self, key, value):
+        self.set(key, value)
+
+    def __getitem__(self, key):
+        value, deadline = self._data[key]
+        if deadline <= time.monotonic():
+            del self._data[key]
+            self.evicted += 1
+            raise KeyError(key)
+        return value
+
+    def __delitem__(self, key):
+        del self._data[key]
+
+    def __iter__(self):
+        now = time.monotonic()
+        return iter([key for key, (_, deadline) in self._data.items() if deadline > now])
+
+    def __len__(self) -> int:
+        self._wheel.advance()
+        return len(self._data)
+
+    def __repr__(self) -> str:
+        return f"ExpiringDict({self.name!r}, size={len(self._data)})"
+
+    def remaining(self, key: Hashable) -> float:
+        """Seconds until the entry expires, 0 if there is none"""
+        entry = self._data.get(key)
+        if entry is None:
+            return 0
+        return max(entry[1] - time.monotonic(), 0)
+
+    def clear(self):
+        # Записи в колесе станут устаревшими и будут пропущены
+        self._data.clear()
+
+    def _expire(self, key: Hashable, deadline: float) -> int:
+        entry = self._data.get(key)
+        if entry is None or entry[1] != deadline:
+            return 0
+        del self._data[key]
+        self.evicted += 1
+        return 1
+
+    def stats(self) -> dict:
+        return {'name': self.name, 'size': len(self._data), 'evicted': self.evicted}
+
+# Global instance
+timer_wheel = TimerWheel()
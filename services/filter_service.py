@@ -2,6 +2,23 @@ from config import Config
 import re
 from typing import List, Tuple
 
+# Шаблоны компилируются один раз при импорте, а не на каждое сообщение
+URL_PATTERN = re.compile(r'(?:(?:https?|ftp):\/\/)?(?:[\w-]+\.)+[a-z]{2,}')
+LINK_PATTERN = re.compile(r'(?:(?:https?|ftp):\/\/)?(?:[\w-]+\.)+[a-z]{2,}(?:\/[^\s]*)?', re.IGNORECASE)
+TG_USERNAME_PATTERN = re.compile(r'@[a-zA-Z][a-zA-Z0-9_]{4,}')
+WHITESPACE_PATTERN = re.compile(r'\s+')
+SPAM_PATTERNS = [
+    (re.compile(r'(?:earn|make)\s+\$?\d+\s*(?:daily|weekly|monthly)'), "Financial spam"),
+    (re.compile(r'(?:click|visit)\s+(?:here|this|link)'), "Clickbait spam"),
+    (re.compile(r'(?:100%|guaranteed)\s+(?:free|profit|income)'), "Guarantee spam"),
+    (re.compile(r'(?:whatsapp|telegram|viber)\s*:\s*\+?\d{10,}'), "Contact spam"),
+    (re.compile(r'(?:crypto|bitcoin|forex)\s+(?:signals|trading|investment)'), "Crypto spam")
+]
+REPEATED_CHARS_PATTERN = re.compile(r'(.)\1{5,}')
+PHONE_SEPARATORS_PATTERN = re.compile(r'[\s\-\(\)]')
+PHONE_PATTERN = re.compile(r'^\+?\d{10,15}$')
+USERNAME_PATTERN = re.compile(r'^@?[a-zA-Z][a-zA-Z0-9_]{4,31}$')
+
 class FilterService:
     """Service for filtering content"""
     
@@ -21,8 +38,7 @@ class FilterService:
                 return True
         
         # Check for URL patterns
-        url_pattern = r'(?:(?:https?|ftp):\/\/)?(?:[\w-]+\.)+[a-z]{2,}'
-        urls = re.findall(url_pattern, text_lower)
+        urls = URL_PATTERN.findall(text_lower)
         
         if urls:
             # Check if any found URL is in banned list
@@ -38,13 +54,8 @@ class FilterService:
         if not text:
             return []
         
-        # Pattern for URLs
-        url_pattern = r'(?:(?:https?|ftp):\/\/)?(?:[\w-]+\.)+[a-z]{2,}(?:\/[^\s]*)?'
-        urls = re.findall(url_pattern, text, re.IGNORECASE)
-        
-        # Pattern for Telegram usernames
-        tg_pattern = r'@[a-zA-Z][a-zA-Z0-9_]{4,}'
-        tg_usernames = re.findall(tg_pattern, text)
+        urls = LINK_PATTERN.findall(text)
+        tg_usernames = TG_USERNAME_PATTERN.findall(text)
         
         return urls + tg_usernames
     
@@ -54,7 +65,7 @@ class FilterService:
             return ""
         
         # Remove multiple spaces
-        text = re.sub(r'\s+', ' ', text)
+        text = WHITESPACE_PATTERN.sub(' ', text)
         
         # Remove leading/trailing whitespace
         text = text.strip()
@@ -71,17 +82,8 @@ class FilterService:
         
         text_lower = text.lower()
         
-        # Common spam patterns
-        spam_patterns = [
-            (r'(?:earn|make)\s+\$?\d+\s*(?:daily|weekly|monthly)', "Financial spam"),
-            (r'(?:click|visit)\s+(?:here|this|link)', "Clickbait spam"),
-            (r'(?:100%|guaranteed)\s+(?:free|profit|income)', "Guarantee spam"),
-            (r'(?:whatsapp|telegram|viber)\s*:\s*\+?\d{10,}', "Contact spam"),
-            (r'(?:crypto|bitcoin|forex)\s+(?:signals|trading|investment)', "Crypto spam")
-        ]
-        
-        for pattern, reason in spam_patterns:
-            if re.search(pattern, text_lower):
+        for pattern, reason in SPAM_PATTERNS:
+            if pattern.search(text_lower):
                 return True, reason
         
         # Check for excessive caps
@@ -91,7 +93,7 @@ class FilterService:
                 return True, "Excessive capital letters"
         
         # Check for repeated characters
-        if re.search(r'(.)\1{5,}', text):
+        if REPEATED_CHARS_PATTERN.search(text):
             return True, "Repeated characters spam"
         
         return False, ""
@@ -99,16 +101,14 @@ class FilterService:
     def is_valid_phone(self, phone: str) -> bool:
         """Validate phone number format"""
         # Remove spaces and dashes
-        phone = re.sub(r'[\s\-\(\)]', '', phone)
+        phone = PHONE_SEPARATORS_PATTERN.sub('', phone)
         
         # Check if it matches phone pattern
-        pattern = r'^\+?\d{10,15}$'
-        return bool(re.match(pattern, phone))
+        return bool(PHONE_PATTERN.match(phone))
     
     def is_valid_username(self, username: str) -> bool:
         """Validate Telegram username"""
-        pattern = r'^@?[a-zA-Z][a-zA-Z0-9_]{4,31}$'
-        return bool(re.match(pattern, username))
+        return bool(USERNAME_PATTERN.match(username))
     
     def sanitize_html(self, text: str) -> str:
         """Sanitize text for HTML display"""
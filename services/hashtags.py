@@ -1,61 +1,32 @@
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
+import re
+from config import Config
+
+HASHTAG_PATTERN = re.compile(r'#\w+')
+
+# Категории вне Config.PUBLICATION_TREE, которые ещё встречаются в заявках и сохранённых черновиках
+LEGACY_CATEGORY_HASHTAGS: Dict[str, List[str]] = {
+    "🕵️ Поиск": ["#Поиск"],
+    "📃 Предложения": ["#Предложения"],
+    "⭐️ Пиар": ["#Пиар"],
+}
+
+# (категория, раздел) -> хештеги раздела вместе с родительскими; сама категория - (категория, категория)
+SECTION_HASHTAGS: Dict[Tuple[str, str], List[str]] = {
+    (category, category): tags for category, tags in LEGACY_CATEGORY_HASHTAGS.items()
+}
+SECTION_HASHTAGS.update(
+    ((path[0], path[-1]), list(hashtags)) for path, node, hashtags in Config.iter_sections()
+)
 
 class HashtagService:
     """Service for generating hashtags"""
     
     def generate_hashtags(self, category: str, subcategory: Optional[str] = None) -> List[str]:
-        """Generate hashtags based on category and subcategory"""
-        hashtags = []
-        
-        # Category hashtags
-        category_tags = {
-            "🗯️ Будапешт": "#Будапешт",
-            "🕵️ Поиск": "#Поиск",
-            "📃 Предложения": "#Предложения",
-            "⭐️ Пиар": "#Пиар"
-        }
-        
-        # Subcategory hashtags
-        subcategory_tags = {
-            "🗣️ Объявления": "#Объявления",
-            "📺 Новости": "#Новости",
-            "🤐 Подслушано": "#Подслушано",
-            "🤮 Жалобы": "#Жалобы",
-            "👷‍♀️ Работа": "#Работа",
-            "🏠 Аренда": "#Аренда",
-            "🔻 Куплю": "#Куплю",
-            "🔺 Продам": "#Продам",
-            "🎉 События": "#События",
-            "📦 Отдам даром": "#ОтдамДаром",
-            "🌪️ Важно": "#Важно",
-            "❔ Другое": "#Другое"
-        }
-        
-        # Add category hashtag
-        if category in category_tags:
-            hashtags.append(category_tags[category])
-        
-        # Add subcategory hashtag
-        if subcategory:
-            # For nested subcategories
-            if subcategory in subcategory_tags:
-                hashtags.append(subcategory_tags[subcategory])
-            # Check if it's an announcement subcategory
-            elif subcategory in ["👷‍♀️ Работа", "🏠 Аренда", "🔻 Куплю", "🔺 Продам", 
-                                "🎉 События", "📦 Отдам даром", "🌪️ Важно", "❔ Другое"]:
-                hashtags.append("#Объявления")
-                if subcategory in subcategory_tags:
-                    hashtags.append(subcategory_tags[subcategory])
-        
-        # Remove duplicates while preserving order
-        seen = set()
-        unique_hashtags = []
-        for tag in hashtags:
-            if tag not in seen:
-                seen.add(tag)
-                unique_hashtags.append(tag)
-        
-        return unique_hashtags
+        """Generate hashtags based on category and subcategory (from Config.PUBLICATION_TREE)"""
+        if subcategory and (category, subcategory) in SECTION_HASHTAGS:
+            return list(SECTION_HASHTAGS[(category, subcategory)])
+        return list(SECTION_HASHTAGS.get((category, category), []))
     
     def format_hashtags(self, hashtags: List[str]) -> str:
         """Format hashtags for display"""
@@ -63,6 +34,4 @@ class HashtagService:
     
     def parse_hashtags(self, text: str) -> List[str]:
         """Extract hashtags from text"""
-        import re
-        pattern = r'#\w+'
-        return re.findall(pattern, text)
+        return HASHTAG_PATTERN.findall(text)
@@ -0,0 +1,341 @@
+import asyncio
+import logging
+import random
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# ============= SKIP LIST =============
+
+class _Node:
+    __slots__ = ('key', 'next', 'width')
+
+    def __init__(self, key, level: int):
+        self.key = key
+        self.next = [None] * level
+        self.width = [1] * level
+
+class IndexableSkipList:
+    """
+    Sorted container with O(log n) insert, remove, rank and access by index.
+    Each link stores how many positions it skips ("width"), which makes
+    positional queries as cheap as lookups.
+    """
+
+    MAX_LEVEL = 24  # хватает на ~16 млн элементов при p = 0.5
+
+    def __init__(self, seed: int = None):
+        self._head = _Node(None, self.MAX_LEVEL)
+        self._size = 0
+        self._level = 1  # уровни выше не используются, их ширина у головы = size + 1
+        self._random = random.Random(seed)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _random_level(self) -> int:
+        level = 1
+        while level < self.MAX_LEVEL and self._random.random() < 0.5:
+            level += 1
+        return level
+
+    def _find(self, key):
+        """Rightmost node before `key` on every level and its position"""
+        chain = [None] * self.MAX_LEVEL
+        positions = [0] * self.MAX_LEVEL
+        node, position = self._head, 0
+        for level in range(self._level - 1, -1, -1):
+            while node.next[level] is not None and node.next[level].key < key:
+                position += node.width[level]
+                node = node.next[level]
+            chain[level] = node
+            positions[level] = position
+        return chain, positions, position
+
+    def insert(self, key):
+        chain, positions, position = self._find(key)
+        level = self._random_level()
+        for i in range(self._level, level):
+            chain[i] = self._head
+            self._head.width[i] = self._size + 1
+        self._level = max(self._level, level)
+        node = _Node(key, level)
+        for i in range(level):
+            prev = chain[i]
+            skipped = position - positions[i]
+            node.next[i] = prev.next[i]
+            prev.next[i] = node
+            node.width[i] = prev.width[i] - skipped
+            prev.width[i] = skipped + 1
+        for i in range(level, self._level):
+            chain[i].width[i] += 1
+        self._size += 1
+
+    def remove(self, key):
+        chain, _, _ = self._find(key)
+        node = chain[0].next[0]
+        if node is None or node.key != key:
+            raise KeyError(key)
+        for i in range(self._level):
+            if i < len(node.next) and chain[i].next[i] is node:
+                chain[i].width[i] += node.width[i] - 1
+                chain[i].next[i] = node.next[i]
+            else:
+                chain[i].width[i] -= 1
+        self._size -= 1
+
+    def rank(self, key) -> int:
+        """0-based position of key, KeyError if absent"""
+        chain, _, position = self._find(key)
+        node = chain[0].next[0]
+        if node is None or node.key != key:
+            raise KeyError(key)
+        return position
+
+    def _node_at(self, index: int) -> _Node:
+        if not 0 <= index < self._size:
+            raise IndexError(index)
+        node, remaining = self._head, index + 1
+        for level in range(self._level - 1, -1, -1):
+            while node.next[level] is not None and node.width[level] <= remaining:
+                remaining -= node.width[level]
+                node = node.next[level]
+        return node
+
+    def __getitem__(self, index: int):
+        return self._node_at(index).key
+
+    def slice(self, start: int, count: int) -> Iterator:
+        """Keys from position `start`, at most `count` of them"""
+        if start >= self._size or count <= 0:
+            return
+        node = self._node_at(max(start, 0))
+        while node is not None and count:
+            yield node.key
+            node = node.next[0]
+            count -= 1
+
+# ============= LEADERBOARDS =============
+
+class Leaderboard:
+    """Scores per user ordered by (score desc, user_id asc)"""
+
+    def __init__(self, period: str = 'all'):
+        self.period = period
+        self._scores: Dict[int, int] = {}
+        self._order = IndexableSkipList()
+        self.dirty: Set[int] = set()  # изменились после последнего снимка
+
+    def __len__(self) -> int:
+        return len(self._scores)
+
+    def set(self, user_id: int, score: int, mark_dirty: bool = True):
+        old = self._scores.get(user_id)
+        if old == score:
+            return
+        if old is not None:
+            self._order.remove((-old, user_id))
+        self._scores[user_id] = score
+        self._order.insert((-score, user_id))
+        if mark_dirty:
+            self.dirty.add(user_id)
+
+    def add(self, user_id: int, delta: int):
+        if delta:
+            self.set(user_id, self._scores.get(user_id, 0) + delta)
+
+    def score(self, user_id: int) -> Optional[int]:
+        return self._scores.get(user_id)
+
+    def rank(self, user_id: int) -> Optional[int]:
+        """1-based place or None if the user has no score"""
+        score = self._scores.get(user_id)
+        if score is None:
+            return None
+        return self._order.rank((-score, user_id)) + 1
+
+    def top(self, limit: int = 10, offset: int = 0) -> List[Tuple[int, int]]:
+        """[(user_id, score), ...] starting at `offset`"""
+        return [(user_id, -score) for score, user_id in self._order.slice(offset, limit)]
+
+BOARDS = ('messages', 'xp')
+WINDOWS = ('day', 'week', 'all')
+
+def period_id(window: str, now: datetime = None) -> str:
+    """Tumbling window id: 2026-10-19 for day, 2026-W42 for week"""
+    if window == 'all':
+        return 'all'
+    now = now or datetime.now()
+    if window == 'day':
+        return now.strftime('%Y-%m-%d')
+    year, week, _ = now.isocalendar()
+    return f"{year}-W{week:02d}"
+
+class LeaderboardService:
+    """
+    Daily, weekly and all-time boards for messages and XP fed by one event
+    stream. Boards live in memory; changed entries are snapshotted to
+    leaderboard_snapshots every LEADERBOARD_SNAPSHOT_INTERVAL seconds and the
+    current periods are reloaded from there on startup. Works without a DB -
+    then boards just start empty after a restart.
+    """
+
+    def __init__(self, snapshot_interval: float = None):
+        self.snapshot_interval = snapshot_interval or Config.LEADERBOARD_SNAPSHOT_INTERVAL
+        self._boards: Dict[Tuple[str, str], Leaderboard] = {
+            (board, window): Leaderboard(period_id(window)) for board in BOARDS for window in WINDOWS
+        }
+        self._retired: List[Tuple[str, Leaderboard]] = []  # закрытые периоды, ждут последнего снимка
+        self._task: Optional[asyncio.Task] = None
+        self._lock: Optional[asyncio.Lock] = None
+
+    def board(self, board: str = 'messages', window: str = 'all', now: datetime = None) -> Leaderboard:
+        current = self._boards[(board, window)]
+        period = period_id(window, now)
+        if current.period != period:
+            # Новый день/неделя: старую таблицу - в последний снимок, начинаем с нуля
+            if current.dirty:
+                self._retired.append((board, current))
+            current = self._boards[(board, window)] = Leaderboard(period)
+        return current
+
+    def record(self, user_id: int, messages: int = 0, xp: int = 0):
+        """Apply one activity event to every window"""
+        now = datetime.now()
+        for board, delta in (('messages', messages), ('xp', xp)):
+            if delta:
+                for window in WINDOWS:
+                    self.board(board, window, now).add(user_id, delta)
+        self._ensure_running()
+
+    def rank(self, user_id: int, board: str = 'messages', window: str = 'all') -> Tuple[Optional[int], int, int]:
+        """(place or None, score, participants)"""
+        leaderboard = self.board(board, window)
+        return leaderboard.rank(user_id), leaderboard.score(user_id) or 0, len(leaderboard)
+
+    def top(self, board: str = 'messages', window: str = 'all', limit: int = 10) -> List[Tuple[int, int]]:
+        return self.board(board, window).top(limit)
+
+    # ============= SNAPSHOTS =============
+
+    def _ensure_running(self):
+        if self._task is not None and not self._task.done():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._lock = asyncio.Lock()
+        self._task = loop.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.snapshot_interval)
+            try:
+                await self.snapshot()
+            except Exception as e:
+                logger.error(f"Error saving leaderboard snapshot: {e}")
+
+    async def snapshot(self) -> int:
+        """Upsert changed entries of current and just-closed periods. Returns rows written"""
+        from services.db import db
+        from models import LeaderboardSnapshot
+
+        if db.engine is None:
+            return 0
+
+        async with self._lock or asyncio.Lock():
+            pending = self._retired + [(board, self._boards[(board, window)])
+                                       for board in BOARDS for window in WINDOWS]
+            self._retired = []
+
+            rows = []
+            taken = []
+            for board, leaderboard in pending:
+                dirty, leaderboard.dirty = leaderboard.dirty, set()
+                taken.append((leaderboard, dirty))
+                rows.extend(
+                    {'board': board, 'period': leaderboard.period, 'user_id': user_id,
+                     'score': leaderboard.score(user_id) or 0, 'updated_at': datetime.utcnow()}
+                    for user_id in dirty
+                )
+            if not rows:
+                return 0
+
+            try:
+                async with db.get_session() as session:
+                    for start in range(0, len(rows), 1000):
+                        stmt = db.insert(LeaderboardSnapshot).values(rows[start:start + 1000])
+                        stmt = stmt.on_conflict_do_update(
+                            index_elements=[LeaderboardSnapshot.board, LeaderboardSnapshot.period,
+                                            LeaderboardSnapshot.user_id],
+                            set_={'score': stmt.excluded.score, 'updated_at': stmt.excluded.updated_at}
+                        )
+                        await session.execute(stmt)
+            except Exception:
+                for leaderboard, dirty in taken:
+                    leaderboard.dirty |= dirty
+                raise
+
+            logger.debug(f"Saved {len(rows)} leaderboard entries")
+            return len(rows)
+
+    async def load(self):
+        """Restore current periods from snapshots; seed all-time boards from users on first run"""
+        from services.db import db
+        from models import LeaderboardSnapshot, User
+        from sqlalchemy import select, or_, and_
+
+        if db.engine is None:
+            return
+
+        wanted = [(board, window, period_id(window)) for board in BOARDS for window in WINDOWS]
+        async with db.get_session() as session:
+            result = await session.execute(
+                select(LeaderboardSnapshot.board, LeaderboardSnapshot.period,
+                       LeaderboardSnapshot.user_id, LeaderboardSnapshot.score)
+                .where(or_(*(
+                    and_(LeaderboardSnapshot.board == board, LeaderboardSnapshot.period == period)
+                    for board, _, period in wanted
+                )))
+            )
+            rows = result.all()
+
+            seed = []
+            if not any(period == 'all' for _, period, _, _ in rows):
+                result = await session.execute(
+                    select(User.id, User.message_count, User.xp)
+                    .where(or_(User.message_count > 0, User.xp > 0))
+                )
+                seed = result.all()
+
+        windows_by_period = {(board, period): window for board, window, period in wanted}
+        for board, period, user_id, score in rows:
+            window = windows_by_period[(board, period)]
+            self._boards[(board, window)].set(user_id, score, mark_dirty=False)
+
+        for user_id, messages, xp in seed:
+            if messages:
+                self._boards[('messages', 'all')].set(user_id, messages)
+            if xp:
+                self._boards[('xp', 'all')].set(user_id, xp)
+
+        logger.info(f"Leaderboards restored: {len(rows)} snapshot rows, {len(seed)} seeded users")
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            await self.snapshot()
+        except Exception as e:
+            logger.error(f"Error saving leaderboard snapshot on shutdown: {e}")
+
+# Global instance
+leaderboards = LeaderboardService()
@@ -0,0 +1,218 @@
+import logging
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+from config import Config
+from services.callbacks import encode
+
+logger = logging.getLogger(__name__)
+
+# ============= СТАТИЧЕСКИЕ ЭКРАНЫ =============
+# Кнопка: (текст, callback_data) или (текст, {'url': ...})
+
+MAIN_MENU_TEXT = (
+    "👋🏻 *Привет❗️*\n"
+    "*Я Трикс* – гид навигатор по Будапешту и Венгрии 🇭🇺.\n\n"
+
+    "🗯️ *Наше сообщество*:\n"
+    "🙅‍♂️ *Канал* — основные публикации и новости\n"
+    "🙅‍♀️ *Чат* — живое общение и обсуждения\n"
+    "🙅 *Каталог* — список мастеров и услуг\n"
+    "🕵️‍♂️ *КОП* — Барахолка: Куплю / Отдам / Продам\n\n"
+
+    "*Хотите сделать публикацию❔*\n"
+    "Нажмите 🚶‍♀️‍➡️*Писать* \n\n"
+
+    "🏹Быстро•⚔️Удобно•🛡️Безопасно•\n\n"
+    "🔒 *Добавляйте Трикса в закрепленные*"
+)
+
+WRITE_MENU_TEXT = (
+    "• *Выбор и описание разделов*\n\n"
+
+    "*Пост в 🙅‍♂️ Будапешт / 🕵🏼‍♀️ КОП*\n"
+    "  - Канал Будапешт: объявления, новости, жалобы, подслушано, важное\n"
+    "  - Канал Куплю/Отдам/Продам: главная барахолка Будапешта и 🇭🇺\n\n"
+
+    "*Заявка в 🙅 Каталог Услуг*\n"
+    "  - Добавляйтесь в список мастеров Будапешта\n"
+    "  - Разные направления отсортированы по хештегам для удобного поиска пользователем\n"
+    "  - Примеры: маникюр, репетитор, тренер, врач, грузчик...\n\n"
+
+    "*⚡️ Актуальное*\n"
+    "  - Важные и срочные сообщения, публикуются в чат и закрепляются\n"
+    "  - Примеры:\n"
+    "      • нужен стоматолог сегодня\n"
+    "      • потерялась сумка в 13 районе\n"
+    "      • ищу 🚐 для переезда\n"
+    "      • в поиске 👷🏽 на завтра — оплата в конце дня\n"
+    "*🚶‍♀️ Читать* — возврат в главное меню"
+)
+
+STATIC_SCREENS = {
+    'main': {
+        'text': MAIN_MENU_TEXT,
+        'fallback': "TrixBot - топ комьюнити Будапешта и 🇭🇺\n\nНажмите 'Писать' чтобы создать публикацию",
+        'rows': [
+            [("🙅‍♂️ Будапешт - канал", {'url': "https://t.me/snghu"})],
+            [("🙅‍♀️ Будапешт - чат", {'url': "https://t.me/tgchatxxx"})],
+            [("🙅 Будапешт - каталог услуг", {'url': "https://t.me/trixvault"})],
+            [("🕵️‍♂️ Куплю / Отдам / Продам", {'url': "https://t.me/hungarytrade"})],
+            [("🚶‍♀️‍➡️ Писать", "menu:write")]
+        ]
+    },
+    'write': {
+        'text': WRITE_MENU_TEXT,
+        'fallback': "Выберите раздел публикации:",
+        'rows': [
+            [("Пост в 🙅‍♂️Будапешт/🕵🏼‍♀️КОП", "menu:budapest")],
+            [("Заявка в 🙅Каталог Услуг", "menu:services")],
+            [("⚡️Актуальное", "menu:actual")],
+            [("🚶‍♀️Читать", "menu:read")]
+        ]
+    }
+}
+
+# Экраны из разделов Config.PUBLICATION_TREE: ключ раздела -> заголовок, кнопок в ряд,
+# куда "Назад" и маршрут (services.callbacks) для разделов без своего экрана
+SECTION_SCREENS = {
+    'budapest': {
+        'title': "🙅‍♂️ *Пост в Будапешт*", 'prompt': "Выберите тип публикации:",
+        'columns': 1, 'back': 'write', 'callback': ('menu',)
+    },
+    'announcements': {
+        'title': "📣 *Объявления*", 'prompt': "Выберите подкатегорию:",
+        'columns': 2, 'back': 'budapest', 'callback': ('pub', 'cat')
+    },
+}
+
+# callback_data menu:<action> -> экран
+SCREEN_ALIASES = {
+    'read': 'main',
+    'back': 'main',
+}
+
+class Section(NamedTuple):
+    key: str
+    label: str
+    path: Tuple[str, ...]  # названия от категории до раздела
+    hashtags: Tuple[str, ...]
+    anonymous: bool
+    description: Optional[str]
+
+    @property
+    def category(self) -> str:
+        return self.path[0]
+
+    @property
+    def subcategory(self) -> Optional[str]:
+        return self.path[-1] if len(self.path) > 1 else None
+
+class MenuScreen(NamedTuple):
+    text: str
+    markup: InlineKeyboardMarkup
+    fallback: str  # без Markdown, если отрисовка не удалась
+
+def _button(label: str, target) -> InlineKeyboardButton:
+    if isinstance(target, dict):
+        return InlineKeyboardButton(label, **target)
+    return InlineKeyboardButton(label, callback_data=target)
+
+def _markup(rows) -> InlineKeyboardMarkup:
+    return InlineKeyboardMarkup(tuple(tuple(_button(label, target) for label, target in row) for row in rows))
+
+class MenuTree:
+    """
+    Navigation menus compiled once at import.
+
+    Static screens and the publication sections of Config.PUBLICATION_TREE are
+    turned into MenuScreen objects holding ready InlineKeyboardMarkup (PTB
+    objects are immutable, so they are safely shared between requests). The
+    route table maps menu:<action> callbacks to screens. Handlers only look
+    a screen up and send it, and section labels, hashtags and buttons all
+    come from the same tree.
+    """
+
+    def __init__(self, tree: dict = None):
+        self.sections: Dict[str, Section] = {}
+        for path, node, hashtags in Config.iter_sections(tree):
+            self.sections[node['key']] = Section(
+                key=node['key'],
+                label=path[-1],
+                path=path,
+                hashtags=hashtags,
+                anonymous=node.get('anonymous', False),
+                description=node.get('description')
+            )
+
+        self.screens: Dict[str, MenuScreen] = {}
+        for name, spec in STATIC_SCREENS.items():
+            self.screens[name] = MenuScreen(spec['text'], _markup(spec['rows']), spec['fallback'])
+        for key, spec in SECTION_SCREENS.items():
+            self.screens[key] = self._compile_section(key, spec)
+
+        self.routes: Dict[str, str] = {name: name for name in self.screens}
+        self.routes.update(SCREEN_ALIASES)
+        self._back: Dict[Tuple[str, str], InlineKeyboardMarkup] = {}
+
+    def children(self, key: str) -> List[Section]:
+        parent = self.sections[key]
+        return [
+            section for section in self.sections.values()
+            if len(section.path) == len(parent.path) + 1 and section.path[:-1] == parent.path
+        ]
+
+    def _compile_section(self, key: str, spec: dict) -> MenuScreen:
+        buttons = []
+        lines = []
+        for child in self.children(key):
+            if child.key in SECTION_SCREENS:
+                target = f"menu:{child.key}"
+            else:
+                target = encode(*spec['callback'], child.key)
+            label = f"{child.label} (анонимно)" if child.anonymous else child.label
+            buttons.append((label, target))
+
+            if child.description:
+                icon, _, name = child.label.partition(' ')
+                lines.append(f"{icon} *{name}* - {child.description}")
+
+        columns = spec['columns']
+        rows = [buttons[start:start + columns] for start in range(0, len(buttons), columns)]
+        rows.append([("🔙 Назад", f"menu:{spec['back']}")])
+
+        text = f"{spec['title']}\n\n{spec['prompt']}"
+        if lines:
+            text += "\n\n" + "\n".join(lines)
+        return MenuScreen(text, _markup(rows), text.replace('*', ''))
+
+    def route(self, action: str) -> Optional[str]:
+        """Screen name for a menu:<action> callback"""
+        return self.routes.get(action)
+
+    def section(self, key: str) -> Optional[Section]:
+        return self.sections.get(key)
+
+    def back(self, action: str, label: str = "🔙 Назад") -> InlineKeyboardMarkup:
+        """Single "back" button keyboard, built once per target"""
+        markup = self._back.get((action, label))
+        if markup is None:
+            markup = self._back[(action, label)] = _markup([[(label, action)]])
+        return markup
+
+    async def show(self, update, name: str):
+        """Edit the callback message (or reply) with a compiled screen"""
+        screen = self.screens[name]
+        message = update.callback_query.message if update.callback_query else update.effective_message
+        try:
+            if update.callback_query:
+                await update.callback_query.edit_message_text(
+                    screen.text, reply_markup=screen.markup, parse_mode='Markdown'
+                )
+            else:
+                await message.reply_text(screen.text, reply_markup=screen.markup, parse_mode='Markdown')
+        except Exception as e:
+            logger.error(f"Error showing menu {name}: {e}")
+            await message.reply_text(screen.fallback, reply_markup=screen.markup)
+
+# Global instance
+menu = MenuTree()
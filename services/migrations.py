@@ -0,0 +1,589 @@
+"""
+Versioned schema migrations.
+
+Each Migration is a numbered list of idempotent steps. Applied versions are
+recorded in schema_migrations, so re-running the runner is a no-op, and a
+half-finished migration resumes where it stopped. Steps are written to keep
+the bot online: indexes are built CONCURRENTLY, backfills run in short
+batched transactions, and column type changes go through expand/contract so
+the only ACCESS EXCLUSIVE lock is a brief metadata swap.
+
+Steps talk to PostgreSQL through a plain asyncpg connection in autocommit
+mode; a step opens a transaction only where it needs one.
+"""
+
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Callable, List, Optional, Sequence
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import CreateTable, CreateIndex
+from models import ModerationClaim, UserState, LeaderboardSnapshot, Referral, RollParticipant, RollDraw, WordGameRecord, PostArchive, SchemaMigration, SCHEMA_VERSION
+from services.partitions import month_start, add_months, partition_ddl
+
+logger = logging.getLogger(__name__)
+
+# Ни один шаг не должен ждать блокировку дольше этого - лучше повторить позже, чем повесить бота
+LOCK_TIMEOUT = '3s'
+DEFAULT_BATCH_SIZE = 1000
+ADVISORY_LOCK_ID = 727001  # один раннер миграций одновременно
+
+Reporter = Callable[[str], None]
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+# ============= STEPS =============
+
+class Step:
+    """One idempotent unit of a migration"""
+
+    description = ''
+
+    async def apply(self, conn, report: Reporter, batch_size: int):
+        raise NotImplementedError
+
+class SQL(Step):
+    """Plain statements executed in one short transaction. Must be idempotent (IF [NOT] EXISTS)"""
+
+    def __init__(self, description: str, *statements: str):
+        self.description = description
+        self.statements = statements
+
+    async def apply(self, conn, report, batch_size):
+        async with conn.transaction():
+            await conn.execute(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'")
+            for statement in self.statements:
+                await conn.execute(statement)
+
+class CreateTables(Step):
+    """Create model tables (and their indexes) that don't exist yet"""
+
+    def __init__(self, *models):
+        self.tables = [model.__table__ for model in models]
+        self.description = "create " + ", ".join(table.name for table in self.tables)
+
+    async def apply(self, conn, report, batch_size):
+        dialect = postgresql.dialect()
+        for table in self.tables:
+            if await conn.fetchval("SELECT to_regclass($1)", table.name):
+                continue
+            async with conn.transaction():
+                await conn.execute(str(CreateTable(table).compile(dialect=dialect)))
+                for index in table.indexes:
+                    await conn.execute(str(CreateIndex(index).compile(dialect=dialect)))
+            report(f"  + таблица {table.name}")
+
+class CreateIndexConcurrently(Step):
+    """CREATE INDEX CONCURRENTLY: no write lock on the table while the index builds"""
+
+    def __init__(self, name: str, table: str, columns: str, unique: bool = False, where: str = None):
+        self.name = name
+        self.table = table
+        self.columns = columns
+        self.unique = unique
+        self.where = where
+        self.description = f"index {name} on {table}({columns})"
+
+    async def apply(self, conn, report, batch_size):
+        valid = await conn.fetchval(
+            "SELECT i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+            "WHERE c.relname = $1", self.name
+        )
+        if valid:
+            return
+        if valid is False:
+            # Прерванный CONCURRENTLY оставляет невалидный индекс - пересоздаём
+            report(f"  ! индекс {self.name} невалиден, пересоздаём")
+            await conn.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {_quote(self.name)}")
+
+        started = time.monotonic()
+        await conn.execute(
+            f"CREATE {'UNIQUE ' if self.unique else ''}INDEX CONCURRENTLY IF NOT EXISTS "
+            f"{_quote(self.name)} ON {_quote(self.table)} ({self.columns})"
+            + (f" WHERE {self.where}" if self.where else "")
+        )
+        report(f"  + индекс {self.name} за {time.monotonic() - started:.1f}с")
+
+class DropIndexConcurrently(Step):
+    """DROP INDEX CONCURRENTLY: the table stays writable while the index goes away"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.description = f"drop index {name}"
+
+    async def apply(self, conn, report, batch_size):
+        if not await conn.fetchval("SELECT to_regclass($1)", self.name):
+            return
+        await conn.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {_quote(self.name)}")
+        report(f"  - индекс {self.name}")
+
+class Backfill(Step):
+    """
+    Batched UPDATE walking the table by primary key.
+    Each batch is its own short transaction, so row locks are held only for
+    `batch_size` rows at a time and the bot keeps writing in between.
+    """
+
+    def __init__(self, table: str, assignments: str, where: str = 'TRUE', key: str = 'id',
+                 description: str = None, pause: float = 0.05):
+        self.table = table
+        self.assignments = assignments
+        self.where = where
+        self.key = key
+        self.pause = pause
+        self.description = description or f"backfill {table}: {assignments}"
+
+    async def apply(self, conn, report, batch_size):
+        table, key = _quote(self.table), _quote(self.key)
+        total = await conn.fetchval(
+            "SELECT GREATEST(reltuples, 0)::bigint FROM pg_class WHERE oid = to_regclass($1)", self.table
+        ) or 0
+
+        last = None
+        done = updated = 0
+        started = reported = time.monotonic()
+        while True:
+            ids = await conn.fetch(
+                f"SELECT {key} FROM {table} "
+                + (f"WHERE {key} > $1 " if last is not None else "WHERE $1::bigint IS NULL ")
+                + f"ORDER BY {key} LIMIT $2",
+                last, batch_size
+            )
+            if not ids:
+                break
+            last = ids[-1][0]
+            status = await conn.execute(
+                f"UPDATE {table} SET {self.assignments} WHERE {key} = ANY($1) AND ({self.where})",
+                [row[0] for row in ids]
+            )
+            updated += int(status.split()[-1])
+            done += len(ids)
+
+            now = time.monotonic()
+            if now - reported >= 5:
+                percent = f" ({min(done / total, 1):.0%})" if total else ""
+                report(f"  … {self.table}: {done}/{total or '?'}{percent}, обновлено {updated}")
+                reported = now
+            if self.pause:
+                await asyncio.sleep(self.pause)
+
+        report(f"  ✓ {self.table}: просмотрено {done}, обновлено {updated} за {time.monotonic() - started:.1f}с")
+
+class ExpandContractColumn(Step):
+    """
+    Online column type change.
+
+    expand:   add <column>__new of the target type and a trigger that keeps it
+              in sync with every INSERT/UPDATE
+    backfill: copy existing rows in batches (Backfill)
+    prepare:  build the unique index for a primary key CONCURRENTLY and prove
+              NOT NULL with a NOT VALID + VALIDATE check (no long lock)
+    contract: one short transaction swaps the columns; the constraint and
+              index already exist, so it only touches the catalog
+
+    `using` is an expression template with {column}, e.g. "{column}::bigint".
+    Secondary indexes on the old column are not carried over - add a
+    CreateIndexConcurrently step after this one if the column has any.
+    """
+
+    def __init__(self, table: str, column: str, new_type: str, using: str = None, key: str = 'id'):
+        self.table = table
+        self.column = column
+        self.new_type = new_type
+        self.using = using or '{column}::' + new_type
+        self.key = key
+        self.new_column = f"{column}__new"
+        self.trigger = f"{table}_{column}__sync"
+        self.description = f"{table}.{column} -> {new_type} (expand/contract)"
+
+    async def _data_type(self, conn, column: str) -> Optional[str]:
+        return await conn.fetchval(
+            "SELECT format_type(a.atttypid, a.atttypmod) FROM pg_attribute a "
+            "WHERE a.attrelid = to_regclass($1) AND a.attname = $2 AND NOT a.attisdropped",
+            self.table, column
+        )
+
+    async def apply(self, conn, report, batch_size):
+        current = await self._data_type(conn, self.column)
+        if current is None:
+            report(f"  - {self.table}.{self.column} не существует, пропуск")
+            return
+        if current == self.new_type:
+            return
+
+        table, column, new_column = _quote(self.table), _quote(self.column), _quote(self.new_column)
+        pk_name = await conn.fetchval(
+            "SELECT con.conname FROM pg_constraint con "
+            "JOIN pg_attribute a ON a.attrelid = con.conrelid AND a.attnum = ANY(con.conkey) "
+            "WHERE con.conrelid = to_regclass($1) AND con.contype = 'p' AND a.attname = $2",
+            self.table, self.column
+        )
+        not_null = await conn.fetchval(
+            "SELECT attnotnull FROM pg_attribute WHERE attrelid = to_regclass($1) AND attname = $2",
+            self.table, self.column
+        )
+
+        # expand
+        async with conn.transaction():
+            await conn.execute(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'")
+            await conn.execute(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {new_column} {self.new_type}")
+            await conn.execute(
+                f"CREATE OR REPLACE FUNCTION {_quote(self.trigger)}() RETURNS trigger AS $$ "
+                f"BEGIN NEW.{new_column} := {self.using.format(column='NEW.' + column)}; RETURN NEW; END "
+                f"$$ LANGUAGE plpgsql"
+            )
+            await conn.execute(f"DROP TRIGGER IF EXISTS {_quote(self.trigger)} ON {table}")
+            await conn.execute(
+                f"CREATE TRIGGER {_quote(self.trigger)} BEFORE INSERT OR UPDATE ON {table} "
+                f"FOR EACH ROW EXECUTE FUNCTION {_quote(self.trigger)}()"
+            )
+        report(f"  + {self.table}.{self.new_column} {self.new_type} с триггером синхронизации")
+
+        # backfill
+        # Строки, изменённые после expand, уже заполнены триггером
+        await Backfill(
+            self.table,
+            f"{new_column} = {self.using.format(column=column)}",
+            where=f"{new_column} IS NULL AND {column} IS NOT NULL",
+            key=self.key
+        ).apply(conn, report, batch_size)
+
+        # prepare
+        key_index = f"{self.table}_{self.column}__new_key"
+        if pk_name:
+            await CreateIndexConcurrently(key_index, self.table, new_column, unique=True).apply(conn, report, batch_size)
+        check_name = f"{self.table}_{self.column}__new_not_null"
+        if not_null or pk_name:
+            exists = await conn.fetchval(
+                "SELECT convalidated FROM pg_constraint WHERE conrelid = to_regclass($1) AND conname = $2",
+                self.table, check_name
+            )
+            if exists is None:
+                await SQL('', f"ALTER TABLE {table} ADD CONSTRAINT {_quote(check_name)} "
+                              f"CHECK ({new_column} IS NOT NULL) NOT VALID").apply(conn, report, batch_size)
+            if not exists:
+                # VALIDATE берёт SHARE UPDATE EXCLUSIVE - запись в таблицу продолжается
+                await conn.execute(f"ALTER TABLE {table} VALIDATE CONSTRAINT {_quote(check_name)}")
+
+        # contract
+        for attempt in range(1, 6):
+            try:
+                await self._contract(conn, pk_name, key_index, check_name, not_null or pk_name)
+                break
+            except Exception as e:
+                if 'lock timeout' not in str(e) or attempt == 5:
+                    raise
+                report(f"  … таблица {self.table} занята, повтор {attempt}/5")
+                await asyncio.sleep(attempt)
+        report(f"  ✓ {self.table}.{self.column} теперь {self.new_type}")
+
+    async def _contract(self, conn, pk_name, key_index, check_name, not_null):
+        table, column, new_column = _quote(self.table), _quote(self.column), _quote(self.new_column)
+
+        async with conn.transaction():
+            await conn.execute(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'")
+            await conn.execute(f"LOCK TABLE {table} IN ACCESS EXCLUSIVE MODE")
+
+            default = await conn.fetchval(
+                "SELECT pg_get_expr(d.adbin, d.adrelid) FROM pg_attrdef d "
+                "JOIN pg_attribute a ON a.attrelid = d.adrelid AND a.attnum = d.adnum "
+                "WHERE d.adrelid = to_regclass($1) AND a.attname = $2",
+                self.table, self.column
+            )
+            sequence = await conn.fetchval("SELECT pg_get_serial_sequence($1, $2)", self.table, self.column)
+            if sequence:
+                # Иначе DROP COLUMN удалит и последовательность
+                await conn.execute(f"ALTER SEQUENCE {sequence} OWNED BY {table}.{new_column}")
+            if default:
+                await conn.execute(f"ALTER TABLE {table} ALTER COLUMN {new_column} SET DEFAULT {default}")
+
+            await conn.execute(f"DROP TRIGGER IF EXISTS {_quote(self.trigger)} ON {table}")
+            await conn.execute(f"DROP FUNCTION IF EXISTS {_quote(self.trigger)}()")
+            if pk_name:
+                await conn.execute(f"ALTER TABLE {table} DROP CONSTRAINT {_quote(pk_name)}")
+            await conn.execute(f"ALTER TABLE {table} DROP COLUMN {column}")
+            await conn.execute(f"ALTER TABLE {table} RENAME COLUMN {new_column} TO {column}")
+            if not_null:
+                # Проверенный CHECK позволяет SET NOT NULL без сканирования таблицы
+                await conn.execute(f"ALTER TABLE {table} ALTER COLUMN {column} SET NOT NULL")
+                await conn.execute(f"ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {_quote(check_name)}")
+            if pk_name:
+                await conn.execute(
+                    f"ALTER TABLE {table} ADD CONSTRAINT {_quote(pk_name)} PRIMARY KEY USING INDEX {_quote(key_index)}"
+                )
+
+class PartitionByMonth(Step):
+    """
+    Online conversion of a plain table into one RANGE-partitioned by month.
+
+    prepare:  backfill NULLs of the partition column, prove NOT NULL and
+              "everything is before the boundary" with NOT VALID + VALIDATE
+              checks, build the new primary key (key, column) and the parent's
+              indexes on the old table CONCURRENTLY
+    swap:     one short transaction renames the table to <table>_legacy,
+              creates the partitioned parent, attaches the old table as the
+              partition for everything before the boundary and creates the
+              monthly partitions from it plus a default one. The validated
+              check makes the attach scan-free, and matching indexes are
+              attached, not rebuilt
+
+    The boundary is the first day of the month after next, so rows written
+    while the steps run still land in the old table and satisfy the check.
+    A resumed run replaces a check whose boundary has come too close.
+    `indexes` are (name, columns, where) of the partitioned parent.
+    """
+
+    def __init__(self, table: str, column: str, indexes: Sequence = (), key: str = 'id', ahead: int = 2):
+        self.table = table
+        self.column = column
+        self.indexes = list(indexes)
+        self.key = key
+        self.ahead = ahead
+        self.legacy = f"{table}_legacy"
+        self.key_index = f"{table}_{key}_{column}_key"
+        self.not_null_check = f"{table}_{column}_not_null"
+        self.description = f"partition {table} by month of {column}"
+
+    async def _boundary(self, conn, report, batch_size) -> datetime:
+        table, column = _quote(self.table), _quote(self.column)
+        minimum = add_months(month_start(datetime.utcnow()), 1)
+        rows = await conn.fetch(
+            "SELECT conname FROM pg_constraint WHERE conrelid = to_regclass($1) AND conname LIKE $2",
+            self.table, f"{self.table}_before_%"
+        )
+        for row in rows:
+            boundary = datetime.strptime(row['conname'][-7:], '%Y_%m')
+            if boundary > minimum:
+                break
+            await SQL('', f"ALTER TABLE {table} DROP CONSTRAINT {_quote(row['conname'])}").apply(conn, report, batch_size)
+        else:
+            boundary = add_months(minimum, 1)
+            await SQL('', f"ALTER TABLE {table} ADD CONSTRAINT {_quote(f'{self.table}_before_{boundary:%Y_%m}')} "
+                          f"CHECK ({column} < '{boundary:%Y-%m-%d}') NOT VALID").apply(conn, report, batch_size)
+
+        await conn.execute(f"ALTER TABLE {table} VALIDATE CONSTRAINT {_quote(f'{self.table}_before_{boundary:%Y_%m}')}")
+        return boundary
+
+    async def apply(self, conn, report, batch_size):
+        relkind = await conn.fetchval("SELECT relkind FROM pg_class WHERE oid = to_regclass($1)", self.table)
+        if relkind == 'p':
+            return
+        table, column = _quote(self.table), _quote(self.column)
+
+        # prepare
+        await Backfill(self.table, f"{column} = now()", where=f"{column} IS NULL",
+                       key=self.key).apply(conn, report, batch_size)
+        exists = await conn.fetchval(
+            "SELECT convalidated FROM pg_constraint WHERE conrelid = to_regclass($1) AND conname = $2",
+            self.table, self.not_null_check
+        )
+        if exists is None:
+            await SQL('', f"ALTER TABLE {table} ADD CONSTRAINT {_quote(self.not_null_check)} "
+                          f"CHECK ({column} IS NOT NULL) NOT VALID").apply(conn, report, batch_size)
+        await conn.execute(f"ALTER TABLE {table} VALIDATE CONSTRAINT {_quote(self.not_null_check)}")
+        boundary = await self._boundary(conn, report, batch_size)
+
+        await CreateIndexConcurrently(self.key_index, self.table, f"{self.key}, {column}",
+                                      unique=True).apply(conn, report, batch_size)
+        for name, columns, where in self.indexes:
+            await CreateIndexConcurrently(name, self.table, columns, where=where).apply(conn, report, batch_size)
+
+        # swap
+        for attempt in range(1, 6):
+            try:
+                await self._swap(conn, boundary)
+                break
+            except Exception as e:
+                if 'lock timeout' not in str(e) or attempt == 5:
+                    raise
+                report(f"  … таблица {self.table} занята, повтор {attempt}/5")
+                await asyncio.sleep(attempt)
+        report(f"  ✓ {self.table} разбита по месяцам, старые строки - в {self.legacy} (до {boundary:%Y-%m-%d})")
+
+    async def _swap(self, conn, boundary: datetime):
+        table, column, legacy = _quote(self.table), _quote(self.column), _quote(self.legacy)
+
+        async with conn.transaction():
+            await conn.execute(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'")
+            await conn.execute(f"LOCK TABLE {table} IN ACCESS EXCLUSIVE MODE")
+
+            sequence = await conn.fetchval("SELECT pg_get_serial_sequence($1, $2)", self.table, self.key)
+            pk_name = await conn.fetchval(
+                "SELECT conname FROM pg_constraint WHERE conrelid = to_regclass($1) AND contype = 'p'", self.table
+            )
+
+            # Старая таблица становится секцией: PK (key, column), индексы с суффиксом _legacy
+            await conn.execute(f"ALTER TABLE {table} RENAME TO {legacy}")
+            await conn.execute(f"ALTER TABLE {legacy} ALTER COLUMN {column} SET NOT NULL")
+            await conn.execute(f"ALTER TABLE {legacy} DROP CONSTRAINT {_quote(self.not_null_check)}")
+            if pk_name:
+                await conn.execute(f"ALTER TABLE {legacy} DROP CONSTRAINT {_quote(pk_name)}")
+            await conn.execute(
+                f"ALTER TABLE {legacy} ADD CONSTRAINT {_quote(self.legacy + '_pkey')} "
+                f"PRIMARY KEY USING INDEX {_quote(self.key_index)}"
+            )
+            for name, _, _ in self.indexes:
+                await conn.execute(f"ALTER INDEX {_quote(name)} RENAME TO {_quote(name + '_legacy')}")
+
+            await conn.execute(
+                f"CREATE TABLE {table} (LIKE {legacy} INCLUDING DEFAULTS) PARTITION BY RANGE ({column})"
+            )
+            await conn.execute(
+                f"ALTER TABLE {table} ADD CONSTRAINT {_quote(self.table + '_pkey')} PRIMARY KEY ({self.key}, {column})"
+            )
+            for name, columns, where in self.indexes:
+                await conn.execute(
+                    f"CREATE INDEX {_quote(name)} ON ONLY {table} ({columns})" + (f" WHERE {where}" if where else "")
+                )
+            if sequence:
+                # Иначе последовательность удалится вместе со старой секцией
+                await conn.execute(f"ALTER SEQUENCE {sequence} OWNED BY {table}.{_quote(self.key)}")
+
+            await conn.execute(
+                f"ALTER TABLE {table} ATTACH PARTITION {legacy} FOR VALUES FROM (MINVALUE) TO ('{boundary:%Y-%m-%d}')"
+            )
+            for name, _, _ in self.indexes:
+                await conn.execute(f"ALTER INDEX {_quote(name)} ATTACH PARTITION {_quote(name + '_legacy')}")
+            for offset in range(self.ahead + 1):
+                await conn.execute(partition_ddl(add_months(boundary, offset)))
+            await conn.execute(f"CREATE TABLE IF NOT EXISTS {_quote(self.table + '_default')} PARTITION OF {table} DEFAULT")
+            # Граница секции теперь задаёт сам ATTACH
+            await conn.execute(
+                f"ALTER TABLE {legacy} DROP CONSTRAINT IF EXISTS {_quote(f'{self.table}_before_{boundary:%Y_%m}')}"
+            )
+
+# ============= MIGRATIONS =============
+
+class Migration:
+    def __init__(self, version: int, name: str, steps: Sequence[Step], fresh: bool = True):
+        self.version = version
+        self.name = name
+        self.steps = list(steps)
+        # False - create_all не воспроизводит результат, на новой БД миграцию тоже нужно выполнить
+        self.fresh = fresh
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, 'piar_columns', [
+        # Бывшие migrate_db.py / fix_database.py
+        SQL(
+            "posts: piar fields",
+            "ALTER TABLE posts ADD COLUMN IF NOT EXISTS is_piar BOOLEAN DEFAULT FALSE",
+            "ALTER TABLE posts ADD COLUMN IF NOT EXISTS piar_name VARCHAR(255)",
+            "ALTER TABLE posts ADD COLUMN IF NOT EXISTS piar_profession VARCHAR(255)",
+            "ALTER TABLE posts ADD COLUMN IF NOT EXISTS piar_districts JSON",
+            "ALTER TABLE posts ADD COLUMN IF NOT EXISTS piar_phone VARCHAR(255)",
+            "ALTER TABLE posts ADD COLUMN IF NOT EXISTS piar_instagram VARCHAR(255)",
+            "ALTER TABLE posts ADD COLUMN IF NOT EXISTS piar_telegram VARCHAR(255)",
+            "ALTER TABLE posts ADD COLUMN IF NOT EXISTS piar_price VARCHAR(255)",
+        ),
+        SQL(
+            "drop legacy columns",
+            "ALTER TABLE posts DROP COLUMN IF EXISTS piar_contacts",
+            "ALTER TABLE users DROP COLUMN IF EXISTS updated_at",
+            "ALTER TABLE posts DROP COLUMN IF EXISTS updated_at",
+        ),
+    ]),
+    Migration(2, 'json_media_columns', [
+        ExpandContractColumn('posts', 'media', 'json'),
+        ExpandContractColumn('posts', 'hashtags', 'json'),
+    ]),
+    Migration(3, 'bigint_telegram_ids', [
+        # Бывший migrate_to_bigint.py, без переписывания таблицы под блокировкой
+        ExpandContractColumn('users', 'id', 'bigint'),
+        ExpandContractColumn('posts', 'user_id', 'bigint'),
+    ]),
+    Migration(4, 'moderation_queue_index', [
+        CreateIndexConcurrently('ix_posts_status_created_id', 'posts', 'status, created_at, id'),
+    ]),
+    Migration(5, 'moderation_claims_and_user_state', [
+        CreateTables(ModerationClaim, UserState),
+    ]),
+    Migration(6, 'user_activity_columns', [
+        # DEFAULT-константа с PG 11 не переписывает таблицу
+        SQL(
+            "users: last_activity, message_count",
+            "ALTER TABLE users ADD COLUMN IF NOT EXISTS last_activity TIMESTAMP",
+            "ALTER TABLE users ADD COLUMN IF NOT EXISTS message_count INTEGER NOT NULL DEFAULT 0",
+        ),
+    ]),
+    Migration(7, 'user_xp', [
+        SQL("users: xp", "ALTER TABLE users ADD COLUMN IF NOT EXISTS xp INTEGER NOT NULL DEFAULT 0"),
+    ]),
+    Migration(8, 'leaderboard_snapshots', [
+        CreateTables(LeaderboardSnapshot),
+    ]),
+    Migration(9, 'referrals', [
+        CreateTables(Referral),
+    ]),
+    Migration(10, 'referral_code_sequence', [
+        SQL("referral code block counter", "CREATE SEQUENCE IF NOT EXISTS referral_code_seq INCREMENT BY 1000"),
+    ]),
+    Migration(11, 'roll_participants', [
+        CreateTables(RollParticipant),
+    ]),
+    Migration(12, 'roll_draws', [
+        CreateTables(RollDraw),
+    ]),
+    Migration(13, 'word_games', [
+        CreateTables(WordGameRecord),
+    ]),
+    Migration(14, 'user_cooldown', [
+        SQL("users.cooldown_expires_at",
+            "ALTER TABLE users ADD COLUMN IF NOT EXISTS cooldown_expires_at TIMESTAMP WITHOUT TIME ZONE"),
+    ]),
+    Migration(15, 'posts_partitions', [
+        CreateTables(PostArchive),
+        PartitionByMonth('posts', 'created_at', indexes=[
+            ('ix_posts_pending', 'created_at, id', "status = 'PENDING'"),
+        ]),
+        # Заменён частичным ix_posts_pending
+        DropIndexConcurrently('ix_posts_status_created_id'),
+    ], fresh=False),
+]
+
+assert MIGRATIONS[-1].version == SCHEMA_VERSION, "models.SCHEMA_VERSION must match the last migration"
+
+# ============= RUNNER =============
+
+async def ensure_version_table(conn):
+    if not await conn.fetchval("SELECT to_regclass($1)", SchemaMigration.__tablename__):
+        await conn.execute(str(CreateTable(SchemaMigration.__table__).compile(dialect=postgresql.dialect())))
+
+async def applied_versions(conn) -> set:
+    await ensure_version_table(conn)
+    rows = await conn.fetch(f"SELECT version FROM {SchemaMigration.__tablename__}")
+    return {row['version'] for row in rows}
+
+async def run_migrations(conn, target: int = None, batch_size: int = DEFAULT_BATCH_SIZE,
+                         report: Reporter = print) -> List[int]:
+    """
+    Apply pending migrations up to `target` (default: all) in version order.
+    Returns the versions applied in this run.
+    """
+    await conn.execute("SELECT pg_advisory_lock($1)", ADVISORY_LOCK_ID)
+    try:
+        done = await applied_versions(conn)
+        applied = []
+        for migration in MIGRATIONS:
+            if migration.version in done or (target is not None and migration.version > target):
+                continue
+
+            report(f"▶ {migration.version:04d} {migration.name}")
+            started = time.monotonic()
+            for step in migration.steps:
+                if step.description:
+                    report(f"  · {step.description}")
+                await step.apply(conn, report, batch_size)
+
+            await conn.execute(
+                f"INSERT INTO {SchemaMigration.__tablename__} (version, applied_at) VALUES ($1, now()) "
+                f"ON CONFLICT DO NOTHING",
+                migration.version
+            )
+            applied.append(migration.version)
+            report(f"✅ {migration.version:04d} {migration.name} ({time.monotonic() - started:.1f}с)")
+        return applied
+    finally:
+        await conn.execute("SELECT pg_advisory_unlock($1)", ADVISORY_LOCK_ID)
@@ -0,0 +1,128 @@
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+from sqlalchemy import select, delete, or_
+from services.db import db
+from models import ModerationClaim
+from config import Config
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+# Модератор может адресовать ответ заявке, начав сообщение с "#<post_id>"
+TOKEN_PATTERN = re.compile(r'^\s*#(\d+)\s*')
+
+class ModerationClaimService:
+    """
+    Persisted moderation workflow state.
+
+    A claim is a lease on one pending post held by one moderator while the bot
+    waits for a link or a rejection reason. Claims live in the DB, so they
+    survive restarts, and a moderator can hold several at once. Expired leases
+    can be taken over by anyone and are purged periodically.
+    """
+
+    def __init__(self, ttl_seconds: int = None):
+        self.ttl = timedelta(seconds=ttl_seconds or Config.MODERATION_CLAIM_TTL)
+
+    async def claim(self, post_id: int, moderator_id: int, post_user_id: int, action: str,
+                    is_chat: bool = False, chat_id: int = None,
+                    prompt_message_id: int = None) -> Tuple[bool, Optional[int]]:
+        """
+        Take or renew the lease on a post.
+        Returns: (claimed: bool, holder_moderator_id if someone else holds it)
+        """
+        now = datetime.utcnow()
+        values = {
+            'post_id': post_id,
+            'moderator_id': moderator_id,
+            'post_user_id': post_user_id,
+            'action': action,
+            'is_chat': is_chat,
+            'chat_id': chat_id,
+            'prompt_message_id': prompt_message_id,
+            'claimed_at': now,
+            'expires_at': now + self.ttl
+        }
+
+        stmt = db.insert(ModerationClaim).values(**values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[ModerationClaim.post_id],
+            set_={key: stmt.excluded[key] for key in values if key != 'post_id'},
+            # Перехватить можно только свою или просроченную заявку
+            where=or_(
+                ModerationClaim.moderator_id == moderator_id,
+                ModerationClaim.expires_at < now
+            )
+        ).returning(ModerationClaim.post_id)
+
+        async with db.get_session() as session:
+            claimed = (await session.execute(stmt)).scalar_one_or_none()
+            if claimed is not None:
+                return True, None
+
+            holder = await session.scalar(
+                select(ModerationClaim.moderator_id).where(ModerationClaim.post_id == post_id)
+            )
+            return False, holder
+
+    async def resolve(self, moderator_id: int, chat_id: int, reply_to_message_id: Optional[int],
+                      text: str) -> Tuple[Optional[ModerationClaim], str, List[int]]:
+        """
+        Find the claim a moderator message belongs to.
+        Priority: reply to the prompt message, "#<post_id>" token, the only active claim.
+        Returns: (claim or None, text without token, active post IDs when ambiguous)
+        """
+        now = datetime.utcnow()
+        active = (
+            select(ModerationClaim)
+            .where(ModerationClaim.moderator_id == moderator_id)
+            .where(ModerationClaim.expires_at >= now)
+        )
+
+        async with db.get_session() as session:
+            if reply_to_message_id:
+                result = await session.execute(
+                    active.where(ModerationClaim.chat_id == chat_id)
+                    .where(ModerationClaim.prompt_message_id == reply_to_message_id)
+                )
+                claim = result.scalar_one_or_none()
+                if claim:
+                    return claim, text.strip(), []
+
+            match = TOKEN_PATTERN.match(text)
+            if match:
+                result = await session.execute(
+                    active.where(ModerationClaim.post_id == int(match.group(1)))
+                )
+                claim = result.scalar_one_or_none()
+                if claim:
+                    return claim, text[match.end():].strip(), []
+
+            result = await session.execute(active.order_by(ModerationClaim.claimed_at).limit(10))
+            claims = result.scalars().all()
+
+        if len(claims) == 1:
+            return claims[0], text.strip(), []
+
+        return None, text.strip(), [claim.post_id for claim in claims]
+
+    async def release(self, post_id: int, moderator_id: int = None):
+        """Drop the claim after the post was decided"""
+        stmt = delete(ModerationClaim).where(ModerationClaim.post_id == post_id)
+        if moderator_id is not None:
+            stmt = stmt.where(ModerationClaim.moderator_id == moderator_id)
+
+        async with db.get_session() as session:
+            await session.execute(stmt)
+
+    async def expire_stale(self) -> int:
+        """Delete expired claims, returns number of purged rows"""
+        async with db.get_session() as session:
+            result = await session.execute(
+                delete(ModerationClaim).where(ModerationClaim.expires_at < datetime.utcnow())
+            )
+            return result.rowcount or 0
+
+# Global instance
+moderation_claims = ModerationClaimService()
@@ -0,0 +1,67 @@
+import asyncio
+import logging
+import time
+from typing import List, NamedTuple, Optional
+from telegram.error import Forbidden, RetryAfter, BadRequest
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+class NotificationResult(NamedTuple):
+    chat_id: int
+    ok: bool
+    error: Optional[str] = None
+
+class RateLimitedSender:
+    """Paces outgoing bot messages to stay under Telegram flood limits"""
+
+    def __init__(self, rate_per_second: float = 25, concurrency: int = 5):
+        self._interval = 1.0 / rate_per_second
+        self._next_slot = 0.0
+        self._lock = asyncio.Lock()
+        self._semaphore = asyncio.Semaphore(concurrency)
+
+    async def _acquire(self):
+        """Wait for the next free send slot"""
+        async with self._lock:
+            now = time.monotonic()
+            wait = self._next_slot - now
+            if wait > 0:
+                await asyncio.sleep(wait)
+                now = time.monotonic()
+            self._next_slot = max(now, self._next_slot) + self._interval
+
+    async def send(self, bot, chat_id: int, text: str, **kwargs) -> NotificationResult:
+        """Send one message respecting the rate limit, retrying once on RetryAfter"""
+        async with self._semaphore:
+            for attempt in range(2):
+                await self._acquire()
+                try:
+                    await bot.send_message(chat_id=chat_id, text=text, **kwargs)
+                    return NotificationResult(chat_id, True)
+                except RetryAfter as e:
+                    if attempt:
+                        return NotificationResult(chat_id, False, "flood limit")
+                    logger.warning(f"Flood limit hit, sleeping {e.retry_after}s")
+                    await asyncio.sleep(float(e.retry_after))
+                except Forbidden:
+                    return NotificationResult(chat_id, False, "бот заблокирован")
+                except BadRequest as e:
+                    return NotificationResult(chat_id, False, str(e))
+                except Exception as e:
+                    logger.error(f"Error sending notification to {chat_id}: {e}")
+                    return NotificationResult(chat_id, False, str(e))
+        return NotificationResult(chat_id, False, "flood limit")
+
+    async def send_many(self, bot, messages: List[tuple]) -> List[NotificationResult]:
+        """
+        Fan out messages: [(chat_id, text, kwargs), ...]
+        Returns results in the same order
+        """
+        return await asyncio.gather(*(
+            self.send(bot, chat_id, text, **(kwargs or {}))
+            for chat_id, text, kwargs in messages
+        ))
+
+# Global instance
+notifier = RateLimitedSender(Config.NOTIFY_RATE_PER_SECOND)
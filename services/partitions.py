@@ -0,0 +1,255 @@
+"""
+Monthly partitions of posts and archival of decided posts.
+
+In PostgreSQL posts is RANGE-partitioned by created_at, one partition per
+month (migration 15 converts the old table in place; it stays attached as
+posts_legacy for everything before the first monthly partition). Approved
+and rejected posts older than POSTS_RETENTION_DAYS are moved to
+posts_archive with the full row stored as compressed JSON, so the live
+partitions hold recent and pending posts only. Old partitions that end up
+empty are detached and dropped instead of being vacuumed forever.
+
+PostArchiver runs in the background: it creates partitions ahead of time,
+archives in short batches and drops empty partitions. On SQLite there are
+no partitions and only archival runs.
+"""
+
+import asyncio
+import json
+import logging
+import re
+import zlib
+from datetime import date, datetime, timedelta
+from enum import Enum
+from typing import List, Optional, Tuple
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+TABLE = 'posts'
+LEGACY_PARTITION = f'{TABLE}_legacy'
+DEFAULT_PARTITION = f'{TABLE}_default'
+PARTITION_PATTERN = re.compile(rf'^{TABLE}_p(\d{{4}})_(\d{{2}})$')
+BOUND_PATTERN = re.compile(r"TO \('([^']+)'\)")
+
+# ============= СЕКЦИИ =============
+
+def month_start(value: datetime) -> datetime:
+    return datetime(value.year, value.month, 1)
+
+def add_months(value: datetime, months: int) -> datetime:
+    index = value.year * 12 + value.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+def partition_name(month: datetime) -> str:
+    return f"{TABLE}_p{month:%Y_%m}"
+
+def partition_ddl(month: datetime) -> str:
+    return (
+        f"CREATE TABLE IF NOT EXISTS {partition_name(month)} PARTITION OF {TABLE} "
+        f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{add_months(month, 1):%Y-%m-%d}')"
+    )
+
+def hot_since(now: datetime = None) -> datetime:
+    """Lower created_at bound for lookups that should only touch recent partitions"""
+    return (now or datetime.utcnow()) - timedelta(days=Config.POSTS_HOT_DAYS)
+
+# ============= АРХИВ =============
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.name
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+def pack(row: dict) -> bytes:
+    return zlib.compress(json.dumps(row, default=_json_default, ensure_ascii=False).encode('utf-8'), 9)
+
+def unpack(data: bytes) -> dict:
+    return json.loads(zlib.decompress(data).decode('utf-8'))
+
+class PostArchiver:
+    """Background partition maintenance and archival of decided posts"""
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self.archived = 0
+        self.dropped: List[str] = []
+
+    async def is_partitioned(self, session) -> bool:
+        from sqlalchemy import text
+        from services.db import db
+
+        if db.is_sqlite:
+            return False
+        relkind = await session.scalar(text("SELECT relkind FROM pg_class WHERE oid = to_regclass(:table)"),
+                                       {'table': TABLE})
+        return relkind == 'p'
+
+    async def _partitions(self, session) -> List[Tuple[str, Optional[datetime]]]:
+        """(name, upper bound) of posts partitions; None for the default one"""
+        from sqlalchemy import text
+
+        result = await session.execute(text(
+            "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid WHERE i.inhparent = to_regclass(:table)"
+        ), {'table': TABLE})
+        partitions = []
+        for name, bound in result.all():
+            match = PARTITION_PATTERN.match(name)
+            if match:
+                upper = add_months(datetime(int(match.group(1)), int(match.group(2)), 1), 1)
+            elif BOUND_PATTERN.search(bound or ''):
+                upper = datetime.fromisoformat(BOUND_PATTERN.search(bound).group(1))
+            else:
+                upper = None
+            partitions.append((name, upper))
+        return partitions
+
+    async def ensure_partitions(self, now: datetime = None) -> int:
+        """Create partitions for the current month and POSTS_PARTITIONS_AHEAD months ahead"""
+        from sqlalchemy import text
+        from services.db import db
+
+        current = month_start(now or datetime.utcnow())
+        created = 0
+        async with db.get_session() as session:
+            if not await self.is_partitioned(session):
+                return 0
+            # Месяцы до границы posts_legacy уже покрыты ею
+            legacy = dict(await self._partitions(session)).get(LEGACY_PARTITION)
+            for offset in range(Config.POSTS_PARTITIONS_AHEAD + 1):
+                month = add_months(current, offset)
+                if legacy and month < legacy:
+                    continue
+                await session.execute(text(partition_ddl(month)))
+                created += 1
+        return created
+
+    async def archive_batch(self, cutoff: datetime, limit: int) -> int:
+        """Move up to `limit` decided posts created before `cutoff` to posts_archive"""
+        from sqlalchemy import select, delete
+        from services.db import db
+        from models import Post, PostArchive, PostStatus
+
+        stmt = (
+            select(Post.__table__)
+            .where(Post.status.in_([PostStatus.APPROVED, PostStatus.REJECTED]))
+            .where(Post.created_at < cutoff)
+            .order_by(Post.created_at)
+            .limit(limit)
+        )
+        if not db.is_sqlite:
+            stmt = stmt.with_for_update(skip_locked=True)
+
+        now = datetime.utcnow()
+        async with db.get_session() as session:
+            rows = (await session.execute(stmt)).mappings().all()
+            if not rows:
+                return 0
+
+            archive = [
+                {
+                    'id': row['id'],
+                    'user_id': row['user_id'],
+                    'status': row['status'].name,
+                    'category': row['category'],
+                    'created_at': row['created_at'],
+                    'archived_at': now,
+                    'data': pack(dict(row))
+                }
+                for row in rows
+            ]
+            await session.execute(
+                db.insert(PostArchive).values(archive).on_conflict_do_nothing(index_elements=[PostArchive.id])
+            )
+            # created_at в условии - удаление затрагивает только старые секции
+            await session.execute(
+                delete(Post)
+                .where(Post.id.in_([row['id'] for row in rows]))
+                .where(Post.created_at < cutoff)
+                .execution_options(synchronize_session=False)
+            )
+        return len(rows)
+
+    async def archive(self, now: datetime = None) -> int:
+        cutoff = (now or datetime.utcnow()) - timedelta(days=Config.POSTS_RETENTION_DAYS)
+        moved = 0
+        while True:
+            count = await self.archive_batch(cutoff, Config.POSTS_ARCHIVE_BATCH)
+            moved += count
+            if count < Config.POSTS_ARCHIVE_BATCH:
+                break
+            await asyncio.sleep(0.1)  # короткие транзакции, между ними идёт обычная запись
+        if moved:
+            self.archived += moved
+            logger.info(f"Archived {moved} decided posts older than {cutoff:%Y-%m-%d}")
+        return moved
+
+    async def drop_empty_partitions(self, now: datetime = None) -> List[str]:
+        """Detach and drop partitions that lie before the retention cutoff and hold no rows"""
+        from sqlalchemy import text
+        from services.db import db
+
+        cutoff = (now or datetime.utcnow()) - timedelta(days=Config.POSTS_RETENTION_DAYS)
+        async with db.get_session() as session:
+            if not await self.is_partitioned(session):
+                return []
+            partitions = await self._partitions(session)
+
+        candidates = [name for name, upper in partitions if upper is not None and upper <= cutoff]
+
+        dropped = []
+        for name in candidates:
+            try:
+                async with db.get_session() as session:
+                    await session.execute(text("SET LOCAL lock_timeout = '3s'"))
+                    if await session.scalar(text(f"SELECT EXISTS (SELECT 1 FROM {name})")):
+                        continue
+                    await session.execute(text(f"ALTER TABLE {TABLE} DETACH PARTITION {name}"))
+                    await session.execute(text(f"DROP TABLE {name}"))
+                dropped.append(name)
+                logger.info(f"Dropped empty partition {name}")
+            except Exception as e:
+                # Таблица занята - попробуем в следующий проход
+                logger.warning(f"Could not drop partition {name}: {e}")
+        self.dropped.extend(dropped)
+        return dropped
+
+    async def run_once(self):
+        await self.ensure_partitions()
+        await self.archive()
+        await self.drop_empty_partitions()
+
+    def start(self):
+        """Start the maintenance loop on the running event loop"""
+        if not Config.POSTS_ARCHIVE_INTERVAL:
+            return
+        if self._task is not None and not self._task.done():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._task = loop.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error(f"Post archiver error: {e}")
+            await asyncio.sleep(Config.POSTS_ARCHIVE_INTERVAL)
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+# Global instance
+post_archiver = PostArchiver()
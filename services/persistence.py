@@ -0,0 +1,219 @@
+import asyncio
+import json
+import logging
+from datetime import datetime
+from typing import Any, Dict, Optional, Set, Tuple
+from sqlalchemy import select, delete, tuple_
+from telegram.ext import BasePersistence, PersistenceInput
+from services.db import db
+from models import UserState
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+def _json_default(value):
+    """Encode values json can't handle natively"""
+    if isinstance(value, datetime):
+        return {'__dt__': value.isoformat()}
+    if isinstance(value, (set, tuple)):
+        return list(value)
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+def _json_object_hook(obj):
+    if len(obj) == 1 and '__dt__' in obj:
+        return datetime.fromisoformat(obj['__dt__'])
+    return obj
+
+def encode_value(value: Any) -> str:
+    """Compact JSON: no whitespace, UTF-8 kept as is"""
+    return json.dumps(value, separators=(',', ':'), ensure_ascii=False, default=_json_default)
+
+def decode_value(raw: str) -> Any:
+    return json.loads(raw, object_hook=_json_object_hook)
+
+class DatabasePersistence(BasePersistence):
+    """
+    PTB persistence for context.user_data on top of services.db.
+
+    - Lazy: nothing is loaded at startup, a user's keys are read on the first
+      update from that user (refresh_user_data).
+    - Dirty keys only: each key is stored as its own row and compared with the
+      last persisted encoding, unchanged keys are never written.
+    - Batched: PTB calls update_user_data for every touched user once per
+      update_interval; all of those calls are coalesced into one upsert.
+    """
+
+    def __init__(self, update_interval: float = None):
+        super().__init__(
+            store_data=PersistenceInput(bot_data=False, chat_data=False, user_data=True, callback_data=False),
+            update_interval=update_interval or Config.PERSISTENCE_FLUSH_INTERVAL
+        )
+        self._snapshots: Dict[int, Dict[str, str]] = {}  # последнее записанное состояние
+        self._pending_upserts: Dict[Tuple[int, str], str] = {}
+        self._pending_deletes: Set[Tuple[int, str]] = set()
+        self._flush_task: Optional[asyncio.Task] = None
+        self._write_lock = asyncio.Lock()
+
+    # ============= USER DATA =============
+
+    async def get_user_data(self) -> Dict[int, dict]:
+        """Nothing is loaded eagerly, see refresh_user_data"""
+        return {}
+
+    async def refresh_user_data(self, user_id: int, user_data: dict) -> None:
+        """Load persisted keys the first time a user shows up after a restart"""
+        if user_id in self._snapshots:
+            return
+
+        try:
+            async with db.get_session() as session:
+                result = await session.execute(
+                    select(UserState.key, UserState.value).where(UserState.user_id == user_id)
+                )
+                rows = result.all()
+        except Exception as e:
+            logger.error(f"Could not load persisted user_data for {user_id}: {e}")
+            return
+
+        snapshot = {}
+        for key, raw in rows:
+            snapshot[key] = raw
+            if key not in user_data:
+                try:
+                    user_data[key] = decode_value(raw)
+                except ValueError:
+                    logger.warning(f"Corrupted persisted key {key} for user {user_id}")
+
+        self._snapshots[user_id] = snapshot
+        if rows:
+            logger.info(f"Restored {len(rows)} user_data keys for user {user_id}")
+
+    async def update_user_data(self, user_id: int, data: dict) -> None:
+        """Stage changed keys and join the shared batch write"""
+        snapshot = self._snapshots.setdefault(user_id, {})
+
+        for key, value in data.items():
+            try:
+                encoded = encode_value(value)
+            except (TypeError, ValueError) as e:
+                logger.warning(f"Skipping non-serializable user_data[{key!r}] of {user_id}: {e}")
+                continue
+            if snapshot.get(key) != encoded:
+                snapshot[key] = encoded
+                self._pending_upserts[(user_id, str(key))] = encoded
+                self._pending_deletes.discard((user_id, str(key)))
+
+        for key in [key for key in snapshot if key not in data]:
+            del snapshot[key]
+            self._pending_upserts.pop((user_id, key), None)
+            self._pending_deletes.add((user_id, key))
+
+        await self._flush_soon()
+
+    async def drop_user_data(self, user_id: int) -> None:
+        snapshot = self._snapshots.pop(user_id, {})
+        for key in snapshot:
+            self._pending_upserts.pop((user_id, key), None)
+        self._pending_deletes.difference_update({k for k in self._pending_deletes if k[0] == user_id})
+
+        async with self._write_lock:
+            async with db.get_session() as session:
+                await session.execute(delete(UserState).where(UserState.user_id == user_id))
+
+    # ============= BATCHING =============
+
+    async def _flush_soon(self):
+        """
+        Coalesce concurrent update_user_data calls into one write.
+        PTB gathers all per-user updates at once; the first call schedules the
+        write task and the rest await the same task after staging their keys.
+        """
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._write_pending())
+        try:
+            await asyncio.shield(self._flush_task)
+        except Exception as e:
+            logger.error(f"Error persisting user_data: {e}")
+
+    async def _write_pending(self):
+        await asyncio.sleep(0)  # даём остальным корутинам gather'а поставить свои ключи
+
+        async with self._write_lock:
+            upserts, self._pending_upserts = self._pending_upserts, {}
+            deletes, self._pending_deletes = self._pending_deletes, set()
+
+            if not upserts and not deletes:
+                return
+
+            now = datetime.utcnow()
+            try:
+                async with db.get_session() as session:
+                    if upserts:
+                        stmt = db.insert(UserState).values([
+                            {'user_id': user_id, 'key': key, 'value': value, 'updated_at': now}
+                            for (user_id, key), value in upserts.items()
+                        ])
+                        stmt = stmt.on_conflict_do_update(
+                            index_elements=[UserState.user_id, UserState.key],
+                            set_={'value': stmt.excluded.value, 'updated_at': stmt.excluded.updated_at}
+                        )
+                        await session.execute(stmt)
+
+                    if deletes:
+                        await session.execute(
+                            delete(UserState).where(
+                                tuple_(UserState.user_id, UserState.key).in_(list(deletes))
+                            )
+                        )
+            except Exception:
+                # Возвращаем в очередь, если за это время ключ не изменился снова
+                for item, value in upserts.items():
+                    self._pending_upserts.setdefault(item, value)
+                self._pending_deletes |= {item for item in deletes if item not in self._pending_upserts}
+                raise
+
+            logger.debug(f"Persisted {len(upserts)} changed and {len(deletes)} removed user_data keys")
+
+    async def flush(self) -> None:
+        """Called by PTB on shutdown"""
+        if self._flush_task and not self._flush_task.done():
+            await asyncio.gather(self._flush_task, return_exceptions=True)
+        try:
+            await self._write_pending()
+        except Exception as e:
+            logger.error(f"Error flushing user_data on shutdown: {e}")
+
+    # ============= NOT STORED =============
+
+    async def get_chat_data(self) -> Dict[int, dict]:
+        return {}
+
+    async def get_bot_data(self) -> dict:
+        return {}
+
+    async def get_callback_data(self):
+        return None
+
+    async def get_conversations(self, name: str) -> dict:
+        return {}
+
+    async def update_conversation(self, name: str, key, new_state) -> None:
+        pass
+
+    async def update_chat_data(self, chat_id: int, data: dict) -> None:
+        pass
+
+    async def update_bot_data(self, data: dict) -> None:
+        pass
+
+    async def update_callback_data(self, data) -> None:
+        pass
+
+    async def drop_chat_data(self, chat_id: int) -> None:
+        pass
+
+    async def refresh_chat_data(self, chat_id: int, chat_data: dict) -> None:
+        pass
+
+    async def refresh_bot_data(self, bot_data: dict) -> None:
+        pass
@@ -0,0 +1,107 @@
+import asyncio
+import hashlib
+import logging
+from typing import Optional, Tuple
+from sqlalchemy import text
+from services.db import db
+from models import REFERRAL_CODE_SEQUENCE
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Crockford base32: без I, L, O, U - код легко продиктовать
+ALPHABET = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'
+CODE_LENGTH = 7  # 35 бит >= 32; старые случайные коды - 8 символов, пересечений нет
+SEQUENCE_NAME = REFERRAL_CODE_SEQUENCE.name
+
+def _round(value: int, key: bytes, round_index: int) -> int:
+    digest = hashlib.blake2b(value.to_bytes(2, 'big'), digest_size=2,
+                             key=key, salt=round_index.to_bytes(16, 'big')).digest()
+    return int.from_bytes(digest, 'big')
+
+def permute(counter: int, key: bytes, rounds: int = 4) -> int:
+    """
+    Keyed Feistel permutation of the 32-bit space.
+    A bijection: distinct counters always give distinct outputs, while
+    consecutive counters look unrelated.
+    """
+    left, right = counter >> 16, counter & 0xFFFF
+    for round_index in range(rounds):
+        left, right = right, left ^ _round(right, key, round_index)
+    return (left << 16) | right
+
+def encode(value: int) -> str:
+    chars = []
+    for _ in range(CODE_LENGTH):
+        value, digit = divmod(value, 32)
+        chars.append(ALPHABET[digit])
+    return ''.join(reversed(chars))
+
+class ReferralCodeAllocator:
+    """
+    Collision-free referral codes without retry loops.
+
+    Codes are encode(permute(n)) for a counter n, so uniqueness follows from
+    the counter never repeating. Counters are reserved in blocks from a
+    PostgreSQL sequence whose INCREMENT BY is the block size (sequences never
+    hand out a value twice, across processes and rollbacks; on SQLite a
+    counter row stands in for the sequence). Inside a block a code
+    is a local increment; the next block is prefetched in the background when
+    the current one runs low, so take() normally does no I/O.
+    """
+
+    def __init__(self, secret: str = None):
+        self._key = hashlib.blake2b((secret or Config.REFERRAL_CODE_SECRET).encode(), digest_size=16).digest()
+        self._next = 0
+        self._end = 0
+        self._block_size = 0
+        self._spare: Optional[Tuple[int, int]] = None  # заранее зарезервированный блок (начало, размер)
+        self._refill: Optional[asyncio.Task] = None
+
+    async def _reserve_block(self) -> Tuple[int, int]:
+        """One round-trip: block start and size (the sequence increment)"""
+        async with db.get_session() as session:
+            if db.is_sqlite:
+                start = await db.nextval(session, REFERRAL_CODE_SEQUENCE)
+                size = REFERRAL_CODE_SEQUENCE.increment
+            else:
+                result = await session.execute(text(
+                    f"SELECT nextval('{SEQUENCE_NAME}'), "
+                    f"(SELECT increment_by FROM pg_sequences WHERE sequencename = '{SEQUENCE_NAME}')"
+                ))
+                start, size = result.one()
+        if start + size > 1 << 32:
+            raise RuntimeError("Referral code space exhausted")
+        return start, size
+
+    async def _prefetch(self):
+        try:
+            self._spare = await self._reserve_block()
+        except Exception as e:
+            logger.error(f"Could not reserve referral code block: {e}")
+
+    def _start_prefetch(self):
+        if self._spare is None and (self._refill is None or self._refill.done()):
+            self._refill = asyncio.get_running_loop().create_task(self._prefetch())
+
+    async def take(self) -> str:
+        """Next unused code"""
+        while self._next >= self._end:
+            if self._spare is not None:
+                start, size = self._spare
+                self._next, self._end, self._block_size = start, start + size, size
+                self._spare = None
+                break
+            self._start_prefetch()
+            await asyncio.shield(self._refill)
+            if self._spare is None and self._next >= self._end:
+                raise RuntimeError("No referral code block available")
+
+        counter = self._next
+        self._next += 1
+        if self._end - self._next <= self._block_size // 5:
+            self._start_prefetch()
+        return encode(permute(counter, self._key))
+
+# Global instance
+referral_codes = ReferralCodeAllocator()
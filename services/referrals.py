@@ -0,0 +1,85 @@
+import logging
+import re
+from collections import OrderedDict
+from typing import Optional
+from sqlalchemy import select, func
+from services.db import db
+from services.xp import xp_engine
+from models import User, Referral
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Коды - буквы и цифры; всё остальное отбрасываем без запроса к БД
+CODE_PATTERN = re.compile(r'^[A-Za-z0-9]{4,32}$')
+
+class ReferralService:
+    """
+    Referral attribution for /start <code> deep links.
+
+    Codes are resolved through a bounded LRU cache filled lazily from the
+    unique index on users.referral_code (never a scan); unknown codes are
+    cached too so a spammed bad link costs one lookup. A referred user can
+    be attributed only once - the referrals PK is the referred user's ID and
+    the insert is ON CONFLICT DO NOTHING - and XP_REFERRAL goes through the
+    XP engine, which persists it with the batched activity flush.
+    """
+
+    def __init__(self, cache_size: int = None):
+        self.cache_size = cache_size or Config.REFERRAL_CACHE_SIZE
+        self._codes: "OrderedDict[str, Optional[int]]" = OrderedDict()
+
+    def remember(self, code: str, user_id: Optional[int]):
+        """Cache a code -> user ID mapping (None for unknown codes)"""
+        self._codes[code] = user_id
+        self._codes.move_to_end(code)
+        if len(self._codes) > self.cache_size:
+            self._codes.popitem(last=False)
+
+    async def resolve(self, code: str) -> Optional[int]:
+        """Owner of a referral code or None"""
+        if not code or not CODE_PATTERN.match(code):
+            return None
+        if code in self._codes:
+            self._codes.move_to_end(code)
+            return self._codes[code]
+
+        async with db.get_session() as session:
+            user_id = await session.scalar(select(User.id).where(User.referral_code == code))
+        self.remember(code, user_id)
+        return user_id
+
+    async def attribute(self, referred_id: int, code: str) -> Optional[int]:
+        """
+        Record that `referred_id` came via `code`.
+        Returns the referrer ID when the referral is new, None otherwise.
+        """
+        referrer_id = await self.resolve(code)
+        if referrer_id is None or referrer_id == referred_id:
+            return None
+
+        stmt = db.insert(Referral).values(
+            referred_id=referred_id,
+            referrer_id=referrer_id,
+            code=code
+        ).on_conflict_do_nothing(index_elements=[Referral.referred_id]).returning(Referral.referrer_id)
+
+        async with db.get_session() as session:
+            inserted = (await session.execute(stmt)).scalar_one_or_none()
+
+        if inserted is None:
+            return None
+
+        db.pin_primary(referrer_id)
+        xp_engine.award(referrer_id, 'referral')
+        logger.info(f"User {referred_id} referred by {referrer_id}")
+        return referrer_id
+
+    async def count(self, referrer_id: int) -> int:
+        async with db.get_read_session(referrer_id) as session:
+            return await session.scalar(
+                select(func.count()).select_from(Referral).where(Referral.referrer_id == referrer_id)
+            ) or 0
+
+# Global instance
+referrals = ReferralService()
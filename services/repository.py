@@ -0,0 +1,65 @@
+"""
+Hot-path queries.
+
+The few statements that run on almost every submission and moderation
+click (user by id, post status by id, cooldown update) select just the
+needed columns and return small named tuples instead of ORM objects, so
+nothing is hydrated or goes through the identity map. Their compiled SQL
+is reused from SQLAlchemy's statement cache like any other select.
+
+lambda_stmt was measured here (bench_queries.py) and is slower on the
+full execution path: executing it through a Session resolves the lambda
+and clones the statement on every call, which costs more than the cache
+key it saves.
+
+Every function takes the session to run in, so callers keep choosing
+between db.get_session() and db.get_read_session().
+"""
+
+from datetime import datetime
+from typing import NamedTuple, Optional
+from sqlalchemy import select, update
+from models import User, Post, PostStatus
+from services.partitions import hot_since
+
+class UserRow(NamedTuple):
+    id: int
+    username: Optional[str]
+    cooldown_expires_at: Optional[datetime]
+
+class PostRow(NamedTuple):
+    id: int
+    user_id: int
+    status: PostStatus
+
+def user_stmt(user_id: int):
+    return select(User.id, User.username, User.cooldown_expires_at).where(User.id == user_id)
+
+def post_stmt(post_id: int, since: datetime = None):
+    stmt = select(Post.id, Post.user_id, Post.status).where(Post.id == post_id)
+    if since is not None:
+        stmt = stmt.where(Post.created_at >= since)
+    return stmt
+
+def cooldown_stmt(user_id: int, expires_at: Optional[datetime]):
+    return (
+        update(User).where(User.id == user_id).values(cooldown_expires_at=expires_at)
+        .execution_options(synchronize_session=False)
+    )
+
+async def fetch_user(session, user_id: int) -> Optional[UserRow]:
+    row = (await session.execute(user_stmt(user_id))).first()
+    return UserRow(*row) if row else None
+
+async def fetch_post(session, post_id: int) -> Optional[PostRow]:
+    # Почти всегда пост свежий: created_at отсекает старые секции posts,
+    # полный поиск - только если в последних секциях его нет
+    row = (await session.execute(post_stmt(post_id, hot_since()))).first()
+    if row is None:
+        row = (await session.execute(post_stmt(post_id))).first()
+    return PostRow(*row) if row else None
+
+async def set_cooldown(session, user_id: int, expires_at: Optional[datetime]) -> bool:
+    """Set (None - clear) a user's cooldown, False if there is no such user"""
+    result = await session.execute(cooldown_stmt(user_id, expires_at))
+    return result.rowcount > 0
@@ -0,0 +1,248 @@
+import bisect
+import logging
+import random
+import secrets
+from datetime import datetime
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+ROLL_VERSIONS = ('play3xia', 'play3x', 'playxxx')
+NUMBER_MIN = 1
+NUMBER_MAX = 9999
+SEED_BITS = 63  # сид помещается в BIGINT
+
+class DrawResult(NamedTuple):
+    version: str
+    seed: int
+    target: int
+    winners: List[Tuple[int, str, int]]  # (user_id, username, number), ближайшие первыми
+    participants_count: int
+
+def nearest(numbers: List[int], target: int, count: int) -> List[int]:
+    """
+    `count` numbers closest to `target` from a sorted list in O(log n + k):
+    two pointers walk outwards from the insertion point. On equal distance
+    the lower number wins, so the result depends only on the inputs.
+    """
+    hi = bisect.bisect_left(numbers, target)
+    lo = hi - 1
+    picked = []
+    while len(picked) < count and (lo >= 0 or hi < len(numbers)):
+        if hi >= len(numbers) or (lo >= 0 and target - numbers[lo] <= numbers[hi] - target):
+            picked.append(numbers[lo])
+            lo -= 1
+        else:
+            picked.append(numbers[hi])
+            hi += 1
+    return picked
+
+def draw_target(seed: int) -> int:
+    """Winning number derived from the seed alone - anyone can re-check it"""
+    return random.Random(seed).randint(NUMBER_MIN, NUMBER_MAX)
+
+class NumberPool:
+    """
+    Unassigned numbers of a range kept in a list.
+    take() swaps a random element with the last one and pops it: O(1), and it
+    can't fail until every number is taken.
+    """
+
+    def __init__(self, low: int = NUMBER_MIN, high: int = NUMBER_MAX, taken: Iterable[int] = (),
+                 rng: random.Random = None):
+        taken = set(taken)
+        self._free = [number for number in range(low, high + 1) if number not in taken]
+        self._random = rng or random.Random()
+
+    def __len__(self) -> int:
+        return len(self._free)
+
+    def take(self) -> Optional[int]:
+        """Random free number or None when the range is exhausted"""
+        if not self._free:
+            return None
+        index = self._random.randrange(len(self._free))
+        self._free[index], self._free[-1] = self._free[-1], self._free[index]
+        return self._free.pop()
+
+class RollGameState:
+    """Participants and free numbers of one game version"""
+
+    def __init__(self, version: str, rng: random.Random = None):
+        self.version = version
+        self.active = True
+        self.participants: Dict[int, dict] = {}  # {user_id: {username, number, joined_at}}
+        self.numbers: List[int] = []  # выданные номера по возрастанию
+        self.owners: Dict[int, int] = {}  # {number: user_id}
+        self._random = rng or random.Random()
+        self.pool = NumberPool(rng=self._random)
+
+    def add(self, user_id: int, username: str, number: int, joined_at: datetime = None):
+        self.participants[user_id] = {
+            'username': username,
+            'number': number,
+            'joined_at': joined_at or datetime.now()
+        }
+        bisect.insort(self.numbers, number)
+        self.owners[number] = user_id
+
+    def restore(self, rows: Iterable[Tuple[int, str, int, datetime]]):
+        """Replace state with persisted participants"""
+        self.participants = {}
+        self.numbers = []
+        self.owners = {}
+        for user_id, username, number, joined_at in rows:
+            self.add(user_id, username, number, joined_at)
+        self.pool = NumberPool(taken=self.numbers, rng=self._random)
+
+    def reset(self) -> int:
+        count = len(self.participants)
+        self.participants = {}
+        self.numbers = []
+        self.owners = {}
+        self.pool = NumberPool(rng=self._random)
+        return count
+
+    def draw(self, winners_count: int, seed: int) -> DrawResult:
+        target = draw_target(seed)
+        winners = []
+        for number in nearest(self.numbers, target, winners_count):
+            user_id = self.owners[number]
+            winners.append((user_id, self.participants[user_id]['username'], number))
+        return DrawResult(self.version, seed, target, winners, len(self.participants))
+
+class RollNumberService:
+    """
+    Unique roll numbers for every game version, shared by main.py and
+    handlers.games_handler. Assignments are written to roll_participants
+    when a DB is configured and restored on startup.
+    """
+
+    def __init__(self, versions: Iterable[str] = ROLL_VERSIONS):
+        self.games: Dict[str, RollGameState] = {version: RollGameState(version) for version in versions}
+
+    def game(self, version: str) -> RollGameState:
+        return self.games[version]
+
+    def participants(self, version: str) -> Dict[int, dict]:
+        return self.games[version].participants
+
+    def number_of(self, version: str, user_id: int) -> Optional[int]:
+        data = self.games[version].participants.get(user_id)
+        return data['number'] if data else None
+
+    async def join(self, version: str, user_id: int, username: str) -> Tuple[Optional[int], bool]:
+        """
+        Assign a number to the user.
+        Returns: (number or None if the range is exhausted, True if newly assigned)
+        """
+        game = self.games[version]
+        existing = game.participants.get(user_id)
+        if existing:
+            return existing['number'], False
+
+        number = game.pool.take()
+        if number is None:
+            return None, False
+
+        game.add(user_id, username, number)
+        await self._save(version, user_id, username, number, game.participants[user_id]['joined_at'])
+        return number, True
+
+    async def draw(self, version: str, winners_count: int, seed: int = None) -> DrawResult:
+        """
+        Pick winners closest to a number drawn from `seed` (a fresh random one
+        if not given). The seed and the winners are recorded in roll_draws, so
+        a draw can be reproduced with draw_target(seed) and the participant list.
+        """
+        if seed is None:
+            seed = secrets.randbits(SEED_BITS)
+        result = self.games[version].draw(winners_count, seed)
+        await self._save_draw(result)
+        return result
+
+    async def reset(self, version: str) -> int:
+        count = self.games[version].reset()
+        await self._delete(version)
+        return count
+
+    # ============= PERSISTENCE =============
+
+    async def _save(self, version: str, user_id: int, username: str, number: int, joined_at: datetime):
+        try:
+            from services.db import db
+            from models import RollParticipant
+
+            if db.engine is None:
+                return
+            async with db.get_session() as session:
+                await session.execute(
+                    db.insert(RollParticipant).values(
+                        version=version, user_id=user_id, username=username,
+                        number=number, joined_at=joined_at
+                    ).on_conflict_do_nothing()
+                )
+        except Exception as e:
+            logger.error(f"Could not persist roll number {number} for {user_id}: {e}")
+
+    async def _save_draw(self, result: DrawResult):
+        try:
+            from services.db import db
+            from models import RollDraw
+
+            if db.engine is None:
+                return
+            async with db.get_session() as session:
+                session.add(RollDraw(
+                    version=result.version,
+                    seed=result.seed,
+                    target=result.target,
+                    winners=[
+                        {'user_id': user_id, 'username': username, 'number': number}
+                        for user_id, username, number in result.winners
+                    ],
+                    participants_count=result.participants_count
+                ))
+        except Exception as e:
+            logger.error(f"Could not record roll draw {result.version} (seed {result.seed}): {e}")
+
+    async def _delete(self, version: str):
+        try:
+            from services.db import db
+            from models import RollParticipant
+            from sqlalchemy import delete
+
+            if db.engine is None:
+                return
+            async with db.get_session() as session:
+                await session.execute(delete(RollParticipant).where(RollParticipant.version == version))
+        except Exception as e:
+            logger.error(f"Could not reset persisted roll {version}: {e}")
+
+    async def load(self):
+        """Restore participants of every version from the DB"""
+        from services.db import db
+        from models import RollParticipant
+        from sqlalchemy import select
+
+        if db.engine is None:
+            return
+
+        async with db.get_session() as session:
+            result = await session.execute(
+                select(RollParticipant.version, RollParticipant.user_id, RollParticipant.username,
+                       RollParticipant.number, RollParticipant.joined_at)
+            )
+            rows = result.all()
+
+        by_version: Dict[str, list] = {version: [] for version in self.games}
+        for version, user_id, username, number, joined_at in rows:
+            if version in by_version:
+                by_version[version].append((user_id, username, number, joined_at))
+        for version, version_rows in by_version.items():
+            self.games[version].restore(version_rows)
+
+        logger.info(f"Restored {len(rows)} roll participants")
+
+# Global instance
+roll_numbers = RollNumberService()
@@ -0,0 +1,102 @@
+import logging
+import time
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+from sqlalchemy import select, func, or_
+from services.db import db
+from services.referral_codes import referral_codes
+from models import User, Gender
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+class UserRegistry:
+    """
+    Registration on /start as a single upsert.
+
+    INSERT ... ON CONFLICT (id) DO UPDATE only touches the row when the
+    username, names or missing referral code actually differ, so concurrent
+    /start taps can't fail on the primary key and unchanged users cost no
+    write. A referral code is taken from the allocator only when the user has
+    none yet, so repeat /start calls don't burn codes. Recently registered
+    profiles are remembered for USER_SEEN_TTL seconds; a repeat /start with
+    the same profile skips the DB entirely.
+    """
+
+    def __init__(self, ttl: float = None, max_size: int = None):
+        self.ttl = ttl or Config.USER_SEEN_TTL
+        self.max_size = max_size or Config.USER_SEEN_MAX
+        self._seen: Dict[int, Tuple[float, tuple]] = {}  # в порядке добавления - старые впереди
+
+    def _is_fresh(self, user_id: int, profile: tuple, now: float) -> bool:
+        entry = self._seen.get(user_id)
+        return entry is not None and entry[0] > now and entry[1] == profile
+
+    def _remember(self, user_id: int, profile: tuple, now: float):
+        self._seen.pop(user_id, None)
+        self._seen[user_id] = (now + self.ttl, profile)
+
+        # Вытесняем устаревшие и лишние записи с начала
+        while self._seen:
+            oldest = next(iter(self._seen))
+            if len(self._seen) <= self.max_size and self._seen[oldest][0] > now:
+                break
+            del self._seen[oldest]
+
+    def forget(self, user_id: int):
+        self._seen.pop(user_id, None)
+
+    async def register(self, user_id: int, username: Optional[str], first_name: Optional[str],
+                       last_name: Optional[str]) -> Tuple[bool, Optional[str]]:
+        """
+        Create or refresh the user row.
+        Returns: (first registration, referral code assigned by this call or None)
+        """
+        profile = (username, first_name, last_name)
+        now = time.monotonic()
+        if self._is_fresh(user_id, profile, now):
+            return False, None
+
+        async with db.get_session() as session:
+            has_code = await session.scalar(select(User.referral_code).where(User.id == user_id)) is not None
+        code = None if has_code else await referral_codes.take()
+        stmt = db.insert(User).values(
+            id=user_id,
+            username=username,
+            first_name=first_name,
+            last_name=last_name,
+            gender=Gender.UNKNOWN,
+            referral_code=code,
+            created_at=datetime.utcnow()
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[User.id],
+            set_={
+                'username': stmt.excluded.username,
+                'first_name': stmt.excluded.first_name,
+                'last_name': stmt.excluded.last_name,
+                # Строку мог создать сбор активности - код выдаём при первом /start
+                'referral_code': func.coalesce(User.referral_code, stmt.excluded.referral_code)
+            },
+            where=or_(
+                User.username.is_distinct_from(stmt.excluded.username),
+                User.first_name.is_distinct_from(stmt.excluded.first_name),
+                User.last_name.is_distinct_from(stmt.excluded.last_name),
+                User.referral_code.is_(None)
+            )
+        ).returning(User.referral_code)
+
+        async with db.get_session() as session:
+            stored_code = (await session.execute(stmt)).scalar_one_or_none()
+        db.pin_primary(user_id)
+
+        self._remember(user_id, profile, now)
+
+        # Коды уникальны: наш код в строке значит, что это первая регистрация
+        created = code is not None and stored_code == code
+        if created:
+            logger.info(f"Registered new user: {user_id}")
+        return created, code if created else None
+
+# Global instance
+users = UserRegistry()
@@ -0,0 +1,317 @@
+import asyncio
+import logging
+import random
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+from config import Config
+from services.expiring import ExpiringDict
+
+logger = logging.getLogger(__name__)
+
+GAME_VERSIONS = ('play3xia', 'play3x', 'playxxx')
+DEFAULT_DESCRIPTION = 'Конкурс пока не активен'
+MESSAGE_LIMIT = 4000  # запас до лимита Telegram в 4096 символов
+
+def normalize_word(word: str) -> str:
+    """Нормализует слово для сравнения"""
+    return (word or '').lower().strip().replace('ё', 'е')
+
+class AttemptWindow:
+    """
+    Last attempt time per user, kept only while the user is still locked out.
+
+    An ExpiringDict of user_id -> monotonic timestamp: each attempt lives for
+    the interval it was recorded with.
+    """
+
+    def __init__(self, name: str = None):
+        self._last = ExpiringDict(name=name)
+
+    def __len__(self) -> int:
+        return len(self._last)
+
+    def remaining(self, user_id: int, interval: float, now: float = None) -> float:
+        """Seconds until the next attempt is allowed, 0 if it is allowed now"""
+        last = self._last.get(user_id)
+        if last is None:
+            return 0
+        now = time.monotonic() if now is None else now
+        return max(last + interval - now, 0)
+
+    def record(self, user_id: int, interval: float, now: float = None):
+        now = time.monotonic() if now is None else now
+        self._last.set(user_id, now, ttl=interval)
+
+    def clear(self):
+        self._last.clear()
+
+class WordGameState:
+    """Words, current round and attempt windows of one game version"""
+
+    def __init__(self, version: str):
+        self.version = version
+        self.words: Dict[str, dict] = {}  # {word: {'description': str, 'hints': [], 'media': []}}
+        self.current_word: Optional[str] = None
+        self.active = False
+        self.winners: List[str] = []
+        self.interval = 60  # минуты
+        self.description = DEFAULT_DESCRIPTION
+        self.media_url: Optional[str] = None
+        self.attempts = AttemptWindow(f"word_game:{version}")
+
+    @property
+    def interval_seconds(self) -> float:
+        return self.interval * 60
+
+    def can_attempt(self, user_id: int) -> bool:
+        return self.attempts.remaining(user_id, self.interval_seconds) == 0
+
+    def record_attempt(self, user_id: int):
+        self.attempts.record(user_id, self.interval_seconds)
+
+    def is_correct(self, guess: str) -> bool:
+        if not self.current_word:
+            return False
+        return normalize_word(guess) == normalize_word(self.current_word)
+
+    def start(self, word: str):
+        self.current_word = word
+        self.active = True
+        self.winners = []
+        self.attempts.clear()
+
+    def to_dict(self) -> dict:
+        return {
+            'words': self.words,
+            'current_word': self.current_word,
+            'active': self.active,
+            'winners': self.winners,
+            'interval': self.interval,
+            'description': self.description,
+            'media_url': self.media_url
+        }
+
+    def restore(self, data: dict):
+        self.words = data.get('words') or {}
+        self.active = bool(data.get('active'))
+        self.winners = data.get('winners') or []
+        self.interval = data.get('interval') or 60
+        self.description = data.get('description') or DEFAULT_DESCRIPTION
+        self.media_url = data.get('media_url')
+        self.current_word = data.get('current_word')
+
+class GuessDigest:
+    """
+    Buffers guess notifications for the moderation group and sends them as
+    one digest message per chat every `interval` seconds instead of one Bot
+    API call per guess. The send loop starts lazily on the first guess.
+    """
+
+    def __init__(self, interval: float = None):
+        self.interval = interval or Config.GAME_DIGEST_INTERVAL
+        self._pending: Dict[int, List[str]] = {}  # {chat_id: [строки]}
+        self._bot = None
+        self._task: Optional[asyncio.Task] = None
+
+    def add(self, bot, chat_id: int, line: str):
+        self._bot = bot
+        self._pending.setdefault(chat_id, []).append(line)
+        self._ensure_running()
+
+    def _ensure_running(self):
+        if self._task is not None and not self._task.done():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._task = loop.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Error sending game digest: {e}")
+
+    @staticmethod
+    def _chunks(lines: List[str]) -> Iterable[str]:
+        header = f"🎮 Игровые попытки ({len(lines)}):\n\n"
+        chunk = header
+        for line in lines:
+            if len(chunk) + len(line) + 1 > MESSAGE_LIMIT and chunk != header:
+                yield chunk
+                chunk = header
+            chunk += line + "\n"
+        yield chunk
+
+    async def flush(self) -> int:
+        """Send everything buffered, returns number of guesses reported"""
+        if not self._pending or self._bot is None:
+            return 0
+        batch, self._pending = self._pending, {}
+        sent = 0
+        for chat_id, lines in batch.items():
+            for text in self._chunks(lines):
+                try:
+                    await self._bot.send_message(chat_id=chat_id, text=text)
+                except Exception as e:
+                    logger.error(f"Error sending game digest to {chat_id}: {e}")
+            sent += len(lines)
+        return sent
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+class WordGameService:
+    """
+    "Угадай слово" for every game version, shared by main.py and
+    handlers.games_handler.
+
+    Game state (words, current round, winners, interval) is written to
+    word_games on every admin change and restored on startup when a DB is
+    configured. Guesses are compared with the current word after
+    normalize_word (case, spaces, ё), and attempts are rate-limited by
+    AttemptWindow, which forgets users as soon as their interval passes.
+    Guess notifications go through GuessDigest, marked with the result.
+    """
+
+    def __init__(self, versions: Iterable[str] = GAME_VERSIONS):
+        self.games: Dict[str, WordGameState] = {version: WordGameState(version) for version in versions}
+        self.digest = GuessDigest()
+
+    def game(self, version: str) -> WordGameState:
+        return self.games[version]
+
+    async def add_word(self, version: str, word: str, description: str = None) -> dict:
+        entry = self.games[version].words[word] = {
+            'description': description or f'Угадайте слово: {word}',
+            'hints': [],
+            'media': []
+        }
+        await self.save(version)
+        return entry
+
+    async def edit_word(self, version: str, word: str, description: str) -> bool:
+        entry = self.games[version].words.get(word)
+        if entry is None:
+            return False
+        entry['description'] = description
+        await self.save(version)
+        return True
+
+    async def remove_word(self, version: str, word: str) -> bool:
+        if self.games[version].words.pop(word, None) is None:
+            return False
+        await self.save(version)
+        return True
+
+    async def start(self, version: str, description: str = None) -> Optional[str]:
+        """Pick a random word and open a round, None when there are no words"""
+        game = self.games[version]
+        if not game.words:
+            return None
+        game.start(random.choice(list(game.words)))
+        if description:
+            game.description = description
+        await self.save(version)
+        return game.current_word
+
+    async def stop(self, version: str, description: str = None) -> WordGameState:
+        game = self.games[version]
+        game.active = False
+        if description:
+            game.description = description
+        await self.save(version)
+        return game
+
+    async def update(self, version: str, **fields):
+        """Set interval / description / media_url and persist"""
+        game = self.games[version]
+        for name, value in fields.items():
+            setattr(game, name, value)
+        await self.save(version)
+
+    async def guess(self, version: str, user_id: int, guess: str) -> Tuple[bool, float]:
+        """
+        Check a guess. Returns (won, seconds to wait); a non-zero wait means
+        the attempt was rejected by the interval and not counted.
+        """
+        game = self.games[version]
+        wait = game.attempts.remaining(user_id, game.interval_seconds)
+        if wait:
+            return False, wait
+        game.record_attempt(user_id)
+        return game.is_correct(guess), 0
+
+    async def win(self, version: str, username: str, description: str = None):
+        game = self.games[version]
+        game.winners.append(username)
+        game.active = False
+        if description:
+            game.description = description
+        await self.save(version)
+
+    def report_guess(self, bot, chat_id: int, version: str, user_id: int, username: str, guess: str,
+                     won: bool = False):
+        """Queue a guess for the next moderation digest"""
+        mark = "✅" if won else "❌"
+        self.digest.add(bot, chat_id, f"{mark} [{version}] @{username} ({user_id}): {guess}")
+
+    # ============= PERSISTENCE =============
+
+    async def save(self, version: str):
+        try:
+            from services.db import db
+            from models import WordGameRecord
+
+            if db.engine is None:
+                return
+            stmt = db.insert(WordGameRecord).values(
+                version=version,
+                state=self.games[version].to_dict(),
+                updated_at=datetime.utcnow()
+            )
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[WordGameRecord.version],
+                set_={'state': stmt.excluded.state, 'updated_at': stmt.excluded.updated_at}
+            )
+            async with db.get_session() as session:
+                await session.execute(stmt)
+        except Exception as e:
+            logger.error(f"Could not persist word game {version}: {e}")
+
+    async def load(self):
+        """Restore every version from the DB"""
+        from services.db import db
+        from models import WordGameRecord
+        from sqlalchemy import select
+
+        if db.engine is None:
+            return
+
+        async with db.get_session() as session:
+            result = await session.execute(select(WordGameRecord.version, WordGameRecord.state))
+            rows = result.all()
+
+        for version, state in rows:
+            if version in self.games and state:
+                self.games[version].restore(state)
+
+        logger.info(f"Restored {len(rows)} word games")
+
+    async def close(self):
+        """Send the pending digest (on shutdown)"""
+        await self.digest.stop()
+
+# Global instance
+word_games = WordGameService()
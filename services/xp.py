@@ -0,0 +1,108 @@
+import logging
+import time
+from collections import deque
+from typing import Deque, Dict, Optional, Tuple
+from services.activity import activity
+from services.leaderboard import leaderboards
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Очки за события, значения из Config.XP_*
+EVENT_POINTS = {
+    'message': Config.XP_MESSAGE,
+    'media': Config.XP_MEDIA,
+    'reaction': Config.XP_REACTION,
+    'vote': Config.XP_VOTE,
+    'referral': Config.XP_REFERRAL,
+}
+
+# Награды за чужие действия не упираются в часовой лимит получателя
+UNCAPPED_EVENTS = {'referral'}
+
+class XPEngine:
+    """
+    Awards XP for chat events with a sliding one-hour cap per user.
+
+    Each user has a deque of (timestamp, points) for the last hour plus a
+    running total, so checking the cap is amortised O(1): expired entries are
+    popped from the left as they fall out of the window. Granted points go to
+    the activity aggregator and are persisted with its batched flush - there
+    is no DB write per event.
+    """
+
+    def __init__(self, hourly_limit: int = None, window_seconds: int = 3600):
+        self.hourly_limit = hourly_limit or Config.XP_HOURLY_LIMIT
+        self.window_seconds = window_seconds
+        self._windows: Dict[int, Deque[Tuple[float, int]]] = {}
+        self._totals: Dict[int, int] = {}
+        self._awards_since_sweep = 0
+
+    def _expire(self, user_id: int, now: float) -> int:
+        """Drop entries older than the window, returns points still counted"""
+        window = self._windows.get(user_id)
+        if not window:
+            return 0
+        cutoff = now - self.window_seconds
+        total = self._totals[user_id]
+        while window and window[0][0] <= cutoff:
+            total -= window.popleft()[1]
+        if window:
+            self._totals[user_id] = total
+        else:
+            del self._windows[user_id]
+            del self._totals[user_id]
+            total = 0
+        return total
+
+    def award(self, user_id: int, event: str, points: int = None, now: float = None) -> int:
+        """
+        Grant XP for an event. Returns points actually granted
+        (less than requested or 0 when the hourly cap is reached).
+        """
+        points = EVENT_POINTS.get(event, 0) if points is None else points
+        if points <= 0:
+            return 0
+        now = time.monotonic() if now is None else now
+
+        if event not in UNCAPPED_EVENTS:
+            used = self._expire(user_id, now)
+            points = min(points, self.hourly_limit - used)
+            if points <= 0:
+                return 0
+            self._windows.setdefault(user_id, deque()).append((now, points))
+            self._totals[user_id] = used + points
+
+        activity.add_xp(user_id, points)
+        leaderboards.record(user_id, xp=points)
+
+        self._awards_since_sweep += 1
+        if self._awards_since_sweep >= 10000:
+            self.sweep(now)
+        return points
+
+    def remaining(self, user_id: int, now: float = None) -> int:
+        """XP the user can still earn in the current window"""
+        now = time.monotonic() if now is None else now
+        return max(self.hourly_limit - self._expire(user_id, now), 0)
+
+    def sweep(self, now: float = None):
+        """Forget users whose window is empty, keeps memory bounded by the last hour's active users"""
+        now = time.monotonic() if now is None else now
+        for user_id in list(self._windows):
+            self._expire(user_id, now)
+        self._awards_since_sweep = 0
+
+    @staticmethod
+    def level_info(xp: int) -> dict:
+        """Level, name and XP left to the next level"""
+        level, name = Config.get_xp_level(xp)
+        return {'level': level, 'name': name, 'xp': xp, 'to_next': Config.get_next_level_xp(xp)}
+
+    @staticmethod
+    def total_xp(stored_xp: Optional[int], user_id: int) -> int:
+        """Persisted XP plus awards still waiting in the activity buffer"""
+        return (stored_xp or 0) + activity.pending_xp(user_id)
+
+# Global instance
+xp_engine = XPEngine()
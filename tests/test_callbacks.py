@@ -0,0 +1,68 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from services.callbacks import CallbackRouter, encode
+
+class FakeQuery:
+    def __init__(self, data: str):
+        self.id = '1'
+        self.data = data
+        self.answers = []
+
+    async def answer(self, text=None, show_alert=False):
+        if self.answers:
+            raise RuntimeError("Query is too old or already answered")
+        self.answers.append((text, show_alert))
+
+def dispatch(router, data: str):
+    query = FakeQuery(data)
+    update = SimpleNamespace(callback_query=query, effective_user=SimpleNamespace(id=1))
+    asyncio.run(router.dispatch(update, SimpleNamespace()))
+    return query
+
+def test_plain_handler_is_answered_once_after_it_runs():
+    router = CallbackRouter()
+    seen = []
+
+    async def handler(update, context, post_id):
+        seen.append((post_id, list(update.callback_query.answers)))
+
+    router.route('mod:approve', handler)
+    query = dispatch(router, encode('mod', 'approve', 42))
+
+    assert seen == [(42, [])]
+    assert query.answers == [(None, False)]
+
+def test_handler_alert_is_the_only_answer():
+    router = CallbackRouter()
+
+    async def handler(update, context, post_id):
+        await router.answer(update, "🔒 busy", show_alert=True)
+        await router.answer(update, "ignored", show_alert=True)
+
+    router.route('mod:approve', handler)
+    query = dispatch(router, encode('mod', 'approve', 42))
+
+    assert query.answers == [("🔒 busy", True)]
+    assert router._answered == {}
+
+def test_failing_handler_still_answers():
+    router = CallbackRouter()
+
+    async def handler(update, context):
+        raise ValueError("boom")
+
+    router.route('menu:write', handler)
+    with pytest.raises(ValueError):
+        dispatch(router, 'menu:write')
+    assert router._answered == {}
+
+def test_guard_and_unknown_route_answer_with_alert():
+    router = CallbackRouter()
+    router.guard('mod', lambda user_id: False)
+    router.route('mod:approve', lambda *args: None)
+
+    assert dispatch(router, encode('mod', 'approve', 1)).answers == [("❌ Доступ запрещен", True)]
+    assert dispatch(router, 'nope:x').answers == [("Функция в разработке", True)]
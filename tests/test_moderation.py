@@ -0,0 +1,106 @@
+import asyncio
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+from telegram import Chat, Message, Update, User as TelegramUser
+
+from config import Config
+from handlers import moderation_handler
+from models import Post, PostStatus
+from services.callbacks import callback_router, encode
+from services.db import db
+
+MODERATOR_ID = next(iter(Config.get_all_moderators()))
+PROMPT_MESSAGE_ID = 500
+
+class FakeQuery:
+    def __init__(self, data: str):
+        self.id = 'q1'
+        self.data = data
+        self.message = SimpleNamespace(chat_id=Config.MODERATION_GROUP_ID, message_id=PROMPT_MESSAGE_ID)
+        self.answers = []
+        self.edits = []
+
+    async def answer(self, text=None, show_alert=False):
+        assert not self.answers, "query answered twice"
+        self.answers.append((text, show_alert))
+
+    async def edit_message_text(self, text, **kwargs):
+        self.edits.append(text)
+
+class FakeMessage:
+    def __init__(self, text: str, reply_to_message_id: int = None):
+        self.text = text
+        self.reply_to_message = SimpleNamespace(message_id=reply_to_message_id) if reply_to_message_id else None
+        self.replies = []
+
+    async def reply_text(self, text, **kwargs):
+        self.replies.append(text)
+
+class FakeBot:
+    def __init__(self):
+        self.sent = []
+
+    async def send_message(self, chat_id, text, **kwargs):
+        self.sent.append((chat_id, text))
+
+def moderator_update(**fields):
+    return SimpleNamespace(
+        effective_user=SimpleNamespace(id=MODERATOR_ID),
+        effective_chat=SimpleNamespace(id=Config.MODERATION_GROUP_ID),
+        **fields
+    )
+
+def group_message(text: str, reply_to: Message = None) -> Update:
+    chat = Chat(Config.MODERATION_GROUP_ID, Chat.SUPERGROUP)
+    message = Message(
+        2, datetime.now(timezone.utc), chat,
+        from_user=TelegramUser(MODERATOR_ID, 'Mod', False),
+        text=text, reply_to_message=reply_to
+    )
+    return Update(1, message=message)
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, 'DATABASE_URL', f"sqlite:///{tmp_path / 'bot.db'}")
+    return db
+
+def test_moderation_text_filter_takes_replies_and_post_tokens():
+    prompt = Message(PROMPT_MESSAGE_ID, datetime.now(timezone.utc), Chat(Config.MODERATION_GROUP_ID, Chat.SUPERGROUP))
+    text_filter = moderation_handler.MODERATION_TEXT_FILTER
+
+    assert text_filter.check_update(group_message("https://t.me/snghu/1", reply_to=prompt))
+    assert text_filter.check_update(group_message("#42 https://t.me/snghu/1"))
+    assert not text_filter.check_update(group_message("просто сообщение"))
+
+def test_approve_button_then_link_reply_approves_post(database):
+    async def scenario():
+        await database.init()
+        try:
+            async with database.get_session() as session:
+                post = Post(user_id=111, text="Продам велосипед", status=PostStatus.PENDING)
+                session.add(post)
+                await session.flush()
+                post_id = post.id
+
+            query = FakeQuery(encode('mod', 'approve', post_id))
+            await callback_router.dispatch(moderator_update(callback_query=query), SimpleNamespace())
+            assert query.answers == [(None, False)]
+            assert "ОДОБРЕНИЕ ЗАЯВКИ" in query.edits[0]
+
+            message = FakeMessage("https://t.me/snghu/1234", reply_to_message_id=PROMPT_MESSAGE_ID)
+            bot = FakeBot()
+            await moderation_handler.handle_moderation_text(moderator_update(message=message), SimpleNamespace(bot=bot))
+
+            async with database.get_session() as session:
+                status = (await session.get(Post, post_id)).status
+            return status, message.replies, bot.sent
+        finally:
+            await database.close()
+
+    status, replies, sent = asyncio.run(scenario())
+
+    assert status == PostStatus.APPROVED
+    assert "ЗАЯВКА ОДОБРЕНА" in replies[0]
+    assert sent[0][0] == 111 and "https://t.me/snghu/1234" in sent[0][1]
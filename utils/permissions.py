@@ -2,10 +2,14 @@ from functools import wraps
 from telegram import Update
 from telegram.ext import ContextTypes
 from config import Config
+from datetime import datetime
 import logging
 
 logger = logging.getLogger(__name__)
 
+# БД импортируется внутри проверок: декораторы нужны каждому обработчику,
+# а стек БД (sqlalchemy, models) - только при первом вызове
+
 def admin_only(func):
     """Decorator to restrict command to admins only"""
     @wraps(func)
@@ -73,7 +77,6 @@ def check_user_muted(func):
         from services.db import db
         from models import User
         from sqlalchemy import select
-        from datetime import datetime
         
         user_id = update.effective_user.id
         